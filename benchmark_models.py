@@ -0,0 +1,87 @@
+"""
+Benchmark compiled model backends
+
+Predicts the same PEPREC file with several builds of a ms2pipfeatures_pyx
+module, for instance the nested if models and the array models written by
+tree_models.py, and reports the prediction time, the size of each compiled
+module and the largest difference with the predictions of the first build:
+
+	CFLAGS=-DMS2PIP_TREE_IFS python setup.py build_ext --build-lib build_ifs
+	python benchmark_models.py <peptide file> -c config.file . build_ifs
+
+Each build is imported in its own process as the modules share a name.
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib
+import multiprocessing
+import numpy as np
+
+import ms2pipC
+
+def run_backend(directory,module_name,ptm_file,model,encoded,repeats,queue):
+	sys.path.insert(0,os.path.abspath(directory))
+	ms2pipfeatures_pyx = importlib.import_module(module_name)
+	ms2pipfeatures_pyx.ms2pip_init(ptm_file)
+	models = np.repeat(ms2pipfeatures_pyx.model_index(model),len(encoded[3])).astype(np.int32)
+	timings = []
+	for r in range(repeats):
+		start = time.time()
+		(mzs,predictions) = ms2pipfeatures_pyx.get_predictions_batch(*(encoded+(models,)))
+		timings.append(time.time()-start)
+	queue.put((ms2pipfeatures_pyx.__file__,min(timings),predictions))
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark compiled model backends')
+	parser.add_argument('pep_file', metavar='<peptide file>',
+					 help='list of peptides')
+	parser.add_argument('backends', metavar='DIR', nargs='+',
+					 help='directories that contain a build of the module')
+	parser.add_argument('-c', metavar='FILE',action="store", dest='c', required=True,
+					 help='config file')
+	parser.add_argument('-x', metavar='NAME',action="store", dest='module', default='ms2pipfeatures_pyx',
+					 help='name of the compiled module (default ms2pipfeatures_pyx)')
+	parser.add_argument('-M', metavar='MODEL',action="store", dest='model', default='HCD',
+					 help='model to predict with (default HCD)')
+	parser.add_argument('-r', metavar='INT',action="store", dest='repeats', type=int, default=3,
+					 help='number of timed runs per backend, the fastest is reported')
+	args = parser.parse_args()
+
+	(PTMmap,Ntermmap,Ctermmap,fragmethod,fragerror,ptm_file) = ms2pipC.read_config(args.c)
+	data = ms2pipC.read_peprec(args.pep_file)
+
+	peptides = []
+	modpeptides = []
+	offsets = np.zeros(len(data)+1,dtype=np.int32)
+	charges = np.array(data.charge,dtype=np.int32)
+	nptms = np.zeros(len(data),dtype=np.float32)
+	cptms = np.zeros(len(data),dtype=np.float32)
+	for k,(peptide,mods) in enumerate(zip(data.peptide,data.modifications)):
+		(peptide,modpeptide,nptm,cptm) = ms2pipC.encode_peptide(peptide,mods,PTMmap,Ntermmap,Ctermmap)
+		peptides.append(peptide)
+		modpeptides.append(modpeptide)
+		offsets[k+1] = offsets[k]+len(peptide)
+		nptms[k] = nptm
+		cptms[k] = cptm
+	encoded = (np.concatenate(peptides),np.concatenate(modpeptides),offsets,charges,nptms,cptms)
+	sys.stdout.write("%i peptides, %i ions\n"%(len(data),2*(offsets[-1]-len(data))))
+
+	reference = None
+	for directory in args.backends:
+		queue = multiprocessing.Queue()
+		p = multiprocessing.Process(target=run_backend,args=(directory,args.module,ptm_file,args.model,encoded,args.repeats,queue))
+		p.start()
+		(module_file,timing,predictions) = queue.get()
+		p.join()
+		if reference is None:
+			reference = predictions
+		sys.stdout.write("%s\n"%module_file)
+		sys.stdout.write("\tmodule size: %.1f MB\n"%(os.path.getsize(module_file)/1e6))
+		sys.stdout.write("\tprediction time: %.3f s (%.0f peptides/s)\n"%(timing,len(data)/timing))
+		sys.stdout.write("\tmax abs difference with %s: %g\n"%(args.backends[0],np.max(np.abs(predictions-reference))))
+
+if __name__ == "__main__":
+	main()
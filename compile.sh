@@ -1,11 +1,6 @@
-#rm -f ms2pipfeatures_pyx_CID.c ms2pipfeatures_pyx_CID.so
-#python setup_CID.py build_ext --inplace
+rm -f ms2pipfeatures_pyx.c ms2pipfeatures_pyx.so
+# array models (see tree_models.py), setup.py writes them from the nested if models
+python setup.py build_ext --inplace
 
-#rm -f ms2pipfeatures_pyx_HCD.c ms2pipfeatures_pyx_HCD.so
-#python setup_HCD.py build_ext --inplace
-
-rm -f ms2pipfeatures_pyx_HCDiTRAQ4.c ms2pipfeatures_pyx_HCDiTRAQ4.so
-python setup_HCDiTRAQ.py build_ext --inplace
-
-#rm -f ms2pipfeatures_pyx_HCDiTRAQ4phospho.c ms2pipfeatures_pyx_HCDiTRAQ4phospho.so
-#python setup_HCDiTRAQphospho.py build_ext --inplace
+# nested if models, compile much slower
+#CFLAGS=-DMS2PIP_TREE_IFS python setup.py build_ext --inplace
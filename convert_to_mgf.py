@@ -2,132 +2,190 @@
 Convert msp files
 
 Writes three files: mgf with the spectra; PEPREC with the peptide sequences; meta with additional metainformation.
+With -i the .mgf index that ms2pipC.py reads (<mgf>.idx, see mgf_index.py) is written as well, so the
+spectrum file does not have to be scanned again.
 Arguments:
 	arg1 path to msp file
 	arg2 TITLE
+
+The msp file is cut into chunks at Name: records, which are converted in parallel (-m) in one pass over the
+file and written in file order. The spectra are numbered after their Name: record, the first one is TITLE1.
+Comment: fields that are missing from a record are left empty in the meta file.
 """
 #CHaNGED MODS!!
 
-import sys
-
-AminoMass = {}
-AminoMass['A']= 71.037114
-AminoMass['C']= 103.009185
-AminoMass['D']= 115.026943
-AminoMass['E']= 129.042593
-AminoMass['F']= 147.068414
-AminoMass['G']= 57.021464
-AminoMass['H']= 137.058912
-AminoMass['I']= 113.084064
-AminoMass['K']= 128.094963
-AminoMass['L']= 113.084064
-AminoMass['M']= 131.040485
-AminoMass['N']= 114.042927
-AminoMass['P']= 97.052764
-AminoMass['Q']= 128.058578
-AminoMass['R']= 156.101111
-AminoMass['S']= 87.032028
-AminoMass['T']= 101.047679
-AminoMass['V']= 99.068414
-AminoMass['W']= 186.079313
-AminoMass['Y']= 163.063329
-
-fpip = open(sys.argv[1]+'.PEPREC','w')
-fpip.write("spec_id modifications peptide\n")
-fmgf = open(sys.argv[1]+'.PEPREC.mgf','w')
-fmeta = open(sys.argv[1]+'.PEPREC.meta','w')
-
-PTMs = {}
-
-specid = 1
-with open(sys.argv[1]) as f:
-	peptide = None
-	charge = None
-	parentmz = None
-	mods = None
-	purity = None
-	HCDenergy = None
-	read_spec = False
-	mgf = ""
-	prev = 'A'
-	#sys.stderr.write(prev)
-	for row in f:
-		if read_spec:
-			l = row.rstrip().split('\t')
-			if len(l) != 3:
-				if peptide[0] != prev:
-					prev = peptide[0]
-					#sys.stderr.write(prev)
-
-				tmp = mods.split('/')
-				if tmp[0] != '0':
-					m = ""
-					for i in range(1,len(tmp)):
-						tmp2=tmp[i].split(',')
-						if (tmp2[0]=='0') & (tmp2[2]=='iTRAQ'):
-							m += '0|'+tmp2[2] +'|'
-						else:
-							#m += str(int(tmp2[0])+1)+'|'+tmp2[2] +'|'
-							m += str(int(tmp2[0])+1)+'|'+tmp2[2] + peptide[int(tmp2[0])] + '|'
-						if not tmp2[2] in PTMs: PTMs[tmp2[2]] = 0
-						PTMs[tmp2[2]] += 1
-					fpip.write('%s%i %s %s\n'%(sys.argv[2],specid,m[:-1],peptide))
-				else:
-					fpip.write('%s%i  %s\n'%(sys.argv[2],specid,peptide))
-
-				fmeta.write('%s%i %s %s %s %s %s\n'%(sys.argv[2],specid,charge,peptide,parentmz,purity,HCDenergy))
-
-				# THIS IS NOT A PROBLEM: MW is nothing
-				if tmp[0] == '0':
-					if 'X' in peptide: continue
-					tmp1 = 18.010601 + sum([AminoMass[x] for x in peptide])
-					tmp2 = (float(parentmz) * (float(charge))) - ((float(charge))*1.007825035) #or 0.0073??
-					if abs(tmp1-tmp2) > 0.5:
-						print "."
-
-
-				buf = "BEGIN IONS\n"
-				buf += "TITLE="+sys.argv[2]+str(specid) + '\n'
-				buf += "CHARGE="+str(charge) + '\n'
-				buf += "PEPMASS="+parentmz + '\n'
-				fmgf.write(buf+mgf+"END IONS"+'\n')
-
-				specid += 1
-				read_spec = False
-				mgf = ""
-				continue
+import os
+import re
+import mmap
+import argparse
+import multiprocessing
+from collections import Counter
+
+import mgf_index
+
+# the m/z and intensity of a peak line, the annotation is dropped
+peak_line = re.compile(br'^([0-9][^\s]*)[ \t]+([^\s]+)[^\n]*$',re.M)
+
+def find_chunks(filename,num_chunks):
+	"""Byte ranges of about equal size that start at a Name: record (or at the start of the file)."""
+	size = os.path.getsize(filename)
+	if size == 0:
+		return []
+	with open(filename,'rb') as f:
+		mm = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+		bounds = [0]
+		for k in range(1,num_chunks):
+			pos = mm.find(b'\nName:',max(bounds[-1],k*size//num_chunks))
+			if pos == -1: break
+			if pos+1 > bounds[-1]:
+				bounds.append(pos+1)
+		mm.close()
+	bounds.append(size)
+	return zip(bounds[:-1],bounds[1:])
+
+def read_chunk(filename,start,end):
+	with open(filename,'rb') as f:
+		f.seek(start)
+		return f.read(end-start)
+
+def convert_record(record):
+	"""
+	Convert one msp record (starting at its Name: line) to its PEPREC, meta and mgf text that follow the
+	spectrum title, and the modification names, or return None if it has no peaks. Comment: fields that are
+	missing from the record are left empty.
+	"""
+	(header,sep,peaks) = record.partition(b'\nNum peaks:')
+	if not sep:
+		return None
+	peptide = charge = None
+	parentmz = mods = purity = HCDenergy = b''
+	for row in header.split(b'\n'):
+		if row.startswith(b"Name:"):
+			l = row.rstrip().split(b' ')
+			tmp = l[1].split(b'/')
+			peptide = tmp[0].replace(b'(O)',b'')
+			charge = tmp[1].split(b'_')[0]
+		elif row.startswith(b"Comment:"):
+			for field in row.rstrip().split(b' ')[1:]:
+				if field.startswith(b"Mods="):
+					mods = field.split(b'=')[1]
+				elif field.startswith(b"Parent="):
+					parentmz = field.split(b'=')[1]
+				elif field.startswith(b"Purity="):
+					purity = field.split(b'=')[1]
+				elif field.startswith(b"HCD="):
+					HCDenergy = field.split(b'=')[1].replace(b'eV',b'')
+
+	ptms = []
+	tmp = mods.split(b'/') if mods else [b'0']
+	if tmp[0] != b'0':
+		m = []
+		for i in range(1,len(tmp)):
+			tmp2 = tmp[i].split(b',')
+			if (tmp2[0] == b'0') & (tmp2[2] == b'iTRAQ'):
+				m.append(b'0|'+tmp2[2])
 			else:
-				tt = float(l[1])
-				mgf += ' '.join([l[0],l[1]]) + '\n'
-				continue
-		if row.startswith("Name:"):
-			l = row.rstrip().split(' ')
-			tmp = l[1].split('/')
-			peptide = tmp[0].replace('(O)','')
-			charge = tmp[1].split('_')[0]
-			continue
-		if row.startswith("Comment:"):
-			l = row.rstrip().split(' ')
-			for i in range(1,len(l)):
-				if l[i].startswith("Mods="):
-					tmp = l[i].split('=')
-					mods = tmp[1]
-				if l[i].startswith("Parent="):
-					tmp = l[i].split('=')
-					parentmz = tmp[1]
-				if l[i].startswith("Purity="):
-					tmp = l[i].split('=')
-					purity = tmp[1]
-				if l[i].startswith("HCD="):
-					tmp = l[i].split('=')
-					HCDenergy = tmp[1].replace('eV','')
-			continue
-		if row.startswith("Num peaks:"):
-			read_spec = True
+				m.append(b'%i|%s%s'%(int(tmp2[0])+1,tmp2[2],peptide[int(tmp2[0]):int(tmp2[0])+1]))
+			ptms.append(tmp2[2])
+		pep = b' %s %s\n'%(b'|'.join(m),peptide)
+	else:
+		pep = b'  %s\n'%peptide
+	meta = b' %s %s %s %s %s\n'%(charge,peptide,parentmz,purity,HCDenergy)
+	# the peak lines follow the Num peaks: line
+	peaks = peaks[peaks.find(b'\n')+1:] if b'\n' in peaks else b''
+	peaks = b'\n'.join(map(b' '.join,peak_line.findall(peaks)))
+	mgf = b'\nCHARGE=%s\n%s%s%sEND IONS'%(charge,b'PEPMASS=%s\n'%parentmz if parentmz else b'',peaks,b'\n' if peaks else b'')
+	return (pep,meta,mgf,ptms)
+
+def convert_chunk(task):
+	"""
+	Convert the records of one chunk. Returns the number of records in the chunk, the converted records as
+	(k, PEPREC, meta, mgf) with k the number of the record in the chunk (see convert_record), and the
+	modification counts. The titles are added by add_titles once the records before the chunk are counted.
+	"""
+	(filename,start,end) = task
+	data = read_chunk(filename,start,end)
+	if not data:
+		return (0,[],Counter())
+	records = data.split(b'\nName:')
+	if records[0].startswith(b'Name:'):
+		records[0] = records[0][len(b'Name:'):]
+	else:
+		records = records[1:]
+	converted = []
+	ptms = []
+	for (k,record) in enumerate(records):
+		result = convert_record(b'Name:'+record)
+		if result is None:
 			continue
+		converted.append((k,)+result[:3])
+		ptms.extend(result[3])
+	return (len(records),converted,Counter(ptms))
+
+def add_titles(records,prefix,first_id):
+	"""
+	Return the PEPREC, meta and mgf text of the records of a chunk (from convert_chunk) with the titles
+	prefix<first_id+k>, and the (title, offset, length) index of the spectra in the mgf text.
+	"""
+	pep = []
+	meta = []
+	mgf = []
+	index = []
+	offset = 0
+	for (k,p,m,spectrum) in records:
+		title = b'%s%i'%(prefix,first_id+k)
+		pep.append(title+p)
+		meta.append(title+m)
+		mgf.append(b'BEGIN IONS\nTITLE='+title+spectrum)
+		index.append((title.replace(b' ',b''),offset,len(mgf[-1])))
+		offset += len(mgf[-1])+1
+	return (b''.join(pep),b''.join(meta),b'\n'.join(mgf)+b'\n' if mgf else b'',index)
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('msp_file', metavar='<msp file>',
+					 help='spectral library in .msp format')
+	parser.add_argument('title', metavar='<title>',
+					 help='prefix of the spectrum titles')
+	parser.add_argument('-m', metavar='INT',action="store", dest='num_cpu',type=int,default=multiprocessing.cpu_count(),
+					 help="number of cpu's to use")
+	parser.add_argument('-i', action="store_true", dest='index', default=False,
+					 help='also write the .mgf index (<mgf file>.idx) that ms2pipC.py reads')
+	args = parser.parse_args()
+
+	# chunks of at most 64 MB, at least 4 per worker
+	num_chunks = max(4*args.num_cpu,os.path.getsize(args.msp_file)//(64<<20)+1)
+	chunks = find_chunks(args.msp_file,num_chunks)
+	pool = multiprocessing.Pool(args.num_cpu)
+
+	fpip = open(args.msp_file+'.PEPREC','wb')
+	fpip.write(b"spec_id modifications peptide\n")
+	mgf_file = args.msp_file+'.PEPREC.mgf'
+	fmgf = open(mgf_file,'wb')
+	fmeta = open(args.msp_file+'.PEPREC.meta','wb')
+	index = []
+	PTMs = Counter()
+	first_id = 1
+	# the chunks are numbered and written in file order as soon as they are done
+	for (num_records,records,ptms) in pool.imap(convert_chunk,[(args.msp_file,start,end) for (start,end) in chunks]):
+		(pep,meta,mgf,chunk_index) = add_titles(records,args.title,first_id)
+		first_id += num_records
+		offset = fmgf.tell()
+		index.extend([(title,offset+pos,length) for (title,pos,length) in chunk_index])
+		fpip.write(pep)
+		fmeta.write(meta)
+		fmgf.write(mgf)
+		PTMs.update(ptms)
+	pool.close()
+	pool.join()
+	fmgf.close()
+	fpip.close()
+	fmeta.close()
+	if args.index:
+		# written after the .mgf is closed, so that it records its final size and mtime
+		mgf_index.write_index(index,mgf_file+'.idx',mgf_file)
 
-fmgf.close()
-fpip.close()
-fmeta.close()
+	print dict(PTMs)
 
-print PTMs
+if __name__ == "__main__":
+	main()
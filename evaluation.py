@@ -0,0 +1,80 @@
+"""
+Evaluation of predicted spectra
+
+The ions of all spectra are sorted by spectrum once, after which each metric
+is a sum over contiguous segments (np.add.reduceat), so that millions of ions
+are evaluated without a Python loop over the spectra.
+
+Targets and predictions are log2(intensity+0.001) values, as written by
+ms2pipC.py. Pearson and Spearman correlation and mean absolute error are
+computed on these values, the dot product (the cosine of the intensity
+vectors) and the spectral angle on the intensities.
+"""
+
+import numpy as np
+import pandas as pd
+
+metric_names = ['pearsonr','spearmanr','mae','spectral_angle','dot_product']
+
+def spectrum_metrics(data,spec_id='spec_id',target='target',prediction='prediction',groups=['charge','peplen'],log_offset=0.001):
+	"""
+	Return a DataFrame with the metric_names metrics of each spectrum in data
+	(one row per ion), its number of ions and the value of the groups columns,
+	indexed by spectrum id. Spectra with constant targets or predictions have
+	NaN correlations.
+	"""
+	columns = metric_names+['num_ions']+groups
+	if len(data) == 0:
+		return pd.DataFrame(columns=columns)
+	(codes,spec_ids) = pd.factorize(data[spec_id])
+	order = np.argsort(codes,kind='mergesort')
+	codes = codes[order]
+	x = data[target].values[order].astype(np.float64)
+	y = data[prediction].values[order].astype(np.float64)
+
+	starts = np.flatnonzero(np.concatenate([[True],codes[1:] != codes[:-1]]))
+	n = np.diff(np.append(starts,len(codes)))
+	segment_sum = lambda values: np.add.reduceat(values,starts)
+
+	def correlation(x,y):
+		dx = x-np.repeat(segment_sum(x)/n,n)
+		dy = y-np.repeat(segment_sum(y)/n,n)
+		return segment_sum(dx*dy)/np.sqrt(segment_sum(dx*dx)*segment_sum(dy*dy))
+
+	result = pd.DataFrame(index=pd.Index(spec_ids[codes[starts]],name=spec_id))
+	with np.errstate(invalid='ignore',divide='ignore'):
+		result['pearsonr'] = correlation(x,y)
+		# ranks within each spectrum, ties get their average rank
+		result['spearmanr'] = correlation(pd.Series(x).groupby(codes).rank().values,pd.Series(y).groupby(codes).rank().values)
+		result['mae'] = segment_sum(np.abs(x-y))/n
+		ix = np.maximum(np.power(2.,x)-log_offset,0)
+		iy = np.maximum(np.power(2.,y)-log_offset,0)
+		cos = segment_sum(ix*iy)/np.sqrt(segment_sum(ix*ix)*segment_sum(iy*iy))
+		result['spectral_angle'] = 1-2*np.arccos(np.clip(cos,-1,1))/np.pi
+		result['dot_product'] = cos
+	result['num_ions'] = n
+	for g in groups:
+		result[g] = data[g].values[order][starts]
+	return result[columns]
+
+def summarize(metrics,by=['charge','peplen']):
+	"""
+	Median metrics and number of spectra for each combination of the by
+	columns of spectrum_metrics, followed by a row for all spectra (with
+	'all' in the by columns).
+	"""
+	grouped = metrics.groupby(by)
+	summary = grouped[metric_names].median()
+	summary['num_spectra'] = grouped.size()
+	summary = summary.reset_index()
+	total = dict([(b,'all') for b in by])
+	for m in metric_names:
+		total[m] = metrics[m].median()
+	total['num_spectra'] = len(metrics)
+	return summary.append(total,ignore_index=True)[by+metric_names+['num_spectra']]
+
+def write_summary(metrics,filename,by=['charge','peplen']):
+	"""Write summarize(metrics,by) as a .csv file and return it."""
+	summary = summarize(metrics,by)
+	summary.to_csv(filename,index=False,float_format='%.4f')
+	return summary
@@ -0,0 +1,190 @@
+"""
+Run time instrumentation of ms2pipC.py (-r and -P)
+
+With -r the wall and CPU time of the stages of a run are recorded in the main
+process (reading the config, PEPREC and spectrum files, writing the output)
+and per worker (parsing and preprocessing spectra, encoding peptides,
+features, predictions, DataFrames), and written with the throughput and the
+peak memory use as a JSON report:
+
+	python ms2pipC.py -c config.file -m 4 -r report.json peptides.PEPREC
+
+Stages are timed with `with instrumentation.stage(name,items):` blocks, which
+do nothing unless the run is instrumented. Stages can be nested, a nested
+stage is reported as outer/inner. The CPU time is that of the whole process,
+so with -t (threads) it includes the other workers.
+
+With -P the stages with the given names (comma separated, or all) are also
+profiled with cProfile; the profile of a stage in each chunk is written to
+<report>.<stage>.<chunk>.prof, read them with pstats.
+"""
+
+import os
+import json
+import time
+import resource
+import cProfile
+import threading
+from collections import OrderedDict
+
+# the Stats of the chunk (or main process) that runs in this thread
+local = threading.local()
+
+def peak_rss():
+	"""Peak resident set size of this process, in MB."""
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.
+
+def worker_id():
+	thread = threading.current_thread()
+	if thread.name == 'MainThread':
+		return 'pid %i'%os.getpid()
+	return 'pid %i %s'%(os.getpid(),thread.name)
+
+class Stats(object):
+	"""Wall time, CPU time, calls and items per stage."""
+
+	def __init__(self,profile=(),prefix=None):
+		self.stages = OrderedDict()
+		self.stack = []
+		self.profile = profile
+		self.prefix = prefix
+		self.profiles = OrderedDict()
+		self.profiling = False
+
+	def add(self,name,wall,cpu,items,calls=1):
+		if name not in self.stages:
+			self.stages[name] = OrderedDict([('wall',0.),('cpu',0.),('calls',0),('items',0)])
+		s = self.stages[name]
+		s['wall'] += wall
+		s['cpu'] += cpu
+		s['calls'] += calls
+		s['items'] += items
+
+	def merge(self,stages):
+		for (name,s) in stages.items():
+			self.add(name,s['wall'],s['cpu'],s['items'],s['calls'])
+
+	def profiler(self,name):
+		"""The cProfile.Profile of stage name, if it is profiled."""
+		# cProfile can not nest, only the outermost profiled stage is profiled
+		if self.profiling or not ('all' in self.profile or name.split('/')[-1] in self.profile):
+			return None
+		if name not in self.profiles:
+			self.profiles[name] = cProfile.Profile()
+		return self.profiles[name]
+
+	def dump_profiles(self,chunk):
+		for (name,profile) in self.profiles.items():
+			profile.dump_stats('%s.%s.%s.prof'%(self.prefix,name.replace('/','.'),chunk))
+
+class Stage(object):
+	def __init__(self,stats,name,items):
+		self.stats = stats
+		self.name = name
+		self.items = items
+
+	def __enter__(self):
+		self.stats.stack.append(self.name)
+		self.name = '/'.join(self.stats.stack)
+		# an outer stage is listed before its inner stages
+		self.stats.add(self.name,0.,0.,0,0)
+		self.profile = self.stats.profiler(self.name)
+		if self.profile:
+			self.stats.profiling = True
+			self.profile.enable()
+		self.wall = time.time()
+		self.cpu = time.clock()
+		return self
+
+	def __exit__(self,*exc):
+		self.stats.add(self.name,time.time()-self.wall,time.clock()-self.cpu,self.items)
+		if self.profile:
+			self.profile.disable()
+			self.stats.profiling = False
+		self.stats.stack.pop()
+		return False
+
+class NullStage(object):
+	items = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self,*exc):
+		return False
+
+null_stage = NullStage()
+
+def stage(name,items=0):
+	"""
+	Time a block as stage name, with items the number of peptides or spectra
+	it handles (can also be set on the stage in the block).
+	"""
+	stats = getattr(local,'stats',None)
+	if stats is None:
+		return null_stage
+	return Stage(stats,name,items)
+
+def run_chunk(task):
+	"""Like scheduler.run_chunk, returns (i,(result,summary)) with the Stats of the chunk."""
+	(func,i,fargs,size,profile,prefix) = task
+	stats = local.stats = Stats(profile,prefix)
+	try:
+		with stage(func.__name__,size):
+			result = func(i,*fargs)
+	finally:
+		del local.stats
+	stats.dump_profiles(i)
+	return (i,(result,{'worker':worker_id(),'stages':stats.stages,'peak_rss_mb':peak_rss()}))
+
+class Report(object):
+	"""The Stats of the main process and the workers of a run."""
+
+	def __init__(self,filename,profile=()):
+		self.filename = filename
+		self.stats = local.stats = Stats(profile,filename)
+		self.workers = OrderedDict()
+		self.counts = OrderedDict()
+		self.wall = time.time()
+		self.cpu = time.clock()
+
+	def job(self,func,i,fargs,size):
+		"""The task of instrumentation.run_chunk for func(i,*fargs)."""
+		return (func,i,fargs,size,self.stats.profile,self.filename)
+
+	def result(self,output):
+		"""The result of func from the output of run_chunk, its Stats are added to the report."""
+		(i,(result,summary)) = output
+		worker = self.workers.setdefault(summary['worker'],{'chunks':0,'peak_rss_mb':0.,'stages':Stats()})
+		worker['chunks'] += 1
+		worker['peak_rss_mb'] = max(worker['peak_rss_mb'],summary['peak_rss_mb'])
+		worker['stages'].merge(summary['stages'])
+		return result
+
+	def count(self,unit,n):
+		"""Count n peptides or spectra for the throughput."""
+		self.counts[unit] = self.counts.get(unit,0)+n
+
+	def write(self):
+		wall = time.time()-self.wall
+		total = Stats()
+		for w in self.workers.values():
+			total.merge(w['stages'].stages)
+		report = OrderedDict([
+			('wall_time',wall),
+			('cpu_time',time.clock()-self.cpu),
+			# the children are the worker processes that have ended
+			('peak_rss_mb',OrderedDict([('main',peak_rss()),
+				('workers',max([w['peak_rss_mb'] for w in self.workers.values()] or [resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss/1024.]))])),
+			('throughput',OrderedDict([('%s_per_s'%unit,n/wall if wall > 0 else 0.) for (unit,n) in self.counts.items()])),
+			('counts',self.counts),
+			('main',self.stats.stages),
+			('workers_total',total.stages),
+			('workers',OrderedDict([(name,OrderedDict([('chunks',w['chunks']),('peak_rss_mb',w['peak_rss_mb']),('stages',w['stages'].stages)]))
+				for (name,w) in self.workers.items()]))])
+		with open(self.filename,'w') as f:
+			json.dump(report,f,indent=1,separators=(',',': '))
+			f.write('\n')
+		self.stats.dump_profiles('main')
+		del local.stats
+		return report
@@ -0,0 +1,180 @@
+"""
+Index and parse .mgf spectrum files
+
+The index lists every BEGIN IONS ... END IONS block in the file as
+(title, byte offset, byte length), in file order. It is built in one pass over
+a memory-mapped file and saved next to the .mgf as <mgf>.idx, so that workers
+can seek straight to their own spectra instead of each parsing the whole file.
+"""
+
+import os
+import re
+import mmap
+import numpy as np
+
+# the peak list starts at the first line that starts with a digit
+peaks_start = re.compile(b'\n[0-9]')
+
+def index_spectrum_file(filename):
+	"""
+	Scan the .mgf file once and return a list of (title, offset, length)
+	tuples, one for each spectrum. Spaces are removed from the titles.
+	"""
+	index = []
+	with open(filename,'rb') as f:
+		if os.fstat(f.fileno()).st_size == 0:
+			return index
+		mm = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+		pos = mm.find(b'BEGIN IONS')
+		while pos != -1:
+			end = mm.find(b'END IONS',pos)
+			if end == -1: break
+			end += len(b'END IONS')
+			t = mm.find(b'\nTITLE=',pos,end)
+			if t != -1:
+				t += len(b'\nTITLE=')
+				title = mm[t:mm.find(b'\n',t,end)].rstrip().replace(b' ',b'')
+				index.append((title,pos,end-pos))
+			pos = mm.find(b'BEGIN IONS',end)
+		mm.close()
+	return index
+
+def mgf_stat(filename):
+	"""The (size, mtime) of the .mgf file, which an index is only valid for."""
+	st = os.stat(filename)
+	return (st.st_size,st.st_mtime)
+
+def write_index(index,filename,mgf_file=None):
+	"""
+	Write the index to filename, with the size and mtime of mgf_file (the
+	.mgf file it was built from) in the first line if given. The index is
+	written to a temporary file that is then renamed, so that an interrupted
+	or concurrent run never leaves a partial index behind.
+	"""
+	tmp_file = '%s.%i.tmp'%(filename,os.getpid())
+	try:
+		with open(tmp_file,'w') as f:
+			if mgf_file:
+				f.write("#size=%i\tmtime=%r\n"%mgf_stat(mgf_file))
+			f.write("title\toffset\tlength\n")
+			for (title,offset,length) in index:
+				f.write("%s\t%i\t%i\n"%(title,offset,length))
+		os.rename(tmp_file,filename)
+	finally:
+		if os.path.exists(tmp_file):
+			os.remove(tmp_file)
+
+def read_index_stat(filename):
+	"""The (size, mtime) of the .mgf file recorded in the index, None if there is none."""
+	with open(filename) as f:
+		row = f.readline()
+	if not row.startswith('#'):
+		return None
+	stat = dict([kv.split('=',1) for kv in row[1:].rstrip('\n').split('\t')])
+	return (int(stat['size']),float(stat['mtime']))
+
+def read_index(filename):
+	index = []
+	with open(filename) as f:
+		row = f.readline()
+		if row.startswith('#'):
+			f.readline()
+		for row in f:
+			l = row.rstrip('\n').split('\t')
+			index.append((l[0],int(l[1]),int(l[2])))
+	return index
+
+def load_index(filename):
+	"""
+	Return the index of the .mgf file. The <mgf>.idx sidecar file is read when
+	it records the current size and mtime of the .mgf file, otherwise the index
+	is built and saved.
+	"""
+	idx_file = filename + '.idx'
+	if os.path.exists(idx_file) and read_index_stat(idx_file) == mgf_stat(filename):
+		return read_index(idx_file)
+	index = index_spectrum_file(filename)
+	try:
+		write_index(index,idx_file,filename)
+	except (IOError,OSError):
+		pass # the index is only a cache, e.g. the .mgf directory is read-only
+	return index
+
+def read_spectrum(f,offset,length):
+	"""Return the text of one BEGIN IONS ... END IONS block from open file f."""
+	f.seek(offset)
+	return f.read(length)
+
+def parse_spectrum(spectrum):
+	"""
+	Parse the text of one BEGIN IONS ... END IONS block and return
+	(title, charge, msms, peaks), with the peak m/z values and intensities as
+	float64 arrays.
+	"""
+	end = spectrum.rfind(b'END IONS')
+	m = peaks_start.search(spectrum,0,end)
+	if m:
+		header = spectrum[:m.start()]
+		body = spectrum[m.start()+1:end]
+	else:
+		header = spectrum[:end]
+		body = b''
+	(title,charge,pepmass) = parse_header(header)
+	(msms,peaks) = parse_peaks(body)
+	return (title,charge,msms,peaks)
+
+def parse_header(header):
+	"""Return (title, charge, pepmass) from the lines of a spectrum before its peaks."""
+	title = ""
+	charge = 0
+	pepmass = 0.
+	for row in header.split(b'\n'):
+		if row[:5] == b"TITLE":
+			title = row.rstrip()[6:].replace(b' ',b'')
+		elif row[:6] == b"CHARGE":
+			charge = int(row[7:9].replace(b"+",b""))
+		elif row[:7] == b"PEPMASS":
+			pepmass = float(row[8:].split()[0])
+	return (title,charge,pepmass)
+
+def read_headers(filename,index):
+	"""
+	Return the charge and precursor m/z (PEPMASS) of each spectrum in the
+	index of the .mgf file, as arrays. Only the lines before the peaks are
+	read.
+	"""
+	charges = np.zeros(len(index),dtype=np.int32)
+	pepmasses = np.zeros(len(index),dtype=np.float64)
+	with open(filename,'rb') as f:
+		if os.fstat(f.fileno()).st_size == 0:
+			return (charges,pepmasses)
+		mm = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+		for (k,(title,offset,length)) in enumerate(index):
+			m = peaks_start.search(mm,offset,offset+length)
+			(title,charges[k],pepmasses[k]) = parse_header(mm[offset:m.start() if m else offset+length])
+		mm.close()
+	return (charges,pepmasses)
+
+def parse_peaks(body):
+	"""
+	Convert a block of peak lines to (msms, peaks) arrays. Plain numeric
+	blocks are parsed in one call to numpy, blocks with annotations or other
+	text fall back to parsing line by line.
+	"""
+	first = body[:body.find(b'\n')].split()
+	if (b'#' not in body) and (b'=' not in body) and (len(first) >= 2):
+		values = np.fromstring(body,dtype=np.float64,sep=' ')
+		# only if every line has as many values as the first, lines with an
+		# extra column (a peak charge) would shift all values after them
+		if len(values) == len(first)*(body.rstrip(b'\n').count(b'\n')+1):
+			values = values.reshape(-1,len(first))
+			return (values[:,0].copy(),values[:,1].copy())
+	msms = []
+	peaks = []
+	for row in body.split(b'\n'):
+		row = row.rstrip()
+		if (row != b"") and row[:1].isdigit():
+			tmp = row.split()
+			msms.append(float(tmp[0]))
+			peaks.append(float(tmp[1]))
+	return (np.array(msms,dtype=np.float64),np.array(peaks,dtype=np.float64))
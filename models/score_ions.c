@@ -0,0 +1,21 @@
+// score_ions for the B and Y models included before this file, as array
+// models (see tree_models.py) or, with -DMS2PIP_TREE_IFS, as nested if models
+
+static void score_ions(unsigned int* vs, int num_ions, int stride, float* b, float* y)
+	{
+	int i;
+#ifdef MS2PIP_TREE_ARRAYS
+	// walk each tree over all ions while it is in cache
+	for (i=0; i < num_ions; i++) {
+		b[i] = 0.;
+		y[i] = 0.;
+	}
+	score_forest_batch(&forest_B, vs, num_ions, stride, b);
+	score_forest_batch(&forest_Y, vs, num_ions, stride, y);
+#else
+	for (i=0; i < num_ions; i++) {
+		b[i] = score_B(vs+i*stride);
+		y[i] = score_Y(vs+i*stride);
+	}
+#endif
+}
@@ -0,0 +1,60 @@
+// Generic evaluator for XGBoost forests stored as flat node arrays
+// (written by tree_models.write_c_model_arrays)
+
+#ifndef TREE_EVAL_C
+#define TREE_EVAL_C
+
+typedef struct {
+	unsigned int feature;    // go to left if v[feature] < threshold, else to right
+	unsigned int threshold;
+	int left;                // leaves point to themselves
+	int right;
+} tree_node;
+
+typedef struct {
+	int num_trees;
+	const int* roots;        // first node of each tree
+	const int* depths;       // number of steps from the root to the deepest leaf
+	const tree_node* nodes;
+	const double* value;     // leaf values
+} tree_forest;
+
+static float score_forest(const tree_forest* forest, unsigned int* v) {
+	int t, d, n;
+	const tree_node* node;
+	float s = 0.;
+	for (t=0; t < forest->num_trees; t++) {
+		n = forest->roots[t];
+		for (d=0; d < forest->depths[t]; d++) {
+			node = &forest->nodes[n];
+			n = (v[node->feature] < node->threshold) ? node->left : node->right;
+		}
+		s = s + forest->value[n];
+	}
+	return s;
+}
+
+// Score num_rows feature vectors, stored row after row stride values apart,
+// one tree at a time so that each tree stays in cache while it is walked for
+// all rows. The scores are added to out, which the caller initialises.
+static void score_forest_batch(const tree_forest* forest, unsigned int* v, int num_rows, int stride, float* out) {
+	int t, d, r, n, root, depth;
+	const tree_node* node;
+	unsigned int* row;
+	for (t=0; t < forest->num_trees; t++) {
+		root = forest->roots[t];
+		depth = forest->depths[t];
+		row = v;
+		for (r=0; r < num_rows; r++) {
+			n = root;
+			for (d=0; d < depth; d++) {
+				node = &forest->nodes[n];
+				n = (row[node->feature] < node->threshold) ? node->left : node->right;
+			}
+			out[r] = out[r] + forest->value[n];
+			row += stride;
+		}
+	}
+}
+
+#endif
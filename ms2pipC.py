@@ -4,8 +4,18 @@ import pandas as pd
 import pickle
 import argparse
 import multiprocessing
-from random import shuffle
+from multiprocessing.pool import ThreadPool
+from collections import deque
 import tempfile
+import mmap
+import mgf_index
+import scheduler
+import prediction_cache
+import vector_file
+import evaluation
+import spectrum_library
+import spectrum_preprocessing
+import instrumentation
 #import xgboost as xgb
 
 #some globals
@@ -18,6 +28,11 @@ masses = [71.037114,103.00919,115.026943,129.042593,147.068414,57.021464,137.058
 a_map = {}
 for i,a in enumerate(aminos):
 	a_map[a] = i
+# the same mapping as a lookup table on the characters of the peptides
+a_codes = np.full(256,0xffff,dtype=np.uint16)
+for a in a_map:
+	a_codes[ord(a)] = a_map[a]
+a_codes[ord('L')] = a_map['I']
 		
 def main():
 
@@ -28,12 +43,26 @@ def main():
 					 help='config file')
 	parser.add_argument('-s', metavar='FILE',action="store", dest='spec_file',
 					 help='.mgf MS2 spectrum file (optional)')
+	parser.add_argument('-e', action="store_true", dest='ion_file', default=False,
+					 help='with -s, also write the targets and predictions of all ions (<peptide file>_pred_and_emp.csv)')
 	parser.add_argument('-w', metavar='FILE',action="store", dest='vector_file',
-					 help='write feature vectors to FILE.pkl (optional)')
+					 help='write feature vectors to FILE (.h5, .parquet or .pkl, optional)')
  	parser.add_argument('-i', action="store_true", default=False, help='iTRAQ models')
  	parser.add_argument('-p', action="store_true", default = False, help='phospho models')
 	parser.add_argument('-m', metavar='INT',action="store", dest='num_cpu',default='23',
 					 help="number of cpu's to use")
+	parser.add_argument('-n', metavar='INT',action="store", dest='chunk_size',type=int,
+					 help='stream the peptide file in chunks of INT peptides (predictions only)')
+	parser.add_argument('-t', action="store_true", dest='threads', default=False,
+					 help='use threads instead of processes for the -m workers')
+	parser.add_argument('-k', metavar='FILE',action="store", dest='cache',
+					 help='cache predictions in SQLite database FILE (predictions only)')
+	parser.add_argument('-l', metavar='FORMATS',action="store", dest='library',
+					 help='also write the predictions as a spectral library <peptide file>_predictions.<FORMAT> (mgf, msp and/or bin, comma separated)')
+	parser.add_argument('-r', metavar='FILE',action="store", dest='report',
+					 help='write the time per stage, throughput and memory use as a JSON report to FILE (see instrumentation.py)')
+	parser.add_argument('-P', metavar='STAGES',action="store", dest='profile',
+					 help='with -r, profile the stages (comma separated, or all) with cProfile to <FILE>.<stage>.<chunk>.prof')
 
 	args = parser.parse_args()
 
@@ -42,119 +71,114 @@ def main():
 		exit(1)
 
 	num_cpu = int(args.num_cpu)
-			
-	PTMmap = {}
-	Ntermmap = {}
-	Ctermmap = {}
-	fragmethod = "none" # CID or HCD
-	fragerror = 0
-	# reading the configfile (-c) and configure the ms2pipfeatures_pyx module's datastructures
-	fa = tempfile.NamedTemporaryFile(delete=False)
-	numptms = 0
-	with open(args.c) as f:
-		for row in f:
-			if row.startswith("ptm="): numptms+=1
-			if row.startswith("sptm="): numptms+=1
-	fa.write("%i\n"%numptms)
-	pos = 38 #modified amino acids have numbers starting at 38 (mutations -> omega)
-	with open(args.c) as f:
-		for row in f:
-			if row.startswith("sptm="):
-				l=row.rstrip().split('=')[1].split(',')
-				fa.write("%f\n"%(float(l[1])+masses[a_map[l[3]]]))
-				PTMmap[l[0]] = pos
-				pos+=1
-	with open(args.c) as f:
-		for row in f:
-			if row.startswith("ptm="):
-				l=row.rstrip().split('=')[1].split(',')
-				fa.write("%f\n"%(float(l[1])+masses[a_map[l[3]]]))
-				PTMmap[l[0]] = pos
-				pos+=1
-			if row.startswith("nterm="):
-				l=row.rstrip().split('=')[1].split(',')
-				Ntermmap[l[0]] = float(l[1])
-			if row.startswith("cterm="):
-				l=row.rstrip().split('=')[1].split(',')
-				Ctermmap[l[0]] = float(l[1])
-			if row.startswith("frag_method="):
-				fragmethod=row.rstrip().split('=')[1]
-			if row.startswith("frag_error="):
-				fragerror=float(row.rstrip().split('=')[1])
 
-	fa.close()
-
-	if fragmethod == "CID":
-		import ms2pipfeatures_pyx_CID as ms2pipfeatures_pyx
-		print "using CID models..."
-	elif fragmethod == "HCD":
-		if args.i:
-			if args.p:
-				import ms2pipfeatures_pyx_HCDiTRAQ4phospho as ms2pipfeatures_pyx
-				print "using HCD iTRAQ phospho models..."
-			else:
-				import ms2pipfeatures_pyx_HCDiTRAQ4 as ms2pipfeatures_pyx
-				print "using HCD iTRAQ pmodels..."
-		else:
-			import ms2pipfeatures_pyx_HCD as ms2pipfeatures_pyx
-			print "using HCD..."
-	else:
-		print "Unknown fragmentation method in configfile: %s"%fragmethod
-		exit(1)
-			
-	ms2pipfeatures_pyx.ms2pip_init(fa.name)
+	report = None
+	if args.report:
+		report = instrumentation.Report(args.report,args.profile.split(',') if args.profile else ())
+
+	with instrumentation.stage('config'):
+		(PTMmap,Ntermmap,Ctermmap,fragmethod,fragerror,ptm_file) = read_config(args.c)
+
+		# all models are compiled into one module, the model that follows from
+		# the config file and -i/-p is used for the peptides that do not have
+		# one in the (optional) model column of the PEPREC file
+		import ms2pipfeatures_pyx
+		model = default_model(fragmethod,args)
+		if model is None:
+			print "Unknown fragmentation method in configfile: %s"%fragmethod
+			exit(1)
+		print "using %s models..."%model
+
+		ms2pipfeatures_pyx.ms2pip_init(ptm_file)
+
+	library = None
+	if args.library and not args.spec_file:
+		try:
+			library = spectrum_library.LibraryWriter(args.pep_file +'_predictions',args.library.split(','))
+		except ValueError as e:
+			print e
+			exit(1)
+
+	if args.chunk_size and not args.spec_file:
+		# Get only predictions from a pep_file that is read, predicted and
+		# written chunk by chunk, memory use depends on the chunk size only
+		predict_streaming(args,PTMmap,Ntermmap,Ctermmap,model,num_cpu,library,report)
+		write_report(report)
+		return
 
 	# read peptide information
 	# the file contains the following columns: spec_id, modifications, peptide and charge
-	data = pd.read_csv(	args.pep_file,
-						sep=' ',
-						index_col=False,
-						dtype={'spec_id':str,'modifications':str})
-	data = data.fillna('-') # for some reason the missing values are converted to float otherwise
+	# and optionally model
+	with instrumentation.stage('read_peprec') as s:
+		data = read_peprec(args.pep_file)
+		s.items = len(data)
+	try:
+		get_models(data,model)
+	except ValueError as e:
+		print e
+		exit(1)
 
 	if args.spec_file:
 		# Process the mgf file. In process_spectra, there is a check for
 		# args.vector_file that determines what is returned (feature vectors or
 		# evaluation of predictions)
+		try:
+			spectrum_preprocessing.read_config(args.c,bool(args.vector_file))
+		except ValueError as e:
+			print e
+			exit(1)
 
 		# processing the mgf file:
-		# this is parallelized at the spectrum TITLE level
+		# this is parallelized over chunks of PSMs
 		sys.stdout.write('scanning spectrum file... ')
-		titles = scan_spectrum_file(args.spec_file)
-		#titles might be ordered from small to large peptides,
-		#shuffling improves parallel speeds
-		shuffle(titles)
-		num_spectra_per_cpu = int(len(titles)/(num_cpu))
-		sys.stdout.write("%i spectra (%i per cpu)\n"%(len(titles),num_spectra_per_cpu))
+		with instrumentation.stage('scan_spectra') as s:
+			# the byte offsets of all spectra, workers seek to their own spectra
+			spectra = {}
+			for entry in mgf_index.load_index(args.spec_file):
+				spectra.setdefault(entry[0],[]).append(entry)
+			psms = data[data.spec_id.isin(spectra)].drop_duplicates('spec_id',keep='last')
+			s.items = len(spectra)
+		sys.stdout.write("%i spectra, %i with a peptide\n"%(len(spectra),len(psms)))
 
 		sys.stdout.write('starting workers...\n')
 
-		myPool = multiprocessing.Pool(num_cpu)
+		myPool = make_pool(args,num_cpu)
 
-		results = []
-		i = 0
-		for i in range(num_cpu-1):
-			#select titles for this worker
-			tmp = titles[i*num_spectra_per_cpu:(i+1)*num_spectra_per_cpu]
+		# chunks of about equal summed peptide length, longest peptides first
+		tasks = []
+		for idx in scheduler.make_chunks(psms.peptide.str.len().values,num_cpu):
+			chunk = psms.iloc[idx]
 			# this commented part of code can be used for debugging by avoiding parallel processing
-			sys.stderr.write('ok')
-			#process_spectra(i,args, data[data.spec_id.isin(tmp)],PTMmap,Ntermmap,Ctermmap,fragmethod,fragerror)
-			#send worker to myPool
-			results.append(myPool.apply_async(process_spectra,args=(
-										i,
-										args,
-										data[data.spec_id.isin(tmp)],
-										PTMmap,Ntermmap,Ctermmap,fragmethod,fragerror
-										)))
-		i+=1
-		#some titles might be left
-		tmp = titles[i*num_spectra_per_cpu:]
-		results.append(myPool.apply_async(process_spectra,args=(
-								i,
-								args,
-								data[data.spec_id.isin(tmp)],
-								PTMmap,Ntermmap,Ctermmap,fragmethod,fragerror
-								)))
+			#process_spectra(0,args,chunk,[e for t in chunk.spec_id for e in spectra[t]],PTMmap,Ntermmap,Ctermmap,model,fragerror)
+			tasks.append(((args,
+						chunk,
+						[e for t in chunk.spec_id for e in spectra[t]],
+						PTMmap,Ntermmap,Ctermmap,model,fragerror
+						),len(chunk)))
+		if args.vector_file:
+			# the feature vectors of each chunk are appended to the output
+			# file as soon as the chunk is done, in task order
+			sys.stdout.write('writing feature vectors to %s\n'%args.vector_file)
+			writer = vector_file.VectorWriter(args.vector_file,
+						psms.spec_id.str.len().max(),
+						(psms.peptide.str.len()-1).sum())
+			with instrumentation.stage('workers'):
+				scheduler.run_chunks(myPool,process_spectra,tasks,'spectra',consume=writer.append,report=report)
+			writer.close()
+		else:
+			# the workers evaluate their own spectra, with -e the ion level
+			# targets and predictions are appended to a file as they come
+			all_metrics = []
+			ion_file = open(args.pep_file + '_pred_and_emp.csv','w') if args.ion_file else None
+			def consume(result):
+				(metrics,ions) = result
+				all_metrics.append(metrics)
+				if ion_file:
+					ions.to_csv(ion_file,index=False,header=(ion_file.tell() == 0))
+			with instrumentation.stage('workers'):
+				scheduler.run_chunks(myPool,process_spectra,tasks,'spectra',consume=consume,report=report)
+			if ion_file:
+				ion_file.close()
 
 		myPool.close()
 		myPool.join()
@@ -162,382 +186,475 @@ def main():
 		# workers done...merging results
 
 		if args.vector_file:
-			sys.stdout.write('\nmerging results...\n')
-			# i.e. if we want to save the features + targets:
-			# read feature vectors from workers and concatenate
-			all_vectors = []
-			for r in results:
-				all_vectors.append(r.get())
-			all_vectors = pd.concat(all_vectors)
-
-			sys.stdout.write('writing file... \n')
-  			# write result. write format depends on extension:
-  			ext = args.vector_file.split('.')[-1]
-  			if ext == 'pkl':
-				# print all_vectors.head()
-				all_vectors.to_pickle(args.vector_file+'.pkl')
-  			elif ext == 'h5':
-				all_vectors.to_hdf(args.vector_file, 'table')
-    			# 'table' is a tag used to read back the .h5
-  			else: # if none of the two, default to .h5
-				all_vectors.to_hdf(args.vector_file, 'table')
-
+			sys.stdout.write('%i feature vectors written\n'%writer.num_rows)
 		else:
-			sys.stdout.write('\nmerging results...\n')
-			all_spectra = []
-			for r in results:
-				all_spectra.append(r.get())
-			all_spectra = pd.concat(all_spectra)
-
-			sys.stdout.write('writing file...\n')
-			all_spectra.to_csv(args.pep_file + '_pred_and_emp.csv', index=False)
-
-			#sys.stdout.write('computing correlations...\n')
-			#correlations = all_spectra.groupby('spec_id')[['target', 'prediction']].corr().ix[0::2,'prediction']			
-			#corr_boxplot = correlations.plot('box')
-			#corr_boxplot = corr_boxplot.get_figure()
-			#corr_boxplot.suptitle('Pearson corr for ' + args.spec_file + ' and predictions')
-			#corr_boxplot.savefig(args.pep_file + '_correlations.png')
+			sys.stdout.write('writing files...\n')
+			with instrumentation.stage('write_output'):
+				metrics = pd.concat(all_metrics) if all_metrics else evaluation.spectrum_metrics(pd.DataFrame())
+				metrics.to_csv(args.pep_file + '_spectrum_metrics.csv',float_format='%.4f')
+				summary = evaluation.write_summary(metrics,args.pep_file + '_evaluation.csv')
+			sys.stdout.write(summary.tail(1).to_string(index=False)+'\n')
 
 		sys.stdout.write('done! \n')
 
 	else:
 		# Get only predictions from a pep_file
-		sys.stdout.write('scanning peptide file... ')
-
-		#titles might be ordered from small to large peptides,
-		#shuffling improves parallel speeds
-		titles = data.spec_id.tolist()
-		shuffle(titles)
-		num_pep_per_cpu = int(len(titles)/(num_cpu))
-		sys.stdout.write("%i peptides (%i per cpu)\n"%(len(titles),num_pep_per_cpu))
+		data = data.drop_duplicates('spec_id',keep='last')
+		sys.stdout.write("%i peptides\n"%len(data))
 
 		sys.stdout.write('starting workers...\n')
-		myPool = multiprocessing.Pool(num_cpu)
+		myPool = make_pool(args,num_cpu)
 
 		sys.stdout.write('predicting spectra... \n')
-		results = []
-		i = 0
-		for i in range(num_cpu-1):
-			#select titles for this worker			
-			tmp = titles[i*num_pep_per_cpu:(i+1)*num_pep_per_cpu]
+		# chunks of about equal summed peptide length, longest peptides first
+		tasks = []
+		for idx in scheduler.make_chunks(data.peptide.str.len().values,num_cpu):
+			chunk = data.iloc[idx]
 			"""
-			process_peptides(i,args,data[data.spec_id.isin(tmp)],PTMmap,Ntermmap,Ctermmap,fragmethod)
+			process_peptides(0,args,chunk,PTMmap,Ntermmap,Ctermmap,model)
 			"""
-			results.append(myPool.apply_async(process_peptides,args=(
-										i,
-										args,
-										data[data.spec_id.isin(tmp)],
-										PTMmap,Ntermmap,Ctermmap,fragmethod
-										)))
-		#some titles might be left
-		i+=1
-		tmp = titles[i*num_pep_per_cpu:]
-		results.append(myPool.apply_async(process_peptides,args=(
-								i,
-								args,
-								data[data.spec_id.isin(tmp)],
-								PTMmap,Ntermmap,Ctermmap,fragmethod
-								)))
+			tasks.append(((args,
+						chunk,
+						PTMmap,Ntermmap,Ctermmap,model
+						),len(chunk)))
+		with instrumentation.stage('workers'):
+			results = scheduler.run_chunks(myPool,process_peptides,tasks,report=report)
 
 		myPool.close()
 		myPool.join()
 
-		sys.stdout.write('\nmerging results...\n')
-
-		all_preds = pd.DataFrame()
-		for r in results:
-			all_preds = all_preds.append(r.get())
-
-		# print all_preds
-		sys.stdout.write('writing files...\n')
-		all_preds.to_csv(args.pep_file +'_predictions.csv', index=False)
-		mgf = False # prevent writing big mgf files
-		if mgf:
-			sys.stdout.write('\nwriting mgf file...\n')
-			mgf_output = open(args.pep_file +'_predictions.mgf', 'w+')
-			for sp in all_preds.spec_id.unique():
-				tmp = all_preds[all_preds.spec_id == sp]
-				tmp = tmp.sort_values('mz')
-				mgf_output.write('BEGIN IONS\n')
-				mgf_output.write('TITLE=' + str(sp) + '\n')
-				mgf_output.write('CHARGE=' + str(tmp.charge[0]) +'\n')
-				for i in range(len(tmp)):
-					mgf_output.write(str(tmp['mz'][i]) + ' ' + str(tmp['prediction'][i]) + '\n')
-				mgf_output.write('END IONS\n')
-			mgf_output.close()
+		sys.stdout.write('merging results...\n')
+
+		with instrumentation.stage('write_output'):
+			all_preds = pd.concat(results,ignore_index=True)
+
+			# print all_preds
+			sys.stdout.write('writing files...\n')
+			all_preds.to_csv(args.pep_file +'_predictions.csv', index=False)
+			if library:
+				sys.stdout.write('writing spectral library...\n')
+				library.append(all_preds,data)
+				library.close()
 		sys.stdout.write('done!\n')
 
+	write_report(report)
+
+def write_report(report):
+	if report:
+		report.write()
+		sys.stdout.write('report written to %s\n'%report.filename)
 
-#peak intensity prediction without spectrum file (under construction)
-def process_peptides(worker_num,args,data,PTMmap,Ntermmap,Ctermmap,fragmethod):
-	"""
-	Read the PEPREC file and predict spectra.
-	"""
 
+#the model for the peptides without a model column, CID or HCD from the config
+#file, HCD with -i and -p selects the iTRAQ (phospho) models
+def default_model(fragmethod,args):
 	if fragmethod == "CID":
-		import ms2pipfeatures_pyx_CID as ms2pipfeatures_pyx
+		return "CID"
 	elif fragmethod == "HCD":
 		if args.i:
 			if args.p:
-				import ms2pipfeatures_pyx_HCDiTRAQ4phospho as ms2pipfeatures_pyx
-			else:
-				import ms2pipfeatures_pyx_HCDiTRAQ4 as ms2pipfeatures_pyx
-		else:
-			import ms2pipfeatures_pyx_HCD as ms2pipfeatures_pyx
+				return "HCDiTRAQ4phospho"
+			return "HCDiTRAQ4"
+		return "HCD"
+	return None
+
+#the model number (in ms2pipfeatures_pyx.MODELS) of each PEPREC row, from its
+#model column or the default model
+def get_models(data,model):
+	import ms2pipfeatures_pyx
+	if 'model' in data.columns:
+		names = np.array(data.model,dtype=object)
+		names[names == '-'] = model
 	else:
-		print "Unknown fragmentation method in configfile: %s"%fragmethod
-		exit(1)
-
-	# transform pandas datastructure into dictionary for easy access
-	specdict = data[['spec_id','peptide','modifications','charge']].set_index('spec_id').to_dict()
-	peptides = specdict['peptide']
-	modifications = specdict['modifications']
-	charges = specdict['charge']
+		names = np.array([model]*len(data),dtype=object)
+	codes = pd.Categorical(names,categories=ms2pipfeatures_pyx.MODELS).codes
+	if np.any(codes < 0):
+		raise ValueError("Unknown model(s) in peptide file: %s (known models: %s)"%(
+			", ".join(sorted(set(names[codes < 0]))),", ".join(ms2pipfeatures_pyx.MODELS)))
+	return codes.astype(np.int32)
+
+#the -m workers are processes, or threads with -t. Threads share the peptides
+#and models of this process, the C code runs without the GIL
+def make_pool(args,num_cpu):
+	if args.threads:
+		return ThreadPool(num_cpu)
+	return multiprocessing.Pool(num_cpu)
+
+#read the configfile (-c), the amino acid masses of the PTMs are written to a
+#temporary file that is used to configure the ms2pipfeatures_pyx module's datastructures
+def read_config(config_file):
+	PTMmap = {}
+	Ntermmap = {}
+	Ctermmap = {}
+	fragmethod = "none" # CID or HCD
+	fragerror = (0,0) # (Da, ppm)
+	# reading the configfile (-c) and configure the ms2pipfeatures_pyx module's datastructures
+	fa = tempfile.NamedTemporaryFile(delete=False)
+	numptms = 0
+	with open(config_file) as f:
+		for row in f:
+			if row.startswith("ptm="): numptms+=1
+			if row.startswith("sptm="): numptms+=1
+	fa.write("%i\n"%numptms)
+	pos = 38 #modified amino acids have numbers starting at 38 (mutations -> omega)
+	with open(config_file) as f:
+		for row in f:
+			if row.startswith("sptm="):
+				l=row.rstrip().split('=')[1].split(',')
+				fa.write("%f\n"%(float(l[1])+masses[a_map[l[3]]]))
+				PTMmap[l[0]] = pos
+				pos+=1
+	with open(config_file) as f:
+		for row in f:
+			if row.startswith("ptm="):
+				l=row.rstrip().split('=')[1].split(',')
+				fa.write("%f\n"%(float(l[1])+masses[a_map[l[3]]]))
+				PTMmap[l[0]] = pos
+				pos+=1
+			if row.startswith("nterm="):
+				l=row.rstrip().split('=')[1].split(',')
+				Ntermmap[l[0]] = float(l[1])
+			if row.startswith("cterm="):
+				l=row.rstrip().split('=')[1].split(',')
+				Ctermmap[l[0]] = float(l[1])
+			if row.startswith("frag_method="):
+				fragmethod=row.rstrip().split('=')[1]
+			if row.startswith("frag_error="):
+				# in Da, or in ppm of the ion m/z with a ppm suffix
+				tol=row.rstrip().split('=')[1]
+				if tol.lower().endswith('ppm'):
+					fragerror=(0,float(tol[:-3]))
+				else:
+					fragerror=(float(tol),0)
 
-	final_result = pd.DataFrame(columns=['peplen','charge','ion','mz', 'ionnumber', 'prediction', 'spec_id'])
-	pcount = 0
-	total = len(peptides)
+	fa.close()
+	return (PTMmap,Ntermmap,Ctermmap,fragmethod,fragerror,fa.name)
 
-	for pepid in peptides:
-
-		ch = charges[pepid]
-
-		peptide = peptides[pepid]
-		peptide = peptide.replace('L','I')
-
-		# convert peptide string to integer list to speed up C code
-		peptide = np.array([a_map[x] for x in peptide],dtype=np.uint16)
-		# modpeptide is the same as peptide but with modified amino acids
-		# converted to other integers (beware: these are hard coded in ms2pipfeatures_c.c for now)
-		mods = modifications[pepid]
-		modpeptide = np.array(peptide[:],dtype=np.uint16)
-		peplen = len(peptide)
-		nptm = 0
-		cptm = 0
-		if mods != '-':
-			l = mods.split('|')
-			for i in range(0,len(l),2):
-				tl = l[i+1]
-				if int(l[i]) == 0:
-					if tl in Ntermmap:
-						nptm += Ntermmap[tl]
-					else:
-						nptm += Ntermmap[tl[:-1]]
-				elif int(l[i]) == -1:
-					if tl in Ctermmap:
-						cptm += Ctermmap[tl]
-					else:
-						cptm += Ctermmap[tl[:-1]]
+#read the PEPREC file, as a single DataFrame or as an iterator over chunks of chunksize peptides
+def read_peprec(pep_file,chunksize=None):
+	data = pd.read_csv(	pep_file,
+						sep=' ',
+						index_col=False,
+						dtype={'spec_id':str,'modifications':str},
+						chunksize=chunksize)
+	if chunksize:
+		return (chunk.fillna('-') for chunk in data)
+	return data.fillna('-') # for some reason the missing values are converted to float otherwise
+
+#predict the PEPREC file chunk by chunk and append the results to the output file
+#in PEPREC order, at most 2*num_cpu chunks are in memory at any time
+def predict_streaming(args,PTMmap,Ntermmap,Ctermmap,model,num_cpu,library=None,report=None):
+	sys.stdout.write('starting workers...\n')
+	myPool = make_pool(args,num_cpu)
+
+	sys.stdout.write('predicting spectra... \n')
+	pending = deque()
+	num_peptides = 0
+	header = True
+	with open(args.pep_file +'_predictions.csv','w') as fout:
+		def write(chunk,result):
+			preds = report.result(result.get()) if report else result.get()
+			with instrumentation.stage('write_output'):
+				preds.to_csv(fout,index=False,header=header)
+				if library:
+					library.append(preds,chunk)
+		for i,chunk in enumerate(read_peprec(args.pep_file,args.chunk_size)):
+			num_peptides += len(chunk)
+			fargs = (args,chunk,PTMmap,Ntermmap,Ctermmap,model)
+			if report:
+				report.count('peptides',len(chunk))
+				pending.append((chunk,myPool.apply_async(instrumentation.run_chunk,args=(report.job(process_peptides,i,fargs,len(chunk)),))))
+			else:
+				pending.append((chunk,myPool.apply_async(process_peptides,args=(i,)+fargs)))
+			while len(pending) >= 2*num_cpu:
+				write(*pending.popleft())
+				header = False
+		while pending:
+			write(*pending.popleft())
+			header = False
+	if library:
+		library.close()
+
+	myPool.close()
+	myPool.join()
+	sys.stdout.write('\n%i peptides written to %s\n'%(num_peptides,args.pep_file +'_predictions.csv'))
+	sys.stdout.write('done!\n')
+
+#convert a peptide and its modifications string to the integer encoding used by the C code
+def encode_peptide(peptide,mods,PTMmap,Ntermmap,Ctermmap):
+	peptide = peptide.replace('L','I')
+
+	# convert peptide string to integer list to speed up C code
+	peptide = np.array([a_map[x] for x in peptide],dtype=np.uint16)
+
+	# modpeptide is the same as peptide but with modified amino acids
+	# converted to other integers (beware: these are hard coded in ms2pipfeatures_c.c for now)
+	modpeptide = np.array(peptide[:],dtype=np.uint16)
+	nptm = 0
+	cptm = 0
+	if mods != '-':
+		l = mods.split('|')
+		for i in range(0,len(l),2):
+			tl = l[i+1]
+			if int(l[i]) == 0:
+				if tl in Ntermmap:
+					nptm += Ntermmap[tl]
+				else:
+					nptm += Ntermmap[tl[:-1]]
+			elif int(l[i]) == -1:
+				if tl in Ctermmap:
+					cptm += Ctermmap[tl]
+				else:
+					cptm += Ctermmap[tl[:-1]]
+			else:
+				if tl in PTMmap:
+					modpeptide[int(l[i])-1] = PTMmap[tl]
 				else:
-					if tl in PTMmap:
-						modpeptide[int(l[i])-1] = PTMmap[tl]
-					else:
-						modpeptide[int(l[i])-1] = PTMmap[tl[:-1]]
-
-		(b_mz,y_mz) = ms2pipfeatures_pyx.get_mzs(modpeptide,nptm,cptm)
-
-		# get ion intensities
-		(resultB,resultY) = ms2pipfeatures_pyx.get_predictions(peptide, modpeptide, ch)
-		for ii in range(len(resultB)):
-			resultB[ii] = resultB[ii]+0.5 #This still needs to be checked!!!!!!!
-		for ii in range(len(resultY)):
-			resultY[ii] = resultY[ii]+0.5
-
-		# return results as a DataFrame
-		tmp = pd.DataFrame()
-		tmp['peplen'] = [peplen]*(2*len(resultB))
-		tmp['charge'] = [ch]*(2*len(resultB))
-		tmp['ion'] = ['b']*len(resultB)+['y']*len(resultY)
-		tmp['mz'] = b_mz + y_mz
-		tmp['ionnumber'] = range(1,len(resultB)+1)+range(len(resultY),0,-1)
-		tmp['prediction'] = resultB + resultY
-		tmp['spec_id'] = [pepid]*len(tmp)
-		final_result = final_result.append(tmp)
-		pcount += 1
-		if (pcount % 500) == 0:
-			sys.stderr.write('w' + str(worker_num) + '(' + str(pcount) + ') ')
+					modpeptide[int(l[i])-1] = PTMmap[tl[:-1]]
+	return (peptide,modpeptide,nptm,cptm)
+
+#look up the value of each modification name in one of the maps, with the same
+#fallback as encode_peptide, each distinct name is looked up once
+def lookup_mods(names,ptmmap):
+	(distinct,inverse) = np.unique(names,return_inverse=True)
+	values = []
+	for tl in distinct:
+		if tl in ptmmap:
+			values.append(ptmmap[tl])
+		elif tl[:-1] in ptmmap:
+			values.append(ptmmap[tl[:-1]])
+		else:
+			raise ValueError("Unknown modification in peptide file: %s"%tl)
+	return np.array(values)[inverse]
+
+#peptides of a single amino acid have no fragment ions
+def check_lengths(data):
+	short = (data.peptide.str.len() < 2).values
+	if short.any():
+		raise ValueError("Peptides should be at least 2 amino acids long: %s"%", ".join(
+			["%s (%s)"%(s,p) for (s,p) in zip(data.spec_id.values[short][:10],data.peptide.values[short][:10])]))
+
+#encode all peptides and modifications strings of a PEPREC DataFrame at once,
+#peptide k is peptides[offsets[k]:offsets[k+1]] (as used by get_predictions_batch)
+def encode_peptides(data,PTMmap,Ntermmap,Ctermmap):
+	check_lengths(data)
+	peplens = data.peptide.str.len().values
+	num_peptides = len(peplens)
+	offsets = np.zeros(num_peptides+1,dtype=np.int32)
+	offsets[1:] = np.cumsum(peplens)
+	sequences = ''.join(data.peptide.values.astype(str))
+	peptides = a_codes[np.frombuffer(sequences,dtype=np.uint8)]
+	if (peptides == 0xffff).any():
+		raise ValueError("Unknown amino acid(s) in peptide file: %s"%", ".join(sorted(set(sequences)-set(a_map)-set('L'))))
+	modpeptides = peptides.copy()
+	nptms = np.zeros(num_peptides,dtype=np.float32)
+	cptms = np.zeros(num_peptides,dtype=np.float32)
+
+	mods = data.modifications.values
+	modified = np.flatnonzero(mods != '-')
+	if len(modified) > 0:
+		# one split for all modifications, in (location,name) pairs
+		tokens = '|'.join(mods[modified]).split('|')
+		rows = np.repeat(modified,[(m.count('|')+1)//2 for m in mods[modified]])
+		locations = np.array(tokens[0::2],dtype=np.int64)
+		names = np.array(tokens[1::2])
+		nterm = locations == 0
+		cterm = locations == -1
+		residue = ~(nterm | cterm)
+		if nterm.any():
+			nptms += np.bincount(rows[nterm],weights=lookup_mods(names[nterm],Ntermmap),minlength=num_peptides).astype(np.float32)
+		if cterm.any():
+			cptms += np.bincount(rows[cterm],weights=lookup_mods(names[cterm],Ctermmap),minlength=num_peptides).astype(np.float32)
+		if residue.any():
+			modpeptides[offsets[rows[residue]]+locations[residue]-1] = lookup_mods(names[residue],PTMmap)
+	return (peptides,modpeptides,offsets,nptms,cptms)
+
+#peak intensity prediction without spectrum file (under construction)
+def process_peptides(worker_num,args,data,PTMmap,Ntermmap,Ctermmap,model):
+	"""
+	Read the PEPREC file and predict spectra.
+	"""
+
+	import ms2pipfeatures_pyx
+
+	# encode all peptides into flat arrays so that the whole block can be
+	# predicted with a single call into the C code
+	data = data.drop_duplicates('spec_id',keep='last')
+	pepids = list(data.spec_id)
+	num_peptides = len(pepids)
+	if num_peptides == 0:
+		return pd.DataFrame(columns=['peplen','charge','ion','mz', 'ionnumber', 'prediction', 'spec_id'])
+	with instrumentation.stage('encode',num_peptides):
+		(peptide_buf,modpeptide_buf,offsets,nptms,cptms) = encode_peptides(data,PTMmap,Ntermmap,Ctermmap)
+		peplens = np.diff(offsets)
+		chs = data.charge.values.astype(np.int32)
+		modelnums = get_models(data,model)
+
+	# the features and the tree models are computed in one call into the C code
+	with instrumentation.stage('predict',num_peptides):
+		if args.cache:
+			# only predict the peptides that are not in the cache yet
+			cache = prediction_cache.PredictionCache(args.cache,prediction_cache.model_hash(ms2pipfeatures_pyx.__file__,args.c))
+			(mzs,predictions) = prediction_cache.get_predictions_cached(ms2pipfeatures_pyx,cache,peptide_buf,modpeptide_buf,offsets,chs,nptms,cptms,modelnums)
+			cache.close()
+		else:
+			(mzs,predictions) = ms2pipfeatures_pyx.get_predictions_batch(peptide_buf,modpeptide_buf,offsets,chs,nptms,cptms,modelnums)
+		predictions += 0.5 #This still needs to be checked!!!!!!!
+
+	# return results as a DataFrame with typed columns, each peptide has
+	# peplen-1 b-ions followed by peplen-1 y-ions
+	with instrumentation.stage('dataframe',num_peptides):
+		numions = 2*(peplens-1)
+		pepidx = np.repeat(np.arange(num_peptides),numions)
+		numb = np.repeat(peplens-1,numions)
+		ionstart = 2*(offsets[:-1]-np.arange(num_peptides))
+		ionpos = np.arange(len(mzs)) - ionstart[pepidx]
+		is_y = ionpos >= numb
+		final_result = pd.DataFrame({
+			'peplen': peplens.astype(np.uint8)[pepidx],
+			'charge': chs.astype(np.uint8)[pepidx],
+			'ion': pd.Categorical.from_codes(is_y.astype(np.int8),['b','y']),
+			'mz': mzs,
+			'ionnumber': np.where(is_y,2*numb-ionpos,ionpos+1).astype(np.uint8),
+			'prediction': predictions,
+			'spec_id': pd.Categorical.from_codes(pepidx,pepids)
+			},columns=['peplen','charge','ion','mz','ionnumber','prediction','spec_id'])
 	return final_result
 
 # peak intensity prediction with spectrum file (for evaluation) OR feature extraction
-def process_spectra(worker_num,args,data, PTMmap,Ntermmap,Ctermmap,fragmethod,fragerror):
+# number of spectra that are preprocessed at once (see spectrum_preprocessing.py)
+spectrum_batch_size = 1000
 
-	if fragmethod == "CID":
-		import ms2pipfeatures_pyx_CID as ms2pipfeatures_pyx
-	elif fragmethod == "HCD":
-		if args.i:
-			if args.p:
-				import ms2pipfeatures_pyx_HCDiTRAQ4phospho as ms2pipfeatures_pyx
-			else:
-				import ms2pipfeatures_pyx_HCDiTRAQ4 as ms2pipfeatures_pyx
-		else:
-			import ms2pipfeatures_pyx_HCD as ms2pipfeatures_pyx
-	else:
-		print "Unknown fragmentation method in configfile: %s"%fragmethod
-		exit(1)
+def process_spectra(worker_num,args,data,spectra,PTMmap,Ntermmap,Ctermmap,model,fragerror):
+
+	import ms2pipfeatures_pyx
 
-	# transform pandas datastructure into dictionary for easy access
-	specdict = data[['spec_id','peptide','modifications']].set_index('spec_id').to_dict()
-	peptides = specdict['peptide']
-	modifications = specdict['modifications']
+	# all peptides are encoded at once, peptides maps each title to its
+	# number in the encoded arrays
+	with instrumentation.stage('encode',len(data)):
+		(peptide_buf,modpeptide_buf,offsets,nptms,cptms) = encode_peptides(data,PTMmap,Ntermmap,Ctermmap)
+		peptides = dict(zip(data.spec_id,range(len(data))))
+		models = dict(zip(data.spec_id,[ms2pipfeatures_pyx.MODELS[m] for m in get_models(data,model)]))
 
 	total = len(peptides)
 	
 	# cols contains the names of the computed features
 	cols_n = get_feature_names()
 	
-	dataresult = pd.DataFrame(columns=['spec_id','peplen','charge','ion','ionnumber','target','prediction'])
-	dataresult['peplen'] = dataresult['peplen'].astype(np.uint8)
-	dataresult['charge'] = dataresult['charge'].astype(np.uint8)
-	dataresult['ion'] = dataresult['ion'].astype(np.uint8)
-	dataresult['ionnumber'] = dataresult['ionnumber'].astype(np.uint8)
-	dataresult['target'] = dataresult['target'].astype(np.float32)					
-	dataresult['prediction'] = dataresult['prediction'].astype(np.float32)					
-		
-	sys.stderr.write('here')
-		
-	title = ""
-	charge = 0
-	msms = []
-	peaks = []
-	f = open(args.spec_file)
-	skip = False
-	vectors = []
-	result = []
-	pcount = 0
-	while (1):
-		rows = f.readlines(3000000)
-		# sys.stdout.write('.')
-		if not rows: break
-		for row in rows:
-			row = row.rstrip()
-			if row == "": continue
-			if skip:
-				if row[0] == "B":
-					if row[:10] == "BEGIN IONS":
-						skip = False
-				else:
-					continue
-			if row == "": continue
-			if row[0] == "T":
-				if row[:5] == "TITLE":
-					title = row[6:].replace(' ','')
-					if not title in peptides:
-						skip = True
-						continue
-			elif row[0].isdigit():
-				tmp = row.split()
-				msms.append(float(tmp[0]))
-				peaks.append(float(tmp[1]))
-			elif row[0] == "B":
-				if row[:10] == "BEGIN IONS":
-					msms = []
-					peaks = []
-			elif row[0] == "C":
-				if row[:6] == "CHARGE":
-					charge = int(row[7:9].replace("+",""))
-			elif row[:8] == "END IONS":
-				#process
-				if not title in peptides: continue
-				#sys.stderr.write('.')
-				#with counter.get_lock():
-				#	counter.value += 1
-				#sys.stderr.write("%i ",counter.value)
-
-				peptide = peptides[title]
-				peptide = peptide.replace('L','I')
-				mods = modifications[title]
-
-				# convert peptide string to integer list to speed up C code
-				peptide = np.array([a_map[x] for x in peptide],dtype=np.uint16)
-
-				# modpeptide is the same as peptide but with modified amino acids
-				# converted to other integers (beware: these are hard coded in ms2pipfeatures_c.c for now)
-				modpeptide = np.array(peptide[:],dtype=np.uint16)
-				peplen = len(peptide)
-
-				nptm = 0
-				cptm = 0
-				if mods != '-':
-					l = mods.split('|')
-					for i in range(0,len(l),2):
-						tl = l[i+1]
-						if int(l[i]) == 0:
-							if tl in Ntermmap:
-								nptm += Ntermmap[tl]
-							else:
-								nptm += Ntermmap[tl[:-1]]
-						elif int(l[i]) == -1:
-							if tl in Ctermmap:
-								cptm += Ctermmap[tl]
-							else:
-								cptm += Ctermmap[tl[:-1]]
-						else:
-							if tl in PTMmap:
-								modpeptide[int(l[i])-1] = PTMmap[tl]
-							else:
-								modpeptide[int(l[i])-1] = PTMmap[tl[:-1]]
-
-				if args.i:
-					#remove reporter ionsi
-					for mi,mp in enumerate(msms):
-						if (mp >= 113) & (mp <= 118):
-							peaks[mi]=0
-
-				# normalize and convert MS2 peaks
-				msms = np.array(msms,dtype=np.float32)
-				#peaks = np.array(peaks,dtype=np.float32)
-				peaks = peaks / np.sum(peaks)
-				peaks = np.array(np.log2(peaks+0.001))
-				peaks = peaks.astype(np.float32)
-
-				# find the b- and y-ion peak intensities in the MS2 spectrum
-				(b,y,b2,y2) = ms2pipfeatures_pyx.get_targets(modpeptide,msms,peaks,nptm,cptm,fragerror)
-
-				#for debugging!!!!
-				#tmp = pd.DataFrame(ms2pipfeatures_pyx.get_vector(peptide,modpeptide,charge),columns=cols,dtype=np.uint32)
-				#print bst.predict(xgb.DMatrix(tmp))
-
-				if args.vector_file:
-					tmp = pd.DataFrame(ms2pipfeatures_pyx.get_vector(peptide,modpeptide,charge),columns=cols_n,dtype=np.uint16)
-					tmp["psmid"] = [title]*len(tmp)
-					tmp["targetsB"] = b
-					tmp["targetsY"] = y[::-1]
-					tmp["targetsB2"] = b2
-					tmp["targetsY2"] = y2[::-1]
-					vectors.append(tmp)
-				else:
-					# predict the b- and y-ion intensities from the peptide
-					(resultB,resultY) = ms2pipfeatures_pyx.get_predictions(peptide,modpeptide,charge)
-					for ii in range(len(resultB)):
-						resultB[ii] = resultB[ii]+0.5 #This still needs to be checked!!!!!!!
-					for ii in range(len(resultY)):
-						resultY[ii] = resultY[ii]+0.5
-
-					tmp = pd.DataFrame()					
-					tmp['spec_id'] = [title]*(2*len(b))
-					tmp['peplen'] = [peplen]*(2*len(b))
-					tmp['charge'] = [charge]*(2*len(b))
-					tmp['ion'] = [0]*len(b) + [1]*len(y)
-					tmp['ionnumber'] = [a+1 for a in range(len(b))+range(len(y)-1,-1,-1)]
-					tmp['target'] = b + y
-					tmp['prediction'] = resultB + resultY
-					tmp['peplen'] = tmp['peplen'].astype(np.uint8)
-					tmp['charge'] = tmp['charge'].astype(np.uint8)
-					tmp['ion'] = tmp['ion'].astype(np.uint8)
-					tmp['ionnumber'] = tmp['ionnumber'].astype(np.uint8)
-					tmp['target'] = tmp['target'].astype(np.float32)					
-					tmp['prediction'] = tmp['prediction'].astype(np.float32)					
-					dataresult = dataresult.append(tmp,ignore_index=True)
-								
-				pcount += 1
-				if (pcount % 500) == 0:
-					sys.stderr.write('w' + str(worker_num) + '(' + str(pcount) + ') ')
-
 	if args.vector_file:
-		return pd.concat(vectors)
+		# the feature vectors and targets are written straight into blocks
+		# that are large enough for all PSMs of this worker, psmids holds
+		# the title and the number of ions of each PSM
+		num_ions = sum([offsets[peptides[e[0]]+1]-offsets[peptides[e[0]]]-1 for e in spectra if e[0] in peptides])
+		vectors = np.empty((num_ions,len(cols_n)),dtype=np.uint16)
+		targets = np.empty((num_ions,4),dtype=np.float32)
+		psmids = []
+		row = 0
 	else:
-		return dataresult
+		# (title,charge,peplen) of each spectrum, with its targets and
+		# predictions, b-ions followed by y-ions
+		spectrum_info = []
+		all_targets = []
+		all_predictions = []
+
+	(windows,transform) = spectrum_preprocessing.read_config(args.c,bool(args.vector_file))
+	nopeak = spectrum_preprocessing.no_peak(transform)
+
+	f = open(args.spec_file,'rb')
+	mm = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+	# only read this worker's spectra, in file order, using the byte offsets
+	# from the .mgf index
+	entries = [e for e in sorted(spectra,key=lambda e: e[1]) if e[0] in peptides]
+	for start in range(0,len(entries),spectrum_batch_size):
+		# the peaks of a batch of spectra are preprocessed at once, bounds
+		# holds the first peak of each spectrum
+		with instrumentation.stage('parse_mgf') as s:
+			batch = [mgf_index.parse_spectrum(mm[offset:offset+length]) for (title,offset,length) in entries[start:start+spectrum_batch_size]]
+			s.items = len(batch)
+		with instrumentation.stage('preprocess',len(batch)):
+			bounds = np.concatenate([[0],np.cumsum([len(msms) for (title,charge,msms,peaks) in batch])])
+			batch_msms = np.concatenate([msms for (title,charge,msms,peaks) in batch])
+			batch_peaks = np.concatenate([peaks for (title,charge,msms,peaks) in batch])
+			# as before, -i removes the reporter ions from all spectra
+			reporter = np.array([args.i or models[title].startswith('HCDiTRAQ') for (title,charge,msms,peaks) in batch])
+			spectrum_preprocessing.preprocess(batch_msms,batch_peaks,bounds,reporter,windows,transform)
+			batch_msms = batch_msms.astype(np.float32)
+			batch_peaks = batch_peaks.astype(np.float32)
+
+		for (i,(title,charge,msms,peaks)) in enumerate(batch):
+			msms = batch_msms[bounds[i]:bounds[i+1]]
+			peaks = batch_peaks[bounds[i]:bounds[i+1]]
+
+			k = peptides[title]
+			peptide = peptide_buf[offsets[k]:offsets[k+1]]
+			modpeptide = modpeptide_buf[offsets[k]:offsets[k+1]]
+			(nptm,cptm) = (nptms[k],cptms[k])
+			peplen = len(peptide)
+
+			# find the b- and y-ion peak intensities in the MS2 spectrum
+			with instrumentation.stage('targets',1):
+				(b,y,b2,y2) = ms2pipfeatures_pyx.get_targets(modpeptide,msms,peaks,nptm,cptm,fragerror[0],fragerror[1],nopeak=nopeak)
+
+			#for debugging!!!!
+			#tmp = pd.DataFrame(ms2pipfeatures_pyx.get_vector(peptide,modpeptide,charge),columns=cols,dtype=np.uint32)
+			#print bst.predict(xgb.DMatrix(tmp))
+
+			if args.vector_file:
+				with instrumentation.stage('features',1):
+					ms2pipfeatures_pyx.get_vector(peptide,modpeptide,charge,vectors[row:row+peplen-1])
+				targets[row:row+peplen-1,0] = b
+				targets[row:row+peplen-1,1] = y[::-1]
+				targets[row:row+peplen-1,2] = b2
+				targets[row:row+peplen-1,3] = y2[::-1]
+				psmids.append((title,peplen-1))
+				row += peplen-1
+			else:
+				# predict the b- and y-ion intensities from the peptide
+				with instrumentation.stage('predict',1):
+					(resultB,resultY) = ms2pipfeatures_pyx.get_predictions(peptide,modpeptide,charge,models[title])
+				spectrum_info.append((title,charge,peplen))
+				all_targets.append(np.array(b+y,dtype=np.float32))
+				all_predictions.append(np.array(resultB+resultY,dtype=np.float32)+np.float32(0.5)) #This still needs to be checked!!!!!!!
+
+	mm.close()
+	f.close()
+
+	if args.vector_file:
+		# the DataFrame uses the feature vector block without copying it
+		with instrumentation.stage('dataframe',len(psmids)):
+			all_vectors = pd.DataFrame(vectors[:row],columns=cols_n,copy=False)
+			all_vectors["psmid"] = np.repeat([t for (t,n) in psmids],[n for (t,n) in psmids]).astype(object)
+			for (i,c) in enumerate(["targetsB","targetsY","targetsB2","targetsY2"]):
+				all_vectors[c] = targets[:row,i]
+		return all_vectors
+
+	# all ions in one DataFrame, each spectrum has peplen-1 b-ions followed
+	# by peplen-1 y-ions
+	with instrumentation.stage('dataframe',len(spectrum_info)):
+		titles = [t for (t,c,p) in spectrum_info]
+		peplens = np.array([p for (t,c,p) in spectrum_info],dtype=np.int32)
+		charges = np.array([c for (t,c,p) in spectrum_info],dtype=np.int32)
+		numions = 2*(peplens-1)
+		specidx = np.repeat(np.arange(len(titles)),numions)
+		numb = np.repeat(peplens-1,numions)
+		ionpos = np.arange(numions.sum()) - np.repeat(np.cumsum(numions)-numions,numions)
+		is_y = ionpos >= numb
+		dataresult = pd.DataFrame({
+			'spec_id': np.array(titles,dtype=object)[specidx],
+			'peplen': peplens.astype(np.uint8)[specidx],
+			'charge': charges.astype(np.uint8)[specidx],
+			'ion': is_y.astype(np.uint8),
+			'ionnumber': np.where(is_y,2*numb-ionpos,ionpos+1).astype(np.uint8),
+			'target': np.concatenate(all_targets) if all_targets else np.zeros(0,dtype=np.float32),
+			'prediction': np.concatenate(all_predictions) if all_predictions else np.zeros(0,dtype=np.float32)
+			},columns=['spec_id','peplen','charge','ion','ionnumber','target','prediction'])
+
+	# the metrics of each spectrum, and the ions only if these are written
+	with instrumentation.stage('metrics',len(spectrum_info)):
+		metrics = evaluation.spectrum_metrics(dataresult)
+	if args.ion_file:
+		return (metrics,dataresult)
+	return (metrics,None)
 
 #feature names
 def get_feature_names():
@@ -649,17 +766,7 @@ def get_feature_names_chem(peplen):
 	return names
 
 def scan_spectrum_file(filename):
-	titles = []
-	f = open(filename)
-	while (1):
-		rows = f.readlines(1000000)
-		if not rows: break
-		for row in rows:
-			if row[0] == "T":
-				if row[:5] == "TITLE":
-					titles.append(row.rstrip()[6:].replace(" ",""))
-	f.close()
-	return titles
+	return [title for (title,offset,length) in mgf_index.index_spectrum_file(filename)]
 
 def print_logo():
 	logo = """
@@ -0,0 +1,33 @@
+// Registry of the compiled models
+//
+// Every model is compiled as a separate unit, ms2pipfeatures_c_<model>.c,
+// that includes its B and Y models (which all define score_B and score_Y)
+// and exports them as an ms2pip_model. The feature engine in
+// ms2pipfeatures_c.c holds all models in ms2pip_models and scores each
+// peptide with the model it is asked for.
+//
+// The B and Y models are the array models of tree_models.py (scored by
+// models/tree_eval.c), or the nested if models with -DMS2PIP_TREE_IFS.
+
+#ifndef MS2PIP_MODELS_H
+#define MS2PIP_MODELS_H
+
+#if !defined(MS2PIP_TREE_IFS) && !defined(MS2PIP_TREE_ARRAYS)
+#define MS2PIP_TREE_ARRAYS
+#endif
+
+typedef struct {
+	const char* name;
+	// score num_ions feature vectors, stored row after row stride values
+	// apart, b-ion scores go to b and y-ion scores to y
+	void (*score_ions)(unsigned int* vs, int num_ions, int stride, float* b, float* y);
+} ms2pip_model;
+
+extern const ms2pip_model ms2pip_model_HCD;
+extern const ms2pip_model ms2pip_model_CID;
+extern const ms2pip_model ms2pip_model_HCDiTRAQ4;
+extern const ms2pip_model ms2pip_model_HCDiTRAQ4phospho;
+
+#define NUM_MODELS 4
+
+#endif
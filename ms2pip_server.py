@@ -0,0 +1,212 @@
+"""
+Prediction server
+
+Reads the config file, initializes the models and starts the worker pool
+once, then predicts the peptides POSTed to it over HTTP (on a TCP port or a
+Unix socket), so that many small batches do not each pay for the startup of
+ms2pipC.py:
+
+	python ms2pip_server.py -c config.file -m 4 -P 8080
+	curl --data-binary @peptides.PEPREC 'localhost:8080/predict?format=json'
+
+The body of a POST to /predict is a PEPREC file (the same space separated
+columns as for ms2pipC.py) or, with Content-Type application/json, the same
+columns as a JSON object of lists or a list of objects. The predictions are
+returned in the columns of <peptide file>_predictions.csv, in the order of
+the peptides, as:
+
+- format=json: a JSON object with a list per column (the default)
+- format=npy: a NumPy structured array (.npy, read with np.load)
+- format=arrow: an Arrow IPC stream (requires pyarrow)
+- format=csv: the .csv file that ms2pipC.py writes
+
+GET /health returns the models and the number of workers. Unknown models,
+modifications or amino acids are reported with status 400.
+"""
+
+import io
+import os
+import sys
+import json
+import argparse
+import urlparse
+import SocketServer
+import BaseHTTPServer
+import numpy as np
+import pandas as pd
+
+import ms2pipC
+import scheduler
+
+columns = ['spec_id','peplen','charge','ion','ionnumber','mz','prediction']
+chunk_size = 1000
+
+class Predictor(object):
+	"""The config, models and worker pool of the server."""
+
+	def __init__(self,args):
+		(self.PTMmap,self.Ntermmap,self.Ctermmap,fragmethod,fragerror,ptm_file) = ms2pipC.read_config(args.c)
+		self.model = ms2pipC.default_model(fragmethod,args)
+		if self.model is None:
+			raise ValueError("Unknown fragmentation method in configfile: %s"%fragmethod)
+		import ms2pipfeatures_pyx
+		ms2pipfeatures_pyx.ms2pip_init(ptm_file)
+		self.models = ms2pipfeatures_pyx.MODELS
+		self.args = args
+		self.num_cpu = int(args.num_cpu)
+		# the workers are started after ms2pip_init, so they share the models
+		self.pool = ms2pipC.make_pool(args,self.num_cpu)
+
+	def predict(self,data):
+		"""Predict the peptides of a PEPREC DataFrame, in the order of data."""
+		for c in ['spec_id','modifications','peptide','charge']:
+			if c not in data.columns:
+				raise ValueError("Missing column in peptide file: %s"%c)
+		data = data.fillna('-')
+		data['spec_id'] = data.spec_id.astype(str)
+		data = data.drop_duplicates('spec_id',keep='last')
+		ms2pipC.get_models(data,self.model)
+		if len(data) == 0:
+			return pd.DataFrame(columns=columns)
+		# at most one chunk per worker and chunk_size peptides per chunk, as
+		# the overhead of a chunk outweighs the prediction of a few peptides
+		num_chunks = max(1,min(self.num_cpu,len(data)//chunk_size))
+		jobs = [(ms2pipC.process_peptides,i,(self.args,data.iloc[idx],self.PTMmap,self.Ntermmap,self.Ctermmap,self.model))
+			for (i,idx) in enumerate(scheduler.make_chunks(data.peptide.str.len().values,num_chunks,1))]
+		results = self.pool.map(scheduler.run_chunk,jobs)
+		preds = pd.concat([result for (i,result) in sorted(results,key=lambda r: r[0])],ignore_index=True)
+		# back to the order of the request
+		order = np.argsort(pd.Index(data.spec_id).get_indexer(preds.spec_id.astype(str)),kind='mergesort')
+		return preds.iloc[order].reset_index(drop=True)[columns]
+
+	def close(self):
+		self.pool.close()
+		self.pool.join()
+
+def read_request(body,content_type):
+	if content_type.startswith('application/json'):
+		return pd.DataFrame(json.loads(body))
+	return pd.read_csv(io.BytesIO(body),sep=' ',index_col=False,dtype={'spec_id':str,'modifications':str})
+
+def encode_json(preds):
+	return (json.dumps(dict((c,preds[c].astype(str).tolist() if c in ('spec_id','ion') else preds[c].tolist()) for c in columns)),'application/json')
+
+def encode_npy(preds):
+	records = np.rec.fromarrays([np.array(preds[c].astype(str),dtype='S') if c in ('spec_id','ion') else preds[c].values for c in columns],names=columns)
+	f = io.BytesIO()
+	np.save(f,records)
+	return (f.getvalue(),'application/octet-stream')
+
+def encode_arrow(preds):
+	import pyarrow
+	table = pyarrow.Table.from_pandas(preds,preserve_index=False)
+	sink = pyarrow.BufferOutputStream()
+	writer = pyarrow.RecordBatchStreamWriter(sink,table.schema)
+	writer.write_table(table)
+	writer.close()
+	return (sink.getvalue().to_pybytes(),'application/vnd.apache.arrow.stream')
+
+def encode_csv(preds):
+	return (preds.to_csv(index=False),'text/csv')
+
+encoders = {'json':encode_json,'npy':encode_npy,'arrow':encode_arrow,'csv':encode_csv}
+
+class RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+	def do_GET(self):
+		if urlparse.urlparse(self.path).path != '/health':
+			return self.reply(404,'Not found: %s\n'%self.path)
+		self.reply(200,json.dumps({'models':list(self.server.predictor.models),'default_model':self.server.predictor.model,
+			'workers':self.server.predictor.num_cpu}),'application/json')
+
+	def do_POST(self):
+		url = urlparse.urlparse(self.path)
+		if url.path != '/predict':
+			return self.reply(404,'Not found: %s\n'%self.path)
+		fmt = urlparse.parse_qs(url.query).get('format',['json'])[0]
+		if fmt not in encoders:
+			return self.reply(400,'Unknown format: %s (choose from %s)\n'%(fmt,', '.join(sorted(encoders))))
+		body = self.rfile.read(int(self.headers.getheader('content-length',0)))
+		try:
+			data = read_request(body,self.headers.getheader('content-type',''))
+			preds = self.server.predictor.predict(data)
+		except (ValueError,KeyError) as e:
+			return self.reply(400,'%s\n'%e)
+		try:
+			(content,content_type) = encoders[fmt](preds)
+		except ImportError as e:
+			return self.reply(501,'%s\n'%e)
+		self.reply(200,content,content_type)
+
+	def reply(self,status,content,content_type='text/plain'):
+		self.send_response(status)
+		self.send_header('Content-Type',content_type)
+		self.send_header('Content-Length',str(len(content)))
+		self.end_headers()
+		self.wfile.write(content)
+
+	def log_message(self,format,*args):
+		if not self.server.quiet:
+			# there is no client address on a Unix socket
+			client = self.client_address[0] if self.client_address else self.server.server_address
+			sys.stderr.write("%s - - [%s] %s\n"%(client,self.log_date_time_string(),format%args))
+
+class HTTPServer(SocketServer.ThreadingMixIn,BaseHTTPServer.HTTPServer):
+	daemon_threads = True
+
+class UnixHTTPServer(SocketServer.ThreadingMixIn,SocketServer.UnixStreamServer):
+	daemon_threads = True
+
+def make_server(predictor,host='localhost',port=8080,socket_file=None,quiet=False):
+	"""An HTTP server for predictor, on host:port or on the Unix socket socket_file."""
+	if socket_file:
+		if os.path.exists(socket_file):
+			os.remove(socket_file)
+		server = UnixHTTPServer(socket_file,RequestHandler)
+	else:
+		server = HTTPServer((host,port),RequestHandler)
+	server.predictor = predictor
+	server.quiet = quiet
+	return server
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('-c', metavar='FILE',action="store", dest='c',required=True,
+					 help='config file')
+	parser.add_argument('-i', action="store_true", default=False, help='iTRAQ models')
+	parser.add_argument('-p', action="store_true", default = False, help='phospho models')
+	parser.add_argument('-m', metavar='INT',action="store", dest='num_cpu',default='23',
+					 help="number of cpu's to use")
+	parser.add_argument('-t', action="store_true", dest='threads', default=False,
+					 help='use threads instead of processes for the -m workers')
+	parser.add_argument('-k', metavar='FILE',action="store", dest='cache',
+					 help='cache predictions in SQLite database FILE')
+	parser.add_argument('-H', metavar='HOST',action="store", dest='host',default='localhost',
+					 help='host to listen on (default localhost)')
+	parser.add_argument('-P', metavar='INT',action="store", dest='port',type=int,default=8080,
+					 help='port to listen on (default 8080)')
+	parser.add_argument('-u', metavar='FILE',action="store", dest='socket_file',
+					 help='listen on Unix socket FILE instead of a port')
+	parser.add_argument('-q', action="store_true", dest='quiet', default=False,
+					 help='do not log the requests')
+	args = parser.parse_args()
+
+	try:
+		predictor = Predictor(args)
+	except ValueError as e:
+		print e
+		exit(1)
+	print "using %s models..."%predictor.model
+	server = make_server(predictor,args.host,args.port,args.socket_file,args.quiet)
+	sys.stdout.write('listening on %s\n'%(args.socket_file or '%s:%i'%server.server_address[:2]))
+	sys.stdout.flush()
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	server.server_close()
+	if args.socket_file:
+		os.remove(args.socket_file)
+	predictor.close()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,1032 @@
+#include <stdlib.h>
+#include <stdio.h>
+#include <string.h>
+
+// the models are compiled separately, one unit per model (see ms2pip_models.h)
+#include "ms2pip_models.h"
+
+const ms2pip_model* ms2pip_models[NUM_MODELS] = {
+	&ms2pip_model_HCD,
+	&ms2pip_model_CID,
+	&ms2pip_model_HCDiTRAQ4,
+	&ms2pip_model_HCDiTRAQ4phospho
+};
+
+#define NUM_FEATURES 186 // per ion, as written by get_v
+// some models also test v[186] and v[187], which get_v does not write and
+// which are scored as 0, so get_p pads the feature vectors to MODEL_FEATURES
+#define MODEL_FEATURES 188
+#define MAX_IONS 161 // ions per peptide, i.e. peptides of up to 162 residues
+
+// buffers of the functions that are not reentrant (get_v, get_p, ...), the
+// _r versions of these functions write to buffers from the caller instead
+float membuffer[10000];
+unsigned int v[MODEL_FEATURES*MAX_IONS];
+float ions[5000];
+float predictions[5000];
+
+//for Omega: comment and uncomment
+float amino_masses_tmp[19] = {71.037114,103.00919,115.026943,129.042593,147.068414,57.021464,137.058912,113.084064,128.094963,131.040485,114.042927,97.052764,128.058578,156.101111,87.032028,101.047679,99.068414,186.079313,163.063329};
+float ntermmod;
+
+unsigned short bas[19] = {37,35,59,129,94,0,210,81,191,106,101,117,115,343,49,90,60,134,104};
+unsigned short heli[19] = {68,23,33,29,70,58,41,73,32,66,38,0,40,39,44,53,71,51,55};
+unsigned short hydro[19] = {51,75,25,35,100,16,3,94,0,82,12,0,22,22,21,39,80,98,70};
+unsigned short pI[19] = {32,23,0,4,27,32,48,32,69,29,26,35,28,79,29,28,31,31,28};
+
+// amino acid masses and PTMs, set up by c_ms2pip_init_ctx and only read afterwards,
+// so that one context can be shared by several threads
+typedef struct {
+	float* amino_masses;
+	unsigned short* amino_F;
+} ms2pip_ctx;
+
+ms2pip_ctx default_ctx; // used by the functions that are not reentrant
+
+// This function initializes amino acid masses and PTMs from a configuration file generated by Omega
+void c_ms2pip_init_ctx(ms2pip_ctx* ctx, char* amino_masses_fname) {
+	int i,j;
+	int nummods;
+	float mz;
+	int numptm;
+	int before;
+	int after;
+	float* amino_masses;
+	unsigned short* amino_F;
+
+	FILE* f = fopen(amino_masses_fname,"rt");
+	fscanf(f,"%i\n",&nummods);
+	fclose(f);
+
+	//malloc
+	amino_masses = (float*) malloc((38+nummods)*sizeof(float));
+	amino_F = (unsigned short*) malloc((38+nummods)*sizeof(unsigned short));
+
+	for (i=0; i< 19; i++) {
+		amino_masses[i] = amino_masses_tmp[i];
+		amino_F[i] = (unsigned short) (amino_masses[i]-57.021464);
+	}
+
+	for (i=0; i< 19; i++) {
+		amino_masses[19+i]=amino_masses[i];
+		amino_F[19+i]=amino_F[i];
+		}
+
+	j = 38;
+	f = fopen(amino_masses_fname,"rt");
+	fscanf(f,"%i\n",&nummods);
+	for (i=0; i< nummods; i++) {
+		fscanf(f,"%f\n",&amino_masses[j]);
+		amino_F[j] = (unsigned short) (amino_masses[j]-57.021464);
+		j++;
+		}
+	fclose(f);
+	ctx->amino_masses = amino_masses;
+	ctx->amino_F = amino_F;
+}
+
+void c_ms2pip_init(char* amino_masses_fname) {
+	c_ms2pip_init_ctx(&default_ctx, amino_masses_fname);
+}
+
+//get fragment ion mz values
+// membuffer: 2*(peplen-1) values
+float* c_ms2pip_get_mz_r(const ms2pip_ctx* ctx, int peplen, unsigned short* modpeptide, float nptm, float cptm, float* membuffer)
+	{
+	float* amino_masses = ctx->amino_masses;
+	int i,j;
+	float mz;
+	j=0;
+	mz = nptm;
+	for (i=0; i < peplen-1; i++) {
+		mz += amino_masses[modpeptide[i]];
+		membuffer[j++] = mz+1.007236;
+	}
+	mz = cptm;
+	for (i=peplen-1; i >= 1; i--) {
+		mz += amino_masses[modpeptide[i]];
+		membuffer[j++] = 18.0105647+mz+1.007236;
+	}
+	return membuffer;
+}
+
+float* c_ms2pip_get_mz(int peplen, unsigned short* modpeptide, float nptm, float cptm)
+	{
+	return c_ms2pip_get_mz_r(&default_ctx, peplen, modpeptide, nptm, cptm, membuffer);
+}
+
+// fragment ion types for get_t: the m/z of an ion is (m+offset+charge*1.007236)/charge
+// with m the residue masses (and the terminal PTM) of the N-terminal (b, a)
+// or C-terminal (y) fragment
+typedef struct {
+	const char* name;
+	int cterm;
+	double offset;
+	int charge;
+} ms2pip_ion_type;
+
+#define NUM_ION_TYPES 9
+const ms2pip_ion_type ms2pip_ion_types[NUM_ION_TYPES] = {
+	{"b", 0, 0, 1},
+	{"y", 1, 18.0105647, 1},
+	{"b2", 0, 0, 2},
+	{"y2", 1, 18.0105647, 2},
+	{"a", 0, -27.9949146, 1},
+	{"b-H2O", 0, -18.0105647, 1},
+	{"b-NH3", 0, -17.0265491, 1},
+	{"y-H2O", 1, 0, 1},
+	{"y-NH3", 1, 18.0105647-17.0265491, 1}
+};
+const int ms2pip_default_ion_types[4] = {0,1,2,3}; // b, y, b++ and y++
+
+// log2(0.001), the normalized and log2 transformed intensity of an ion
+// without a peak
+#define NO_PEAK -9.96578428466
+
+// index of the first of the numpeaks sorted msms values that is not below mz
+static int lower_bound(const float* msms, int start, int numpeaks, float mz)
+	{
+	int end = numpeaks;
+	while (start < end) {
+		int mid = start+(end-start)/2;
+		if (msms[mid] < mz) {
+			start = mid+1;
+		}
+		else {
+			end = mid;
+		}
+	}
+	return start;
+}
+
+//get fragment ion peaks from spectrum
+// the highest of the peaks (sorted by msms) within tolmz Da, or tolppm ppm
+// if tolppm > 0, of each ion of the numtypes ion types (indices in
+// ms2pip_ion_types), b-ions from the N-terminus, y-ions from the C-terminus,
+// or nopeak for the ions without a peak
+// ions: numtypes*(peplen-1) values
+float* c_ms2pip_get_t_r(const ms2pip_ctx* ctx, int peplen, unsigned short* modpeptide, int numpeaks, float* msms, float* peaks, float nptm, float cptm, float tolmz, float tolppm, float nopeak, int numtypes, const int* types, float* ions)
+	{
+	float* amino_masses = ctx->amino_masses;
+	int i,t,k;
+	float nmz,cmz,mz,tol,max;
+	int pos[NUM_ION_TYPES];
+	const ms2pip_ion_type* type;
+
+	for (t=0; t < numtypes; t++) {
+		pos[t] = 0;
+	}
+	// all ion ladders in one pass over the fragments, the m/z of the ions of a
+	// type go up with i, so the search for the next ion of a type starts at
+	// the peak of the previous one
+	nmz = nptm;
+	cmz = cptm;
+	for (i=0; i < peplen-1; i++) {
+		nmz += amino_masses[modpeptide[i]];
+		cmz += amino_masses[modpeptide[peplen-1-i]];
+		for (t=0; t < numtypes; t++) {
+			type = &ms2pip_ion_types[types[t]];
+			mz = (type->offset+(type->cterm ? cmz : nmz)+type->charge*1.007236)/type->charge;
+			tol = tolppm > 0 ? mz*tolppm*1e-6f : tolmz;
+			k = lower_bound(msms,pos[t],numpeaks,mz-tol);
+			pos[t] = k;
+			if ((k < numpeaks) && (msms[k] <= (mz+tol))) {
+				max = peaks[k];
+				for (k++; (k < numpeaks) && (msms[k] <= (mz+tol)); k++) {
+					if (max < peaks[k]) {
+						max = peaks[k];
+					}
+				}
+				ions[t*(peplen-1)+i] = max;
+			}
+			else {
+				ions[t*(peplen-1)+i] = nopeak;
+			}
+		}
+	}
+	return ions;
+}
+
+// b, y, b++ and y++ ions
+float* c_ms2pip_get_t(int peplen, unsigned short* modpeptide, int numpeaks, float* msms, float* peaks, float nptm, float cptm,float tolmz)
+	{
+	return c_ms2pip_get_t_r(&default_ctx, peplen, modpeptide, numpeaks, msms, peaks, nptm, cptm, tolmz, 0, NO_PEAK, 4, ms2pip_default_ion_types, ions);
+}
+
+
+
+//Experiment: features that assume fixed length peptide datasets
+// v: 128*(peplen-1) values
+unsigned int* c_ms2pip_get_v_bof_chem_r(const ms2pip_ctx* ctx, int peplen, unsigned short* peptide, int charge, unsigned int* v)
+	{
+	unsigned short* amino_F = ctx->amino_F;
+	int i,j;
+	float mz;
+
+	unsigned int max_bas_b = 0;
+	unsigned int max_heli_b = 0;
+	unsigned int max_hydro_b = 0;
+	unsigned int max_pI_b = 0;
+	unsigned int max_bas_y = 0;
+	unsigned int max_heli_y = 0;
+	unsigned int max_hydro_y = 0;
+	unsigned int max_pI_y = 0;
+	unsigned int min_bas_b = 999;
+	unsigned int min_heli_b = 999;
+	unsigned int min_hydro_b = 999;
+	unsigned int min_pI_b = 999;
+	unsigned int min_bas_y = 999;
+	unsigned int min_heli_y = 999;
+	unsigned int min_hydro_y = 999;
+	unsigned int min_pI_y = 999;
+	unsigned int total_bas = 0;
+	unsigned int total_heli = 0;
+	unsigned int total_hydro = 0;
+	unsigned int total_pI = 0;
+	unsigned int max_bas = 0;
+	unsigned int max_heli = 0;
+	unsigned int max_hydro = 0;
+	unsigned int max_pI = 0;
+	unsigned int min_bas = 999;
+	unsigned int min_heli = 999;
+	unsigned int min_hydro = 999;
+	unsigned int min_pI = 999;
+
+	mz = 0.;
+	for (i=0; i < peplen; i++) {
+		mz += amino_F[peptide[i]];
+		total_bas += bas[peptide[i]];
+		total_heli += heli[peptide[i]];
+		total_hydro += hydro[peptide[i]];
+		total_pI += pI[peptide[i]];
+		if (max_bas < bas[peptide[i]]) {
+			max_bas = bas[peptide[i]];
+		}
+		if (max_heli < heli[peptide[i]]) {
+			max_heli = heli[peptide[i]];
+		}
+		if (max_hydro < hydro[peptide[i]]) {
+			max_hydro = hydro[peptide[i]];
+		}
+		if (max_pI < pI[peptide[i]]) {
+			max_pI = pI[peptide[i]];
+		}
+		if (min_bas > bas[peptide[i]]) {
+			min_bas = bas[peptide[i]];
+		}
+		if (min_heli > heli[peptide[i]]) {
+			min_heli = heli[peptide[i]];
+		}
+		if (min_hydro > hydro[peptide[i]]) {
+			min_hydro = hydro[peptide[i]];
+		}
+		if (min_pI > pI[peptide[i]]) {
+			min_pI = pI[peptide[i]];
+		}
+	}
+
+	int mean_mz = (int) ((float)mz/peplen);
+	int mean_bas = (int) ((float)total_bas/peplen);
+	int mean_heli = (int) ((float)total_heli/peplen);
+	int mean_hydro = (int) ((float)total_hydro/peplen);
+	int mean_pI = (int) ((float)total_pI/peplen);
+
+	float mzb = 0.;
+	int sum_bas = 0;
+	int sum_heli = 0;
+	int sum_hydro = 0;
+	int sum_pI = 0;
+	int fnum = 0;
+	int yoff = 0;
+	int stride = 0;
+
+	for (i=0; i < peplen-1; i++) {
+		v[fnum++] = mz;
+		v[fnum++] = peplen;
+		v[fnum++] = i;
+		v[fnum++] = (int) 100*(float)i/peplen;
+		v[fnum++] = mean_mz;
+		v[fnum++] = mean_bas;
+		v[fnum++] = mean_heli;
+		v[fnum++] = mean_hydro;
+		v[fnum++] = mean_pI;
+		v[fnum++] = max_bas;
+		v[fnum++] = max_heli;
+		v[fnum++] = max_hydro;
+		v[fnum++] = max_pI;
+		v[fnum++] = min_bas;
+		v[fnum++] = min_heli;
+		v[fnum++] = min_hydro;
+		v[fnum++] = min_pI;
+
+		// running extremes of the b-ion residues, those of the y-ion residues
+		// are filled in by a backward pass over the peptide after this loop
+		if (bas[peptide[i]] > max_bas_b) {
+			max_bas_b = bas[peptide[i]];
+		}
+		if (heli[peptide[i]] > max_heli_b) {
+			max_heli_b = heli[peptide[i]];
+		}
+		if (hydro[peptide[i]] > max_hydro_b) {
+			max_hydro_b = hydro[peptide[i]];
+		}
+		if (pI[peptide[i]] > max_pI_b) {
+			max_pI_b = pI[peptide[i]];
+		}
+		if (bas[peptide[i]] < min_bas_b) {
+			min_bas_b = bas[peptide[i]];
+		}
+		if (heli[peptide[i]] < min_heli_b) {
+			min_heli_b = heli[peptide[i]];
+		}
+		if (hydro[peptide[i]] < min_hydro_b) {
+			min_hydro_b = hydro[peptide[i]];
+		}
+		if (pI[peptide[i]] < min_pI_b) {
+			min_pI_b = pI[peptide[i]];
+		}
+
+		v[fnum++] = max_bas_b;
+		v[fnum++] = max_heli_b;
+		v[fnum++] = max_hydro_b;
+		v[fnum++] = max_pI_b;
+		v[fnum++] = min_bas_b;
+		v[fnum++] = min_heli_b;
+		v[fnum++] = min_hydro_b;
+		v[fnum++] = min_pI_b;
+
+		if (i == 0) {
+			yoff = fnum; // offset of the y-ion extremes in each vector
+		}
+		fnum += 8;
+
+		mzb += amino_F[peptide[i]];
+		v[fnum++] = (int) mzb;
+		v[fnum++] = (int) (mz - mzb);
+		v[fnum++] = (int) (mzb/(i+1));
+		v[fnum++] = (int) ((mz-mzb)/(peplen-1-i));
+		sum_bas += bas[peptide[i]];
+		v[fnum++] = sum_bas;
+		v[fnum++] = total_bas-sum_bas;
+		v[fnum++] = (int) ((float)sum_bas/(i+1));
+		v[fnum++] = (int) ((float)(total_bas-sum_bas)/(peplen-1-i));
+		sum_heli += heli[peptide[i]];
+		v[fnum++] = sum_heli;
+		v[fnum++] = total_heli-sum_heli;
+		v[fnum++] = (int) ((float)sum_heli/(i+1));
+		v[fnum++] = (int) ((float)(total_heli-sum_heli)/(peplen-1-i));
+		sum_hydro += hydro[peptide[i]];
+		v[fnum++] = sum_hydro;
+		v[fnum++] = total_hydro-sum_hydro;
+		v[fnum++] = (int) ((float)sum_hydro/(i+1));
+		v[fnum++] = (int) ((float)(total_hydro-sum_hydro)/(peplen-1-i));
+		sum_pI += pI[peptide[i]];
+		v[fnum++] = sum_pI;
+		v[fnum++] = total_pI-sum_pI;
+		v[fnum++] = (int) ((float)sum_pI/(i+1));
+		v[fnum++] = (int) ((float)(total_pI-sum_pI)/(peplen-1-i));
+
+		v[fnum++] = bas[peptide[i]]+bas[peptide[i+1]];
+		v[fnum++] = heli[peptide[i]]+heli[peptide[i+1]];
+		v[fnum++] = hydro[peptide[i]]+hydro[peptide[i+1]];
+		v[fnum++] = pI[peptide[i]]+pI[peptide[i+1]];
+		v[fnum++] = bas[peptide[i]]*bas[peptide[i+1]];
+		v[fnum++] = heli[peptide[i]]*heli[peptide[i+1]];
+		v[fnum++] = hydro[peptide[i]]*hydro[peptide[i+1]];
+		v[fnum++] = pI[peptide[i]]*pI[peptide[i+1]];
+
+		v[fnum++] = bas[peptide[i]]-bas[peptide[i+1]]+1000;
+		v[fnum++] = heli[peptide[i]]-heli[peptide[i+1]]+1000;
+		v[fnum++] = hydro[peptide[i]]-hydro[peptide[i+1]]+1000;
+		v[fnum++] = pI[peptide[i]]-pI[peptide[i+1]]+1000;
+		v[fnum++] = bas[peptide[i+1]]-bas[peptide[i]]+1000;
+		v[fnum++] = heli[peptide[i+1]]-heli[peptide[i]]+1000;
+		v[fnum++] = hydro[peptide[i+1]]-hydro[peptide[i]]+1000;
+		v[fnum++] = pI[peptide[i+1]]-pI[peptide[i]]+1000;
+
+		v[fnum++] = bas[peptide[i]]+bas[peptide[0]];
+		v[fnum++] = heli[peptide[i]]+heli[peptide[0]];
+		v[fnum++] = hydro[peptide[i]]+hydro[peptide[0]];
+		v[fnum++] = pI[peptide[i]]+pI[peptide[0]];
+		v[fnum++] = bas[peptide[peplen-1]]+bas[peptide[i+1]];
+		v[fnum++] = heli[peptide[peplen-1]]+heli[peptide[i+1]];
+		v[fnum++] = hydro[peptide[peplen-1]]+hydro[peptide[i+1]];
+		v[fnum++] = pI[peptide[peplen-1]]+pI[peptide[i+1]];
+
+		for (j=0; j < peplen; j++) {
+			v[fnum++]=amino_F[peptide[j]];
+			v[fnum++]=bas[peptide[j]];
+			v[fnum++]=hydro[peptide[j]];
+			v[fnum++]=heli[peptide[j]];
+			v[fnum++]=pI[peptide[j]];
+		}
+
+		v[fnum++] = charge;
+	}
+
+	// running extremes of the y-ion residues, from the C-terminus
+	if (peplen > 1) {
+		stride = fnum/(peplen-1);
+	}
+	for (i=peplen-2; i >= 0; i--) {
+		if (bas[peptide[i+1]] > max_bas_y) {
+			max_bas_y = bas[peptide[i+1]];
+		}
+		if (heli[peptide[i+1]] > max_heli_y) {
+			max_heli_y = heli[peptide[i+1]];
+		}
+		if (hydro[peptide[i+1]] > max_hydro_y) {
+			max_hydro_y = hydro[peptide[i+1]];
+		}
+		if (pI[peptide[i+1]] > max_pI_y) {
+			max_pI_y = pI[peptide[i+1]];
+		}
+		if (bas[peptide[i+1]] < min_bas_y) {
+			min_bas_y = bas[peptide[i+1]];
+		}
+		if (heli[peptide[i+1]] < min_heli_y) {
+			min_heli_y = heli[peptide[i+1]];
+		}
+		if (hydro[peptide[i+1]] < min_hydro_y) {
+			min_hydro_y = hydro[peptide[i+1]];
+		}
+		if (pI[peptide[i+1]] < min_pI_y) {
+			min_pI_y = pI[peptide[i+1]];
+		}
+		fnum = i*stride+yoff;
+		v[fnum++] = max_bas_y;
+		v[fnum++] = max_heli_y;
+		v[fnum++] = max_hydro_y;
+		v[fnum++] = max_pI_y;
+		v[fnum++] = min_bas_y;
+		v[fnum++] = min_heli_y;
+		v[fnum++] = min_hydro_y;
+		v[fnum++] = min_pI_y;
+	}
+	return v;
+}
+
+unsigned int* c_ms2pip_get_v_bof_chem(int peplen, unsigned short* peptide, int charge)
+	{
+	return c_ms2pip_get_v_bof_chem_r(&default_ctx, peplen, peptide, charge, v);
+}
+
+//compute feature vectors from peptide
+// v: NUM_FEATURES*(peplen-1) values
+unsigned int* c_ms2pip_get_v_r(const ms2pip_ctx* ctx, int peplen, unsigned short* peptide, unsigned short* modpeptide, int charge, unsigned int* v)
+	{
+	unsigned short* amino_F = ctx->amino_F;
+	int i,j;
+	float mz;
+
+	int max_bas_b = 0;
+	int max_heli_b = 0;
+	int max_hydro_b = 0;
+	int max_pI_b = 0;
+	int max_bas_y = 0;
+	int max_heli_y = 0;
+	int max_hydro_y = 0;
+	int max_pI_y = 0;
+	int min_bas_b = 999;
+	int min_heli_b = 999;
+	int min_hydro_b = 999;
+	int min_pI_b = 999;
+	int min_bas_y = 999;
+	int min_heli_y = 999;
+	int min_hydro_y = 999;
+	int min_pI_y = 999;
+
+	unsigned int buf2[19];
+	unsigned int buf3[19];
+
+	for (i=0; i < 19; i++) {
+		buf2[i] = 0;
+		buf3[i] = 0;
+	}
+
+	for (i=0; i < peplen; i++) {
+		buf3[peptide[i]]++;
+	}
+
+	unsigned int total_bas = 0;
+	unsigned int total_heli = 0;
+	unsigned int total_hydro = 0;
+	unsigned int total_pI = 0;
+	unsigned int max_bas = 0;
+	unsigned int max_heli = 0;
+	unsigned int max_hydro = 0;
+	unsigned int max_pI = 0;
+	unsigned int min_bas = 999;
+	unsigned int min_heli = 999;
+	unsigned int min_hydro = 999;
+	unsigned int min_pI = 999;
+
+	mz = 0.;
+	for (i=0; i < peplen; i++) {
+		mz += amino_F[modpeptide[i]];
+		total_bas += bas[peptide[i]];
+		total_heli += heli[peptide[i]];
+		total_hydro += hydro[peptide[i]];
+		total_pI += pI[peptide[i]];
+		if (max_bas < bas[peptide[i]]) {
+			max_bas = bas[peptide[i]];
+		}
+		if (max_heli < heli[peptide[i]]) {
+			max_heli = heli[peptide[i]];
+		}
+		if (max_hydro < hydro[peptide[i]]) {
+			max_hydro = hydro[peptide[i]];
+		}
+		if (max_pI < pI[peptide[i]]) {
+			max_pI = pI[peptide[i]];
+		}
+		if (min_bas > bas[peptide[i]]) {
+			min_bas = bas[peptide[i]];
+		}
+		if (min_heli > heli[peptide[i]]) {
+			min_heli = heli[peptide[i]];
+		}
+		if (min_hydro > hydro[peptide[i]]) {
+			min_hydro = hydro[peptide[i]];
+		}
+		if (min_pI > pI[peptide[i]]) {
+			min_pI = pI[peptide[i]];
+		}
+	}
+
+	int mean_mz = (int) ((float)mz/peplen);
+	int mean_bas = (int) ((float)total_bas/peplen);
+	int mean_heli = (int) ((float)total_heli/peplen);
+	int mean_hydro = (int) ((float)total_hydro/peplen);
+	int mean_pI = (int) ((float)total_pI/peplen);
+
+	float mzb = 0.;
+	int sum_bas = 0;
+	int sum_heli = 0;
+	int sum_hydro = 0;
+	int sum_pI = 0;
+	int fnum = 0;
+	int yoff = 0;
+	int stride = 0;
+
+	for (i=0; i < peplen-1; i++) {
+		buf2[peptide[i]]++;
+		for (j=0; j < 19; j++) {
+			v[fnum++] = (int) 100*(((float) buf2[j])/(i+1));
+		}
+		buf3[peptide[i]]--;
+		for (j=0; j < 19; j++) {
+			v[fnum++] = (int) 100*(((float) buf3[j])/(peplen-i-1));
+		}
+
+		v[fnum++] = mz;
+		v[fnum++] = peplen;
+		v[fnum++] = i;
+		v[fnum++] = (int) 100*(float)i/peplen;
+		v[fnum++] = mean_mz;
+		v[fnum++] = mean_bas;
+		v[fnum++] = mean_heli;
+		v[fnum++] = mean_hydro;
+		v[fnum++] = mean_pI;
+		v[fnum++] = max_bas;
+		v[fnum++] = max_heli;
+		v[fnum++] = max_hydro;
+		v[fnum++] = max_pI;
+		v[fnum++] = min_bas;
+		v[fnum++] = min_heli;
+		v[fnum++] = min_hydro;
+		v[fnum++] = min_pI;
+
+		// running extremes of the b-ion residues, those of the y-ion residues
+		// are filled in by a backward pass over the peptide after this loop
+		if (bas[peptide[i]] > max_bas_b) {
+			max_bas_b = bas[peptide[i]];
+		}
+		if (heli[peptide[i]] > max_heli_b) {
+			max_heli_b = heli[peptide[i]];
+		}
+		if (hydro[peptide[i]] > max_hydro_b) {
+			max_hydro_b = hydro[peptide[i]];
+		}
+		if (pI[peptide[i]] > max_pI_b) {
+			max_pI_b = pI[peptide[i]];
+		}
+		if (bas[peptide[i]] < min_bas_b) {
+			min_bas_b = bas[peptide[i]];
+		}
+		if (heli[peptide[i]] < min_heli_b) {
+			min_heli_b = heli[peptide[i]];
+		}
+		if (hydro[peptide[i]] < min_hydro_b) {
+			min_hydro_b = hydro[peptide[i]];
+		}
+		if (pI[peptide[i]] < min_pI_b) {
+			min_pI_b = pI[peptide[i]];
+		}
+
+		v[fnum++] = max_bas_b;
+		v[fnum++] = max_heli_b;
+		v[fnum++] = max_hydro_b;
+		v[fnum++] = max_pI_b;
+		v[fnum++] = min_bas_b;
+		v[fnum++] = min_heli_b;
+		v[fnum++] = min_hydro_b;
+		v[fnum++] = min_pI_b;
+
+		if (i == 0) {
+			yoff = fnum; // offset of the y-ion extremes in each vector
+		}
+		fnum += 8;
+
+		mzb += amino_F[modpeptide[i]];
+		v[fnum++] = (int) mzb;
+		v[fnum++] = (int) (mz - mzb);
+		v[fnum++] = (int) (mzb/(i+1));
+		v[fnum++] = (int) ((mz-mzb)/(peplen-1-i));
+		sum_bas += bas[peptide[i]];
+		v[fnum++] = sum_bas;
+		v[fnum++] = total_bas-sum_bas;
+		v[fnum++] = (int) ((float)sum_bas/(i+1));
+		v[fnum++] = (int) ((float)(total_bas-sum_bas)/(peplen-1-i));
+		sum_heli += heli[peptide[i]];
+		v[fnum++] = sum_heli;
+		v[fnum++] = total_heli-sum_heli;
+		v[fnum++] = (int) ((float)sum_heli/(i+1));
+		v[fnum++] = (int) ((float)(total_heli-sum_heli)/(peplen-1-i));
+		sum_hydro += hydro[peptide[i]];
+		v[fnum++] = sum_hydro;
+		v[fnum++] = total_hydro-sum_hydro;
+		v[fnum++] = (int) ((float)sum_hydro/(i+1));
+		v[fnum++] = (int) ((float)(total_hydro-sum_hydro)/(peplen-1-i));
+		sum_pI += pI[peptide[i]];
+		v[fnum++] = sum_pI;
+		v[fnum++] = total_pI-sum_pI;
+		v[fnum++] = (int) ((float)sum_pI/(i+1));
+		v[fnum++] = (int) ((float)(total_pI-sum_pI)/(peplen-1-i));
+
+		v[fnum++] = bas[peptide[i]]+bas[peptide[i+1]];
+		v[fnum++] = heli[peptide[i]]+heli[peptide[i+1]];
+		v[fnum++] = hydro[peptide[i]]+hydro[peptide[i+1]];
+		v[fnum++] = pI[peptide[i]]+pI[peptide[i+1]];
+		v[fnum++] = bas[peptide[i]]*bas[peptide[i+1]];
+		v[fnum++] = heli[peptide[i]]*heli[peptide[i+1]];
+		v[fnum++] = hydro[peptide[i]]*hydro[peptide[i+1]];
+		v[fnum++] = pI[peptide[i]]*pI[peptide[i+1]];
+
+		v[fnum++] = bas[peptide[i]]-bas[peptide[i+1]]+1000;
+		v[fnum++] = heli[peptide[i]]-heli[peptide[i+1]]+1000;
+		v[fnum++] = hydro[peptide[i]]-hydro[peptide[i+1]]+1000;
+		v[fnum++] = pI[peptide[i]]-pI[peptide[i+1]]+1000;
+		v[fnum++] = bas[peptide[i+1]]-bas[peptide[i]]+1000;
+		v[fnum++] = heli[peptide[i+1]]-heli[peptide[i]]+1000;
+		v[fnum++] = hydro[peptide[i+1]]-hydro[peptide[i]]+1000;
+		v[fnum++] = pI[peptide[i+1]]-pI[peptide[i]]+1000;
+
+		v[fnum++] = bas[peptide[i]]+bas[peptide[0]];
+		v[fnum++] = heli[peptide[i]]+heli[peptide[0]];
+		v[fnum++] = hydro[peptide[i]]+hydro[peptide[0]];
+		v[fnum++] = pI[peptide[i]]+pI[peptide[0]];
+		v[fnum++] = bas[peptide[peplen-1]]+bas[peptide[i+1]];
+		v[fnum++] = heli[peptide[peplen-1]]+heli[peptide[i+1]];
+		v[fnum++] = hydro[peptide[peplen-1]]+hydro[peptide[i+1]];
+		v[fnum++] = pI[peptide[peplen-1]]+pI[peptide[i+1]];
+
+		int pos = 0;
+		v[fnum++] = amino_F[modpeptide[pos]];
+		v[fnum++] = bas[peptide[pos]];
+		v[fnum++] = heli[peptide[pos]];
+		v[fnum++] = hydro[peptide[pos]];
+		v[fnum++] = pI[peptide[pos]];
+		v[fnum] = 0;
+		if (peptide[pos] == 11) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 2) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 3) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 8) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 13) {
+			v[fnum] = 1;
+		}
+		fnum++;
+
+		pos = 1;
+		v[fnum++] = amino_F[modpeptide[pos]];
+		v[fnum++] = bas[peptide[pos]];
+		v[fnum++] = heli[peptide[pos]];
+		v[fnum++] = hydro[peptide[pos]];
+		v[fnum++] = pI[peptide[pos]];
+		v[fnum] = 0;
+		if (peptide[pos] == 11) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 2) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 3) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 8) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 13) {
+			v[fnum] = 1;
+		}
+		fnum++;
+
+		pos = peplen-2;
+		v[fnum++] = amino_F[modpeptide[pos]];
+		v[fnum++] = bas[peptide[pos]];
+		v[fnum++] = heli[peptide[pos]];
+		v[fnum++] = hydro[peptide[pos]];
+		v[fnum++] = pI[peptide[pos]];
+		v[fnum] = 0;
+		if (peptide[pos] == 11) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 2) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 3) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 8) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 13) {
+			v[fnum] = 1;
+		}
+		fnum++;
+
+		pos = peplen-1;
+		v[fnum++] = amino_F[modpeptide[pos]];
+		v[fnum++] = bas[peptide[pos]];
+		v[fnum++] = heli[peptide[pos]];
+		v[fnum++] = hydro[peptide[pos]];
+		v[fnum++] = pI[peptide[pos]];
+		v[fnum] = 0;
+		if (peptide[pos] == 11) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 2) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 3) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 8) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[pos] == 13) {
+			v[fnum] = 1;
+		}
+		fnum++;
+
+		v[fnum] = 0;
+		if (peptide[i] == 11) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[i] == 2) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[i] == 3) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[i] == 8) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[i] == 13) {
+			v[fnum] = 1;
+		}
+		fnum++;
+
+		v[fnum] = 0;
+		if (peptide[i+1] == 11) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[i+1] == 2) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[i+1] == 3) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[i+1] == 8) {
+			v[fnum] = 1;
+		}
+		fnum++;
+		v[fnum] = 0;
+		if (peptide[i+1] == 13) {
+			v[fnum] = 1;
+		}
+		fnum++;
+
+
+		v[fnum++] = bas[peptide[i]];
+		if (i==0) {
+			v[fnum++] = bas[peptide[i]];
+		}
+		else {
+			v[fnum++] = bas[peptide[i-1]];
+		}
+		v[fnum++] = bas[peptide[i+1]];
+		if (i==(peplen-2)) {
+			v[fnum++] = bas[peptide[i+1]];
+		}
+		else {
+			v[fnum++] = bas[peptide[i+2]];
+		}
+
+		v[fnum++] = heli[peptide[i]];
+		if (i==0) {
+			v[fnum++] = heli[peptide[i]];
+		}
+		else {
+			v[fnum++] = heli[peptide[i-1]];
+		}
+		v[fnum++] = heli[peptide[i+1]];
+		if (i==(peplen-2)) {
+			v[fnum++] = heli[peptide[i+1]];
+		}
+		else {
+			v[fnum++] = heli[peptide[i+2]];
+		}
+
+		v[fnum++] = hydro[peptide[i]];
+		if (i==0) {
+			v[fnum++] = hydro[peptide[i]];
+		}
+		else {
+			v[fnum++] = hydro[peptide[i-1]];
+		}
+		v[fnum++] = hydro[peptide[i+1]];
+		if (i==(peplen-2)) {
+			v[fnum++] = hydro[peptide[i+1]];
+		}
+		else {
+			v[fnum++] = hydro[peptide[i+2]];
+		}
+
+		v[fnum++] = pI[peptide[i]];
+		if (i==0) {
+			v[fnum++] = pI[peptide[i]];
+		}
+		else {
+			v[fnum++] = pI[peptide[i-1]];
+		}
+		v[fnum++] = pI[peptide[i+1]];
+		if (i==(peplen-2)) {
+			v[fnum++] = pI[peptide[i+1]];
+		}
+		else {
+			v[fnum++] = pI[peptide[i+2]];
+		}
+
+		v[fnum++] = amino_F[modpeptide[i]];
+		if (i==0) {
+			v[fnum++] = amino_F[modpeptide[i]];
+		}
+		else {
+			v[fnum++] = amino_F[modpeptide[i-1]];
+		}
+		v[fnum++] = amino_F[modpeptide[i+1]];
+		if (i==(peplen-2)) {
+			v[fnum++] = amino_F[modpeptide[i+1]];
+		}
+		else {
+			v[fnum++] = amino_F[modpeptide[i+2]];
+		}
+
+		v[fnum++] = charge;
+	}
+
+	// running extremes of the y-ion residues, from the C-terminus
+	if (peplen > 1) {
+		stride = fnum/(peplen-1);
+	}
+	for (i=peplen-2; i >= 0; i--) {
+		if (bas[peptide[i+1]] > max_bas_y) {
+			max_bas_y = bas[peptide[i+1]];
+		}
+		if (heli[peptide[i+1]] > max_heli_y) {
+			max_heli_y = heli[peptide[i+1]];
+		}
+		if (hydro[peptide[i+1]] > max_hydro_y) {
+			max_hydro_y = hydro[peptide[i+1]];
+		}
+		if (pI[peptide[i+1]] > max_pI_y) {
+			max_pI_y = pI[peptide[i+1]];
+		}
+		if (bas[peptide[i+1]] < min_bas_y) {
+			min_bas_y = bas[peptide[i+1]];
+		}
+		if (heli[peptide[i+1]] < min_heli_y) {
+			min_heli_y = heli[peptide[i+1]];
+		}
+		if (hydro[peptide[i+1]] < min_hydro_y) {
+			min_hydro_y = hydro[peptide[i+1]];
+		}
+		if (pI[peptide[i+1]] < min_pI_y) {
+			min_pI_y = pI[peptide[i+1]];
+		}
+		fnum = i*stride+yoff;
+		v[fnum++] = max_bas_y;
+		v[fnum++] = max_heli_y;
+		v[fnum++] = max_hydro_y;
+		v[fnum++] = max_pI_y;
+		v[fnum++] = min_bas_y;
+		v[fnum++] = min_heli_y;
+		v[fnum++] = min_hydro_y;
+		v[fnum++] = min_pI_y;
+	}
+	return v;
+}
+
+unsigned int* c_ms2pip_get_v(int peplen, unsigned short* peptide, unsigned short* modpeptide, int charge)
+	{
+	return c_ms2pip_get_v_r(&default_ctx, peplen, peptide, modpeptide, charge, v);
+}
+
+//compute feature vector from peptide + predict intensities
+// with the given model (one of ms2pip_models)
+// v: scratch space for MODEL_FEATURES*(peplen-1) values,
+// predictions: 2*(peplen-1) values
+float* c_ms2pip_get_p_r(const ms2pip_ctx* ctx, const ms2pip_model* model, int peplen, unsigned short* peptide, unsigned short* modpeptide, int charge, unsigned int* v, float* predictions)
+	{
+	int i;
+	float tmp;
+	float* y = predictions+peplen-1;
+
+	c_ms2pip_get_v_r(ctx, peplen, peptide, modpeptide, charge, v);
+
+	// spread the rows out to MODEL_FEATURES values, starting with the last
+	for (i=peplen-2; i >= 0; i--) {
+		memmove(v+i*MODEL_FEATURES, v+i*NUM_FEATURES, NUM_FEATURES*sizeof(unsigned int));
+		v[i*MODEL_FEATURES+NUM_FEATURES] = 0;
+		v[i*MODEL_FEATURES+NUM_FEATURES+1] = 0;
+	}
+	model->score_ions(v, peplen-1, MODEL_FEATURES, predictions, y);
+
+	// y-ions are stored from the shortest to the longest fragment
+	for (i=0; i < (peplen-1)/2; i++) {
+		tmp = y[i];
+		y[i] = y[peplen-2-i];
+		y[peplen-2-i] = tmp;
+	}
+	return predictions;
+}
+
+float* c_ms2pip_get_p(const ms2pip_model* model, int peplen, unsigned short* peptide, unsigned short* modpeptide, int charge)
+	{
+	return c_ms2pip_get_p_r(&default_ctx, model, peplen, peptide, modpeptide, charge, v, predictions);
+}
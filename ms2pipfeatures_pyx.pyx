@@ -0,0 +1,213 @@
+import sys
+import numpy as np
+cimport numpy as np
+from libc.stdlib cimport malloc, free
+
+cdef extern from "ms2pipfeatures_c.c":
+	enum: NUM_FEATURES
+	enum: MODEL_FEATURES
+	enum: MAX_IONS
+	enum: NUM_MODELS
+	enum: NUM_ION_TYPES
+	ctypedef struct ms2pip_ctx:
+		pass
+	ctypedef struct ms2pip_model:
+		const char* name
+	ctypedef struct ms2pip_ion_type:
+		const char* name
+	ms2pip_ctx default_ctx
+	const ms2pip_ion_type ms2pip_ion_types[NUM_ION_TYPES]
+	const ms2pip_model* ms2pip_models[NUM_MODELS]
+	#uncomment for Omega
+	#void init(char* amino_masses_fname, char* modifications_fname, char* modifications_fname_sptm)
+	void c_ms2pip_init(char* amino_masses_fname)
+	unsigned int* c_ms2pip_get_v_r(const ms2pip_ctx* ctx, int peplen, unsigned short* peptide, unsigned short* modpeptide, int charge, unsigned int* v) nogil
+	unsigned int* c_ms2pip_get_v_bof_chem_r(const ms2pip_ctx* ctx, int peplen, unsigned short* peptide, int charge, unsigned int* v) nogil
+	float* c_ms2pip_get_p_r(const ms2pip_ctx* ctx, const ms2pip_model* model, int peplen, unsigned short* peptide, unsigned short* modpeptide, int charge, unsigned int* v, float* predictions) nogil
+	float* c_ms2pip_get_t_r(const ms2pip_ctx* ctx, int peplen, unsigned short* modpeptide, int numpeaks, float* msms, float* peaks, float nptm, float cptm, float tolmz, float tolppm, float nopeak, int numtypes, const int* types, float* ions) nogil
+	float* c_ms2pip_get_mz_r(const ms2pip_ctx* ctx, int peplen, unsigned short* modpeptide, float nptm, float cptm, float* membuffer) nogil
+
+# All functions below write to their own buffers and release the GIL while
+# the C code runs, so they can be called from several threads at once (after
+# ms2pip_init).
+
+#uncomment for Omega
+#def ms2pip_init(amino_masses_fname, modifications_fname,modifications_fname_sptm):
+#	init(amino_masses_fname, modifications_fname,modifications_fname_sptm)
+
+def ms2pip_init(amino_masses_fname):
+	c_ms2pip_init(amino_masses_fname)
+
+# names of the compiled models, a model is selected by its position in MODELS
+MODELS = tuple([ms2pip_models[i].name for i in range(NUM_MODELS)])
+
+# names of the fragment ion types of get_targets
+ION_TYPES = tuple([ms2pip_ion_types[i].name for i in range(NUM_ION_TYPES)])
+# the (log2(x+0.001) transformed) intensity of an ion without a peak
+NO_PEAK = np.log2(0.001)
+
+def model_index(name):
+	if name not in MODELS:
+		raise ValueError("unknown model %s (known models: %s)"%(name, ", ".join(MODELS)))
+	return MODELS.index(name)
+
+cdef check_length(int plen):
+	if plen < 2:
+		raise ValueError("peptides should be at least 2 amino acids long")
+	if plen-1 > MAX_IONS:
+		raise ValueError("peptides can be at most %i amino acids long"%(MAX_IONS+1))
+
+def get_vector(np.ndarray[unsigned short, ndim=1, mode="c"] peptide,np.ndarray[unsigned short, ndim=1, mode="c"] modpeptide, int charge, out=None):
+	"""
+	Return the feature vectors of the peplen-1 ions as a (peplen-1,
+	NUM_FEATURES) uint16 array. They are written to out if given (for
+	instance a block of rows of a larger array), without further copies.
+	"""
+	cdef int plen = len(peptide)
+	check_length(plen)
+	if out is None:
+		out = np.empty((plen-1, NUM_FEATURES), dtype=np.uint16)
+	cdef np.ndarray[unsigned short, ndim=2, mode="c"] result = out
+	if result.shape[0] != plen-1 or result.shape[1] != NUM_FEATURES:
+		raise ValueError("out should have shape (%i, %i)"%(plen-1, NUM_FEATURES))
+	cdef unsigned short* p = &peptide[0]
+	cdef unsigned short* mp = &modpeptide[0]
+	cdef unsigned short* r = &result[0,0]
+	cdef int i
+	cdef unsigned int* v = <unsigned int*> malloc(NUM_FEATURES*(plen-1)*sizeof(unsigned int))
+	if v == NULL:
+		raise MemoryError()
+	with nogil:
+		c_ms2pip_get_v_r(&default_ctx, plen, p, mp, charge, v)
+		for i in range(NUM_FEATURES*(plen-1)):
+			r[i] = <unsigned short> v[i]
+	free(v)
+	return result
+
+def get_vector_bof_chem(np.ndarray[unsigned short, ndim=1, mode="c"] peptide, int charge):
+	cdef int plen = len(peptide)
+	check_length(plen)
+	cdef np.ndarray[unsigned int, ndim=1, mode="c"] result = np.empty(128*(plen-1), dtype=np.uint32)
+	cdef unsigned short* p = &peptide[0]
+	cdef unsigned int* v = &result[0]
+	with nogil:
+		c_ms2pip_get_v_bof_chem_r(&default_ctx, plen, p, charge, v)
+	return result.reshape(plen-1, 128).tolist()
+
+def get_mzs(np.ndarray[unsigned short, ndim=1, mode="c"] modpeptide,float nptm,float cptm):
+	cdef int plen = len(modpeptide)
+	check_length(plen)
+	cdef float result[2*MAX_IONS]
+	cdef unsigned short* mp = &modpeptide[0]
+	with nogil:
+		c_ms2pip_get_mz_r(&default_ctx, plen, mp, nptm, cptm, result)
+	cdef int i
+	b = []
+	for i in range(plen-1):
+		b.append(result[i])
+	y = []
+	for i in range(plen-1):
+		y.append(result[(plen-1)+i])
+	return(b,y)
+
+def get_targets(np.ndarray[unsigned short, ndim=1, mode="c"] modpeptide, np.ndarray[float, ndim=1, mode="c"] msms, np.ndarray[float, ndim=1, mode="c"] peaks,float nptm,float cptm, float tolmz, float tolppm=0, ion_types=('b','y','b2','y2'), float nopeak=NO_PEAK):
+	"""
+	Return the highest of the peaks (msms sorted) within tolmz Da, or tolppm
+	ppm if tolppm > 0, of each ion of the ion_types (names in ION_TYPES), or
+	nopeak if there is none, as a list of peplen-1 values per ion type,
+	N-terminal ions from the N-terminus and C-terminal ions from the
+	C-terminus.
+	"""
+	cdef int plen = len(modpeptide)
+	check_length(plen)
+	cdef int numtypes = len(ion_types)
+	if numtypes > NUM_ION_TYPES:
+		raise ValueError("at most %i ion types"%NUM_ION_TYPES)
+	cdef int types[NUM_ION_TYPES]
+	cdef int t
+	for t in range(numtypes):
+		if ion_types[t] not in ION_TYPES:
+			raise ValueError("unknown ion type %s (known ion types: %s)"%(ion_types[t], ", ".join(ION_TYPES)))
+		types[t] = ION_TYPES.index(ion_types[t])
+	cdef float result[NUM_ION_TYPES*MAX_IONS]
+	cdef unsigned short* mp = &modpeptide[0]
+	cdef float* pmsms = &msms[0] if len(msms) else NULL
+	cdef float* ppeaks = &peaks[0] if len(peaks) else NULL
+	cdef int numpeaks = len(peaks)
+	with nogil:
+		c_ms2pip_get_t_r(&default_ctx, plen, mp, numpeaks, pmsms, ppeaks, nptm, cptm, tolmz, tolppm, nopeak, numtypes, types, result)
+	cdef int i
+	return tuple([[result[t*(plen-1)+i] for i in range(plen-1)] for t in range(numtypes)])
+
+def get_predictions(np.ndarray[unsigned short, ndim=1, mode="c"] peptide,np.ndarray[unsigned short, ndim=1, mode="c"] modpeptide, int charge, model):
+	cdef int plen = len(modpeptide)
+	check_length(plen)
+	cdef const ms2pip_model* m = ms2pip_models[model_index(model)]
+	cdef np.ndarray[unsigned int, ndim=1, mode="c"] features = np.empty(MODEL_FEATURES*(plen-1), dtype=np.uint32)
+	cdef float predictions[2*MAX_IONS]
+	cdef unsigned short* p = &peptide[0]
+	cdef unsigned short* mp = &modpeptide[0]
+	cdef unsigned int* v = &features[0]
+	with nogil:
+		c_ms2pip_get_p_r(&default_ctx, m, plen, p, mp, charge, v, predictions)
+	cdef int i
+
+	resultB = []
+	resultY = []
+	for i in range(plen-1):
+		resultB.append(predictions[i])
+	for i in range(plen-1):
+		resultY.append(predictions[plen-1+i])
+	return (resultB,resultY)
+
+def get_predictions_batch(np.ndarray[unsigned short, ndim=1, mode="c"] peptides,
+		np.ndarray[unsigned short, ndim=1, mode="c"] modpeptides,
+		np.ndarray[int, ndim=1, mode="c"] offsets,
+		np.ndarray[int, ndim=1, mode="c"] charges,
+		np.ndarray[float, ndim=1, mode="c"] nptms,
+		np.ndarray[float, ndim=1, mode="c"] cptms,
+		np.ndarray[int, ndim=1, mode="c"] models):
+	"""
+	Predict a block of peptides in one call.
+
+	peptides and modpeptides hold all peptides concatenated, peptide k spans
+	offsets[k]:offsets[k+1] and is predicted with model MODELS[models[k]].
+	Returns two float32 arrays (mzs, predictions) with 2*(peplen-1) values per
+	peptide, b-ions followed by y-ions, in the same order as get_mzs and
+	get_predictions.
+	"""
+	cdef int num_peptides = len(charges)
+	cdef int i, start, plen
+	cdef int pos = 0
+	cdef np.ndarray[float, ndim=1, mode="c"] mzs = np.empty(2*(offsets[num_peptides]-num_peptides), dtype=np.float32)
+	cdef np.ndarray[float, ndim=1, mode="c"] predictions = np.empty(2*(offsets[num_peptides]-num_peptides), dtype=np.float32)
+	if num_peptides == 0:
+		return (mzs, predictions)
+	lengths = np.diff(offsets)
+	if np.min(lengths) < 2:
+		raise ValueError("peptides should be at least 2 amino acids long (peptide %i has %i)"%(np.argmin(lengths),np.min(lengths)))
+	check_length(np.max(lengths))
+	if np.min(models) < 0 or np.max(models) >= NUM_MODELS:
+		raise ValueError("model numbers should be in 0..%i"%(NUM_MODELS-1))
+
+	cdef unsigned short* p = &peptides[0]
+	cdef unsigned short* mp = &modpeptides[0]
+	cdef int* offs = &offsets[0]
+	cdef int* chs = &charges[0]
+	cdef float* nptm = &nptms[0]
+	cdef float* cptm = &cptms[0]
+	cdef int* mods = &models[0]
+	cdef float* pmzs = &mzs[0]
+	cdef float* ppredictions = &predictions[0]
+	cdef unsigned int* v = <unsigned int*> malloc(MODEL_FEATURES*MAX_IONS*sizeof(unsigned int))
+	if v == NULL:
+		raise MemoryError()
+	with nogil:
+		for i in range(num_peptides):
+			start = offs[i]
+			plen = offs[i+1]-start
+			c_ms2pip_get_mz_r(&default_ctx, plen, &mp[start], nptm[i], cptm[i], &pmzs[pos])
+			c_ms2pip_get_p_r(&default_ctx, ms2pip_models[mods[i]], plen, &p[start], &mp[start], chs[i], v, &ppredictions[pos])
+			pos += 2*(plen-1)
+	free(v)
+	return (mzs, predictions)
@@ -0,0 +1,103 @@
+"""
+On-disk cache of predicted spectra
+
+Predictions (fragment ion m/z values and intensities) are stored in an SQLite
+database, keyed by the model that predicted them, the encoded peptide
+(residues, modified residues and terminal modification masses), the precursor
+charge and a hash of the compiled module and the PTM lines of the config
+file. One cache file can therefore be shared by runs with different models or
+configurations.
+"""
+
+import os
+import sqlite3
+import hashlib
+import numpy as np
+
+model_hashes = {}
+
+def model_hash(module_file,config_file):
+	"""
+	Return a hash of the compiled model module and of the ptm=, sptm=, nterm=
+	and cterm= lines of the config file (in file order, as the order decides
+	the encoding of the modified residues).
+	"""
+	memo_key = (module_file,os.path.getmtime(module_file),config_file,os.path.getmtime(config_file))
+	if memo_key in model_hashes:
+		return model_hashes[memo_key]
+	h = hashlib.sha1()
+	with open(module_file,'rb') as f:
+		for block in iter(lambda: f.read(1<<20),b''):
+			h.update(block)
+	with open(config_file) as f:
+		for row in f:
+			if row.startswith(("ptm=","sptm=","nterm=","cterm=")):
+				h.update(row.strip()+"\n")
+	model_hashes[memo_key] = h.hexdigest()
+	return model_hashes[memo_key]
+
+def encode_key(peptide,modpeptide,nptm,cptm,model):
+	return np.uint16(model).tobytes() + peptide.tobytes() + modpeptide.tobytes() + np.array([nptm,cptm],dtype=np.float32).tobytes()
+
+class PredictionCache(object):
+	"""
+	Cached predictions for one model, opened once per worker or chunk (SQLite
+	connections can not be shared between processes or threads).
+	"""
+
+	def __init__(self,filename,model):
+		# wait for writers in other workers instead of failing
+		self.db = sqlite3.connect(filename,timeout=600)
+		self.db.execute("PRAGMA journal_mode=WAL")
+		self.db.execute("CREATE TABLE IF NOT EXISTS models (id INTEGER PRIMARY KEY, hash TEXT UNIQUE)")
+		self.db.execute("""CREATE TABLE IF NOT EXISTS predictions (model INTEGER, peptide BLOB, charge INTEGER,
+			mzs BLOB, predictions BLOB, PRIMARY KEY (model,peptide,charge)) WITHOUT ROWID""")
+		self.db.execute("INSERT OR IGNORE INTO models (hash) VALUES (?)",(model,))
+		self.db.commit()
+		self.model = self.db.execute("SELECT id FROM models WHERE hash=?",(model,)).fetchone()[0]
+
+	def get(self,keys,charges,batch_size=500):
+		"""Return (mzs,predictions) float32 arrays for each key, or None if not cached."""
+		found = {}
+		for i in range(0,len(keys),batch_size):
+			batch = [sqlite3.Binary(key) for key in keys[i:i+batch_size]]
+			rows = self.db.execute("SELECT peptide,charge,mzs,predictions FROM predictions WHERE model=? AND peptide IN (%s)"%",".join(["?"]*len(batch)),
+				[self.model]+batch)
+			for (peptide,charge,mzs,predictions) in rows:
+				found[(bytes(peptide),charge)] = (np.frombuffer(mzs,dtype=np.float32),np.frombuffer(predictions,dtype=np.float32))
+		return [found.get((key,int(charge))) for (key,charge) in zip(keys,charges)]
+
+	def put(self,keys,charges,results):
+		"""Store (mzs,predictions) arrays for each key."""
+		self.db.executemany("INSERT OR REPLACE INTO predictions VALUES (?,?,?,?,?)",
+			[(self.model,sqlite3.Binary(key),int(charge),sqlite3.Binary(mzs.astype(np.float32).tobytes()),sqlite3.Binary(predictions.astype(np.float32).tobytes()))
+				for (key,charge,(mzs,predictions)) in zip(keys,charges,results)])
+		self.db.commit()
+
+	def close(self):
+		self.db.close()
+
+def get_predictions_cached(ms2pipfeatures_pyx,cache,peptides,modpeptides,offsets,charges,nptms,cptms,models):
+	"""
+	Same as ms2pipfeatures_pyx.get_predictions_batch, but only the peptides
+	that are not in the cache are predicted (and then added to the cache).
+	"""
+	num_peptides = len(charges)
+	keys = [encode_key(peptides[offsets[k]:offsets[k+1]],modpeptides[offsets[k]:offsets[k+1]],nptms[k],cptms[k],models[k]) for k in range(num_peptides)]
+	results = cache.get(keys,charges)
+	misses = np.array([k for k in range(num_peptides) if results[k] is None],dtype=np.int64)
+	if len(misses) > 0:
+		peplens = offsets[1:]-offsets[:-1]
+		miss_offsets = np.zeros(len(misses)+1,dtype=np.int32)
+		miss_offsets[1:] = np.cumsum(peplens[misses])
+		idx = np.concatenate([np.arange(offsets[k],offsets[k+1]) for k in misses])
+		(mzs,predictions) = ms2pipfeatures_pyx.get_predictions_batch(peptides[idx],modpeptides[idx],miss_offsets,
+			charges[misses],nptms[misses],cptms[misses],models[misses])
+		new = []
+		for (j,k) in enumerate(misses):
+			start = 2*(miss_offsets[j]-j)
+			end = 2*(miss_offsets[j+1]-j-1)
+			results[k] = (mzs[start:end],predictions[start:end])
+			new.append(results[k])
+		cache.put([keys[k] for k in misses],charges[misses],new)
+	return (np.concatenate([r[0] for r in results]),np.concatenate([r[1] for r in results]))
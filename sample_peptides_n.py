@@ -1,116 +1,112 @@
+"""
+Select the PSMs of a PEPREC file for training
+
+Writes <PEPREC>.ms2pip with the spec_id, modifications, peptide and charge of
+the PSMs of peptides of at least -l residues that only carry the -r
+modifications (CAM and Oxidation by default), optionally only tryptic
+peptides (-t), and only the last PSM of each peptide and charge. The charge
+(and with -p the precursor m/z) of each PSM is read from its spectrum in the
+.mgf file, through the .mgf index (see mgf_index.py).
+
+The PEPREC file is read in chunks of -n rows twice: once to find the last
+PSM of each peptide and charge, and once to write the selected PSMs, so
+memory use does not depend on the size of the PEPREC file.
+Arguments:
+	arg1 PEPREC file
+	arg2 .mgf file
+"""
+
+import re
 import sys
+import argparse
 import numpy as np
 import pandas as pd
 
-import cPickle as pickle
-
-tmap = {}
-
-AminoMass = {}  
-AminoMass['A']= 71.037114
-AminoMass['C']= 103.009185
-AminoMass['D']= 115.026943
-AminoMass['E']= 129.042593
-AminoMass['F']= 147.068414
-AminoMass['G']= 57.021464
-AminoMass['H']= 137.058912
-AminoMass['I']= 113.084064
-AminoMass['K']= 128.094963
-AminoMass['L']= 113.084064
-AminoMass['M']= 131.040485
-AminoMass['N']= 114.042927
-AminoMass['P']= 97.052764
-AminoMass['Q']= 128.058578
-AminoMass['R']= 156.101111
-AminoMass['S']= 87.032028
-AminoMass['T']= 101.047679
-AminoMass['V']= 99.068414
-AminoMass['W']= 186.079313
-AminoMass['Y']= 163.063329
-
-def return_len(x):
-	return(len(x))
-
-def is_mod(x):
-	if "|" in str(x):
-		tmp = x.split("|")
-		ok = True
-		for i in range(1,len(tmp),2):
-			if (tmp[i]!="CAM") & (tmp[i]!="Oxidation"):
-				ok = False
-		if ok:
-			return 0
-		else:
-			return 1
-	return 0
-
-def return_charge(x):
-	return tmap[x]
-	
-def is_tryp(x):
-	if ((x[-1] == 'R') | (x[-1] == 'K')):
-		return 1
-	return 0	
-
-def add_pepmass(x):
-	return tmap[x]
-
-def add_cpepmass(x):
-	return 18.010601+sum([AminoMass[a] for a in x[2]])+x[6]*57.02146 
-
-def num_CAM(x):
-	n = 0
-	if "|" in str(x):
-		tmp = x.split("|")
-		ok = True
-		for i in range(1,len(tmp),2):
-			if tmp[i]=="CAM":
-				n += 1
-	return n
-
-def isA(x):
-	return x[0]
-
-f=open(sys.argv[2])
-title = ""
-pepmass = 0
-charge = 0
-while (1):
-	rows = f.readlines(1000000)
-	if not rows: break
-	for row in rows:
-		row = row.rstrip()
-		if row == "": continue
-		if row[:5] == "TITLE":
-			title = row[6:]
-		elif row[:6] == "CHARGE":
-			charge = int(row[7:9].replace("+",""))			
-		elif row[:7] == "PEPMASS":
-			pepmass = float(row[8:].split()[0])
-		elif row[:8] == "END IONS":
-			#tmap[title] = (float(pepmass) * (charge)) - ((charge)*1.007825035)
-			tmap[title] = charge
-
-#pickle.dump( tmap, open( "tmap.p", "wb" ) )
-#tmap = pickle.load( open( "tmap.p", "rb" ) )
-
-sys.stderr.write("don")
-
-sys.stderr.write('reading file\n')
-data = pd.read_csv(sys.argv[1],sep=' ')
-data['peplen'] = data['peptide'].apply(return_len)
-data['mod'] = data['modifications'].apply(is_mod)
-data['charge'] = data['spec_id'].apply(return_charge)
-
-#data['numcam'] = data['modifications'].apply(num_CAM)
-#data['pepmass'] = data['spec_id'].apply(add_pepmass)
-#data['cpepmass'] = data.apply(add_cpepmass,axis=1)
-#data['diff'] = np.abs(data['pepmass']-data['cpepmass'])
-
-data = data[data.peplen>=8]
-data = data[data['mod']==0]
-
-datatmp = data.drop_duplicates(subset=['peptide','charge'],keep="last")	
-datatmp[['spec_id','modifications','peptide','charge']].to_csv(sys.argv[1]+".ms2pip",index=False,sep=" ")
-	
-	
+import mgf_index
+
+def spectrum_info(mgf_file):
+	"""The charge and precursor m/z of each spectrum, indexed by title."""
+	index = mgf_index.load_index(mgf_file)
+	(charges,pepmasses) = mgf_index.read_headers(mgf_file,index)
+	return pd.DataFrame({'charge':charges,'pepmass':pepmasses},index=[title for (title,offset,length) in index])
+
+def allowed_mods(mods):
+	"""A regular expression for modifications strings with only the mods names."""
+	names = '|'.join([re.escape(m) for m in mods])
+	return re.compile(r'^[^|]*\|(?:%s)(?:\|[^|]*\|(?:%s))*$'%(names,names))
+
+def select(chunk,spectra,min_length,mods,tryptic):
+	"""
+	The PSMs of chunk that pass the filters, with their charge and pepmass,
+	their row numbers in chunk and the number of PSMs that passed the filters
+	but have no spectrum.
+	"""
+	modifications = chunk.modifications.fillna('-').astype(str)
+	keep = chunk.peptide.str.len().values >= min_length
+	# unmodified peptides have no '|' in their modifications
+	keep &= ~modifications.str.contains('|',regex=False).values | modifications.str.match(mods).values
+	if tryptic:
+		keep &= chunk.peptide.str[-1].isin(['K','R']).values
+	info = spectra.reindex(chunk.spec_id.values)
+	found = info.charge.notnull().values
+	missing = (keep & ~found).sum()
+	keep &= found
+	selected = chunk[keep].copy()
+	selected['charge'] = info.charge.values[keep].astype(np.int32)
+	selected['pepmass'] = info.pepmass.values[keep]
+	return (selected,np.flatnonzero(keep),missing)
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('pep_file', metavar='<PEPREC file>',
+					 help='PSMs (spec_id, modifications and peptide)')
+	parser.add_argument('spec_file', metavar='<mgf file>',
+					 help='.mgf file with the spectra of the PSMs')
+	parser.add_argument('-l', metavar='INT',action="store", dest='min_length',type=int,default=8,
+					 help='minimum peptide length (default 8)')
+	parser.add_argument('-r', metavar='MODS',action="store", dest='mods',default='CAM,Oxidation',
+					 help='comma separated modifications that are allowed (default CAM,Oxidation)')
+	parser.add_argument('-t', action="store_true", dest='tryptic', default=False,
+					 help='only tryptic peptides (ending in K or R)')
+	parser.add_argument('-p', action="store_true", dest='pepmass', default=False,
+					 help='also write the precursor m/z (pepmass column)')
+	parser.add_argument('-n', metavar='INT',action="store", dest='chunk_size',type=int,default=1000000,
+					 help='number of PSMs to read at once (default 1000000)')
+	args = parser.parse_args()
+
+	sys.stderr.write('reading spectra\n')
+	spectra = spectrum_info(args.spec_file)
+	mods = allowed_mods([m for m in args.mods.split(',') if m])
+
+	def read_chunks():
+		return pd.read_csv(args.pep_file,sep=' ',index_col=False,dtype={'spec_id':str,'modifications':str},chunksize=args.chunk_size)
+
+	# the last PSM of each peptide and charge, by a hash of both
+	sys.stderr.write('reading file\n')
+	rows = []
+	hashes = []
+	num_rows = 0
+	missing = 0
+	for chunk in read_chunks():
+		(selected,idx,n) = select(chunk,spectra,args.min_length,mods,args.tryptic)
+		missing += n
+		rows.append(num_rows+idx)
+		hashes.append(pd.util.hash_pandas_object(selected[['peptide','charge']],index=False).values)
+		num_rows += len(chunk)
+	if missing:
+		sys.stderr.write('%i PSMs without a spectrum in the .mgf file are left out\n'%missing)
+	rows = np.concatenate(rows) if rows else np.zeros(0,dtype=np.int64)
+	last = np.zeros(num_rows,dtype=bool)
+	last[rows[~pd.Series(np.concatenate(hashes) if hashes else []).duplicated(keep='last').values]] = True
+
+	sys.stderr.write('writing %i PSMs\n'%last.sum())
+	columns = ['spec_id','modifications','peptide','charge']+(['pepmass'] if args.pepmass else [])
+	start = 0
+	with open(args.pep_file+".ms2pip",'w') as f:
+		for (i,chunk) in enumerate(read_chunks()):
+			(selected,idx,n) = select(chunk,spectra,args.min_length,mods,args.tryptic)
+			selected[last[start+idx]][columns].to_csv(f,index=False,sep=" ",header=(i == 0))
+			start += len(chunk)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,78 @@
+"""
+Chunked scheduling of the ms2pipC workers
+
+The peptides (or PSMs) are cut into many small chunks of about equal cost,
+measured as the summed peptide length, with the longest peptides in the first
+chunks. The pool hands the chunks out one at a time to whichever worker is
+idle, so that all workers stay busy until the last chunks, which hold the
+cheapest peptides.
+"""
+
+import sys
+import time
+import numpy as np
+
+import instrumentation
+
+def make_chunks(costs,num_workers,chunks_per_worker=8):
+	"""
+	Split items with the given costs into at most num_workers*chunks_per_worker
+	chunks of about equal total cost. Returns a list of index arrays, the most
+	expensive items come first.
+	"""
+	costs = np.asarray(costs,dtype=np.float64)
+	if len(costs) == 0:
+		return []
+	order = np.argsort(-costs,kind='mergesort')
+	num_chunks = min(len(costs),max(1,num_workers*chunks_per_worker))
+	cumulative = np.cumsum(costs[order])
+	# a chunk ends with the item that reaches its share of the total cost
+	bounds = np.searchsorted(cumulative,cumulative[-1]*np.arange(1,num_chunks)/num_chunks)+1
+	return [chunk for chunk in np.split(order,np.unique(bounds)) if len(chunk) > 0]
+
+def run_chunk(task):
+	(func,i,fargs) = task
+	return (i,func(i,*fargs))
+
+def run_chunks(pool,func,tasks,unit='peptides',consume=None,report=None):
+	"""
+	Call func(i,*fargs) for each (fargs,size) in tasks on the pool, report the
+	progress as the chunks finish, and return the results in task order.
+
+	If consume is given, each result is passed to consume (in task order) as
+	soon as it and the results of all earlier tasks are done, and is not kept.
+
+	If report (an instrumentation.Report) is given, the stages of each chunk
+	are added to it.
+	"""
+	total = sum([size for (fargs,size) in tasks])
+	sizes = [size for (fargs,size) in tasks]
+	results = [None]*len(tasks)
+	finished = [False]*len(tasks)
+	next_result = 0
+	done = 0
+	start = time.time()
+	if report:
+		report.count(unit,total)
+		jobs = (report.job(func,i,fargs,size) for (i,(fargs,size)) in enumerate(tasks))
+		outputs = pool.imap_unordered(instrumentation.run_chunk,jobs)
+	else:
+		jobs = ((func,i,fargs) for (i,(fargs,size)) in enumerate(tasks))
+		outputs = pool.imap_unordered(run_chunk,jobs)
+	for (n,output) in enumerate(outputs):
+		i = output[0]
+		results[i] = report.result(output) if report else output[1]
+		finished[i] = True
+		if consume:
+			while next_result < len(tasks) and finished[next_result]:
+				consume(results[next_result])
+				results[next_result] = None
+				next_result += 1
+		done += sizes[i]
+		elapsed = max(time.time()-start,1e-6)
+		sys.stdout.write('\r%i/%i chunks, %i/%i %s (%.0f %s/s)'%(n+1,len(tasks),done,total,unit,done/elapsed,unit))
+		sys.stdout.flush()
+	sys.stdout.write('\n')
+	if consume:
+		return None
+	return results
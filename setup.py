@@ -1,8 +1,34 @@
+import os
+import re
 from distutils.core import setup
+from distutils.extension import Extension
 from Cython.Build import cythonize
 import numpy
 
+import tree_models
+
+# the feature engine with all models, every model is a separate unit (see
+# ms2pip_models.h)
+models = ["ms2pipfeatures_c_HCD.c",
+          "ms2pipfeatures_c_CID.c",
+          "ms2pipfeatures_c_HCDiTRAQ4.c",
+          "ms2pipfeatures_c_HCDiTRAQ4phospho.c"]
+
+# the units include array models (unless compiled with -DMS2PIP_TREE_IFS),
+# which are written from the nested if models when missing or out of date
+for unit in models:
+    with open(unit) as f:
+        for arrays in re.findall(r'#include "(.*)_arrays\.c"', f.read()):
+            if not os.path.exists(arrays+'.c'):
+                continue
+            if os.path.exists(arrays+'_arrays.c') and os.path.getmtime(arrays+'_arrays.c') >= os.path.getmtime(arrays+'.c'):
+                continue
+            with open(arrays+'.c') as m:
+                model_type = m.readline().split('score_')[1][0]
+            tree_models.write_c_model_arrays(tree_models.read_c_model(arrays+'.c'),model_type,arrays+'_arrays.c')
+
 setup(
-    ext_modules = cythonize("ms2pipfeatures_pyx.pyx"),
+    ext_modules = cythonize([Extension("ms2pipfeatures_pyx", ["ms2pipfeatures_pyx.pyx"]+models,
+                                       include_dirs=[numpy.get_include()])]),
     include_dirs=[numpy.get_include()]
 )
@@ -0,0 +1,223 @@
+"""
+Spectral libraries of predicted spectra (ms2pipC.py -l)
+
+The predicted ions of a chunk of peptides (as returned by
+ms2pipC.process_peptides) are sorted by spectrum and m/z once, after which
+every spectrum is a contiguous slice, so a library is written in one pass
+without selecting the ions of each spectrum separately. The intensities are
+relative to the base peak of each spectrum. The precursor m/z follows from
+the b1 and y(n-1) ions, whose masses add up to the peptide mass plus two
+protons.
+
+Three formats are written, chunk by chunk:
+
+- .mgf: TITLE, PEPMASS and CHARGE followed by the peaks
+- .msp: Name (peptide/charge), MW, Comment and the annotated peaks
+- .bin: a binary file that is memory mapped by SpectrumLibrary, which reads
+  any spectrum by its number (or spec_id) without parsing the rest of the
+  file. It holds a header, the peaks of all spectra (peak_dtype), an index
+  with one index_dtype record per spectrum and the names of the spectra
+  (spec_id, peptide and modifications, tab separated):
+
+	header: magic 'MS2PIPSL', version, num_spectra, num_peaks, index_offset, names_offset
+	peaks:  num_peaks x peak_dtype, at byte header.size
+	index:  num_spectra x index_dtype, at byte index_offset
+	names:  utf-8 text, at byte names_offset
+"""
+
+import struct
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+proton = 1.007236 # as used for the fragment ion m/z values in the C code
+
+header = struct.Struct('<8sIIqqqq')
+magic = b'MS2PIPSL'
+version = 1
+peak_dtype = np.dtype([('mz','<f4'),('intensity','<f4'),('ion','S1'),('ionnumber','u1')],align=True)
+index_dtype = np.dtype([('peak_start','<i8'),('num_peaks','<i4'),('charge','<i4'),('precursor_mz','<f8'),
+	('name_start','<i8'),('name_length','<i4')],align=True)
+
+Spectrum = namedtuple('Spectrum',['spec_id','peptide','modifications','charge','precursor_mz','peaks'])
+
+def sort_spectra(preds,peprec):
+	"""
+	Sort the predicted ions by spectrum (in order of appearance) and m/z.
+	Returns (spectra,peaks): a DataFrame with one row per spectrum (spec_id,
+	peptide, modifications, charge, precursor_mz, start, num_peaks) and a
+	peak_dtype array with the ions of all spectra, in the same order.
+	"""
+	(codes,spec_ids) = pd.factorize(preds.spec_id)
+	mz = preds.mz.values
+	order = np.lexsort((mz,codes))
+	codes = codes[order]
+	starts = np.flatnonzero(np.concatenate([[True],codes[1:] != codes[:-1]])) if len(codes) else np.zeros(0,dtype=np.int64)
+	n = np.diff(np.append(starts,len(codes)))
+
+	peaks = np.zeros(len(order),dtype=peak_dtype)
+	peaks['mz'] = mz[order]
+	is_y = np.asarray(preds.ion == 'y')[order]
+	peplen = preds.peplen.values[order].astype(np.int32)
+	ionnumber = preds.ionnumber.values[order].astype(np.int32)
+	peaks['ion'] = np.where(is_y,b'y',b'b')
+	# the y-ions are numbered from the N-terminus in the predictions
+	peaks['ionnumber'] = np.where(is_y,peplen-ionnumber,ionnumber)
+	intensity = np.maximum(np.power(2.,preds.prediction.values[order].astype(np.float64))-0.001,0)
+	if len(starts):
+		base_peak = np.repeat(np.maximum.reduceat(intensity,starts),n)
+		intensity = np.where(base_peak > 0,intensity/np.where(base_peak > 0,base_peak,1),0)
+	peaks['intensity'] = intensity
+
+	# b1 + y(n-1), the ions with ionnumber 1 in the predictions
+	first = ionnumber == 1
+	precursor_mass = np.bincount(codes[first],weights=peaks['mz'][first].astype(np.float64),minlength=len(spec_ids))-2*proton
+	charge = preds.charge.values[order][starts].astype(np.int32)
+
+	spectra = pd.DataFrame({'spec_id':np.asarray(spec_ids[codes[starts]]).astype(str)},columns=['spec_id'])
+	info = peprec.drop_duplicates('spec_id',keep='last').set_index('spec_id')
+	spectra['peptide'] = info.peptide.reindex(spectra.spec_id).fillna('').values
+	spectra['modifications'] = info.modifications.reindex(spectra.spec_id).fillna('-').values
+	spectra['charge'] = charge
+	spectra['precursor_mz'] = (precursor_mass[codes[starts]]+charge*proton)/charge
+	spectra['start'] = starts
+	spectra['num_peaks'] = n
+	return (spectra,peaks)
+
+class MGFWriter(object):
+	def __init__(self,filename):
+		self.f = open(filename,'w')
+
+	def append(self,spectra,peaks):
+		lines = ['%.4f %.6g\n'%p for p in zip(peaks['mz'].tolist(),peaks['intensity'].tolist())]
+		for s in spectra.itertuples(index=False):
+			self.f.write('BEGIN IONS\nTITLE=%s\nPEPMASS=%.6f\nCHARGE=%i+\n'%(s.spec_id,s.precursor_mz,s.charge))
+			self.f.write(''.join(lines[s.start:s.start+s.num_peaks]))
+			self.f.write('END IONS\n\n')
+
+	def close(self):
+		self.f.close()
+
+class MSPWriter(object):
+	def __init__(self,filename):
+		self.f = open(filename,'w')
+
+	def append(self,spectra,peaks):
+		lines = ['%.4f\t%.6g\t"%s%i"\n'%p for p in zip(peaks['mz'].tolist(),peaks['intensity'].tolist(),
+				peaks['ion'].astype(str).tolist(),peaks['ionnumber'].tolist())]
+		for s in spectra.itertuples(index=False):
+			self.f.write('Name: %s/%i\nMW: %.6f\nComment: Parent=%.6f Mods=%s SpecId=%s\nNum peaks: %i\n'%(
+				s.peptide,s.charge,s.precursor_mz*s.charge-s.charge*proton,s.precursor_mz,s.modifications,s.spec_id,s.num_peaks))
+			self.f.write(''.join(lines[s.start:s.start+s.num_peaks]))
+			self.f.write('\n')
+
+	def close(self):
+		self.f.close()
+
+class BinaryWriter(object):
+	def __init__(self,filename):
+		self.f = open(filename,'wb')
+		# the header is written again with the final counts on close
+		self.f.write(header.pack(magic,version,0,0,0,0,0))
+		self.num_peaks = 0
+		self.index = []
+		self.names = []
+		self.name_size = 0
+
+	def append(self,spectra,peaks):
+		self.f.write(peaks.tobytes())
+		names = [('%s\t%s\t%s'%t).encode('utf-8') for t in zip(spectra.spec_id,spectra.peptide,spectra.modifications)]
+		lengths = np.array([len(name) for name in names],dtype=np.int64)
+		index = np.zeros(len(spectra),dtype=index_dtype)
+		index['peak_start'] = self.num_peaks+spectra.start.values
+		index['num_peaks'] = spectra.num_peaks.values
+		index['charge'] = spectra.charge.values
+		index['precursor_mz'] = spectra.precursor_mz.values
+		index['name_start'] = self.name_size+np.cumsum(lengths)-lengths
+		index['name_length'] = lengths
+		self.index.append(index)
+		self.names.extend(names)
+		self.num_peaks += len(peaks)
+		self.name_size += lengths.sum()
+
+	def close(self):
+		index = np.concatenate(self.index) if self.index else np.zeros(0,dtype=index_dtype)
+		# align the index to 8 bytes
+		self.f.write(b'\0'*(-self.f.tell() % 8))
+		index_offset = self.f.tell()
+		self.f.write(index.tobytes())
+		names_offset = self.f.tell()
+		self.f.write(b''.join(self.names))
+		self.f.seek(0)
+		self.f.write(header.pack(magic,version,0,len(index),self.num_peaks,index_offset,names_offset))
+		self.f.close()
+
+writers = {'mgf':MGFWriter,'msp':MSPWriter,'bin':BinaryWriter}
+
+class LibraryWriter(object):
+	"""
+	Append the predictions of chunks of peptides to one library file per
+	format in formats (mgf, msp and/or bin), named base.<format>. The
+	peptide and modifications of each spectrum are looked up in the PEPREC
+	rows of the chunk.
+	"""
+
+	def __init__(self,base,formats):
+		for f in formats:
+			if f not in writers:
+				raise ValueError("Unknown spectral library format: %s (choose from %s)"%(f,", ".join(sorted(writers))))
+		self.filenames = ['%s.%s'%(base,f) for f in formats]
+		self.writers = [writers[f](filename) for (f,filename) in zip(formats,self.filenames)]
+		self.num_spectra = 0
+
+	def append(self,preds,peprec):
+		if len(preds) == 0:
+			return
+		(spectra,peaks) = sort_spectra(preds,peprec)
+		for writer in self.writers:
+			writer.append(spectra,peaks)
+		self.num_spectra += len(spectra)
+
+	def close(self):
+		for writer in self.writers:
+			writer.close()
+
+class SpectrumLibrary(object):
+	"""
+	Memory mapped .bin library: library[i] is the Spectrum with number i,
+	library.find(spec_id) the one with that spec_id. The peaks of a Spectrum
+	are a peak_dtype view on the file.
+	"""
+
+	def __init__(self,filename):
+		self.data = np.memmap(filename,dtype=np.uint8,mode='r')
+		(m,v,_,num_spectra,num_peaks,index_offset,names_offset) = header.unpack(self.data[:header.size].tobytes())
+		if m != magic or v != version:
+			raise ValueError("%s is not a version %i ms2pip spectral library"%(filename,version))
+		self.peaks = self.data[header.size:header.size+num_peaks*peak_dtype.itemsize].view(peak_dtype)
+		self.index = self.data[index_offset:index_offset+num_spectra*index_dtype.itemsize].view(index_dtype)
+		self.names_offset = names_offset
+		self.ids = None
+
+	def __len__(self):
+		return len(self.index)
+
+	def name(self,i):
+		entry = self.index[i]
+		start = self.names_offset+entry['name_start']
+		return self.data[start:start+entry['name_length']].tobytes().decode('utf-8').split('\t')
+
+	def __getitem__(self,i):
+		if i < 0:
+			i += len(self)
+		if not 0 <= i < len(self):
+			raise IndexError("spectrum %i out of range"%i)
+		entry = self.index[i]
+		(spec_id,peptide,modifications) = self.name(i)
+		return Spectrum(spec_id,peptide,modifications,int(entry['charge']),float(entry['precursor_mz']),
+			self.peaks[entry['peak_start']:entry['peak_start']+entry['num_peaks']])
+
+	def find(self,spec_id):
+		if self.ids is None:
+			self.ids = dict((self.name(i)[0],i) for i in range(len(self)))
+		return self[self.ids[spec_id]]
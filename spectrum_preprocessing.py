@@ -0,0 +1,82 @@
+"""
+Preprocessing of the MS2 spectra of ms2pipC.py -s
+
+The spectra are processed in batches: the peaks of all spectra of a batch
+are concatenated in one m/z and one intensity array, with bounds[i] the
+first peak of spectrum i, and are processed in place with a few numpy calls
+for the whole batch:
+
+- the peaks in the reporter ion windows are set to 0 in the spectra of the
+  models with reporter ions (iTRAQ), or of all spectra with -i
+- the intensities of each spectrum are normalized to a sum of 1
+- the normalized intensities are transformed (log2(x+0.001) by default, the
+  scale the models are trained on)
+
+Both can be set in the config file (-c), as one or more lines
+`reporter_ions=113,118` with the first and last m/z of a window (113-118 by
+default) and `peak_transform=X` with X one of the transforms below. The
+predictions are on the log2 scale, so the other transforms are only for
+writing training data (-w), not for evaluating predictions.
+"""
+
+import numpy as np
+
+def log2(peaks):
+	np.add(peaks,0.001,out=peaks)
+	np.log2(peaks,out=peaks)
+
+def sqrt(peaks):
+	np.sqrt(peaks,out=peaks)
+
+def none(peaks):
+	pass
+
+transforms = {'log2':log2,'sqrt':sqrt,'none':none}
+
+default_windows = [(113.,118.)]
+
+def read_config(config_file,training=False):
+	"""
+	Return the reporter ion windows and the name of the transform from the
+	config file. Transforms other than log2 are only allowed for training data.
+	"""
+	windows = []
+	transform = 'log2'
+	with open(config_file) as f:
+		for row in f:
+			if row.startswith("reporter_ions="):
+				l = row.rstrip().split('=')[1].split(',')
+				windows.append((float(l[0]),float(l[1])))
+			if row.startswith("peak_transform="):
+				transform = row.rstrip().split('=')[1]
+	if transform not in transforms:
+		raise ValueError("Unknown peak_transform in configfile: %s (choose from %s)"%(transform,', '.join(sorted(transforms))))
+	if transform != 'log2' and not training:
+		raise ValueError("peak_transform=%s can only be used to write feature vectors (-w), the predictions are log2 transformed"%transform)
+	return (windows or default_windows,transform)
+
+def no_peak(transform):
+	"""The transformed intensity of an ion without a peak."""
+	peaks = np.zeros(1,dtype=np.float64)
+	transforms[transform](peaks)
+	return peaks[0]
+
+def preprocess(msms,peaks,bounds,reporter,windows=default_windows,transform='log2'):
+	"""
+	Remove the reporter ions of the spectra for which reporter is True,
+	normalize and transform the peaks of a batch of spectra, in place.
+	"""
+	counts = np.diff(bounds)
+	if reporter.any():
+		in_window = np.zeros(len(msms),dtype=bool)
+		for (low,high) in windows:
+			in_window |= (msms >= low) & (msms <= high)
+		in_window &= np.repeat(reporter,counts)
+		peaks[in_window] = 0
+	# the sum of each spectrum, reduceat needs the start of the spectra with peaks
+	nonempty = counts > 0
+	if nonempty.any():
+		sums = np.add.reduceat(peaks,bounds[:-1][nonempty])
+		with np.errstate(divide='ignore',invalid='ignore'):
+			np.divide(peaks,np.repeat(sums,counts[nonempty]),out=peaks)
+	transforms[transform](peaks)
@@ -0,0 +1,89 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import convert_to_mgf
+import mgf_index
+
+msp = """Name: ACDEK/2_1
+MW: 594.2
+Comment: Spec=Consensus Mods=1/1,C,CAM Parent=298.1234 Purity=0.9 HCD=30eV
+Num peaks: 3
+101.1\t20.0\t"b1"
+201.2\t100.0\t"?"
+301.3\t5.5\t"y2"
+
+Name: PEPTIDE/3_0
+MW: 799.4
+Comment: Spec=Consensus Mods=0 Parent=267.8 Purity=0.8 HCD=35eV
+Num peaks: 2
+98.06\t1000.0\t"b1"
+227.1\t50.0\t"b2"
+
+Name: KLMR/1_1
+MW: 546.3
+Comment: Spec=Consensus Mods=1/0,K,iTRAQ Parent=547.3 Purity=1.0 HCD=30eV
+Num peaks: 1
+147.1\t10.0\t"y1"
+"""
+
+
+def write_msp(tmpdir, copies):
+    filename = str(tmpdir.join('lib.msp'))
+    with open(filename, 'w') as f:
+        f.write('\n'.join([msp] * copies))
+    return filename
+
+
+def convert(filename, num_chunks):
+    chunks = convert_to_mgf.find_chunks(filename, num_chunks)
+    results = []
+    first_id = 1
+    for (start, end) in chunks:
+        (num_records, records, ptms) = convert_to_mgf.convert_chunk((filename, start, end))
+        results.append(convert_to_mgf.add_titles(records, 'T', first_id) + (ptms,))
+        first_id += num_records
+    return (chunks, results)
+
+
+def test_convert_record(tmpdir):
+    filename = write_msp(tmpdir, 1)
+    (chunks, results) = convert(filename, 1)
+    (pep, meta, mgf, index, ptms) = results[0]
+    assert pep == 'T1 2|CAMC ACDEK\nT2  PEPTIDE\nT3 0|iTRAQ KLMR\n'
+    assert meta.split('\n')[0] == 'T1 2 ACDEK 298.1234 0.9 30'
+    assert mgf.startswith('BEGIN IONS\nTITLE=T1\nCHARGE=2\nPEPMASS=298.1234\n101.1 20.0\n201.2 100.0\n301.3 5.5\nEND IONS\n')
+    assert dict(ptms) == {'CAM': 1, 'iTRAQ': 1}
+
+
+def test_missing_fields(tmpdir):
+    # records without peaks are skipped but still numbered, missing Comment: fields are left empty
+    filename = str(tmpdir.join('lib.msp'))
+    with open(filename, 'w') as f:
+        f.write('Name: AAK/2_0\nComment: Mods=0\n\nName: ACDEK/2_0\nComment: Mods=0 HCD=30eV\nNum peaks: 1\n101.1\t20.0\n')
+    (chunks, results) = convert(filename, 1)
+    (pep, meta, mgf, index, ptms) = results[0]
+    assert pep == 'T2  ACDEK\n'
+    assert meta == 'T2 2 ACDEK   30\n'
+    assert mgf == 'BEGIN IONS\nTITLE=T2\nCHARGE=2\n101.1 20.0\nEND IONS\n'
+
+
+def test_chunks(tmpdir):
+    # the same output for any number of chunks
+    filename = write_msp(tmpdir, 50)
+    (chunks, single) = convert(filename, 1)
+    (chunks, results) = convert(filename, 7)
+    assert len(chunks) == 7
+    for i in range(3):
+        assert ''.join([r[i] for r in results]) == single[0][i]
+    assert sum([r[4] for r in results[1:]], results[0][4]) == single[0][4]
+    assert single[0][0].split('\n')[-2].startswith('T150 ')
+
+    # the index of each chunk matches the index of the written .mgf file
+    mgf_file = str(tmpdir.join('lib.mgf'))
+    index = []
+    with open(mgf_file, 'wb') as f:
+        for r in results:
+            index.extend([(title, f.tell() + pos, length) for (title, pos, length) in r[3]])
+            f.write(r[2])
+    assert index == mgf_index.index_spectrum_file(mgf_file)
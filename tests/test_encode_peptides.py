@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import ms2pipC
+
+PTMmap = {'Oxidation': 38, 'CAM': 39, 'PhosphoS': 40}
+Ntermmap = {'Ace': 42.010565}
+Ctermmap = {'Amid': -0.984016}
+
+
+def make_peprec(num_peptides, seed=1):
+    rs = np.random.RandomState(seed)
+    amino_acids = np.array(list('ACDEFGHIKLMNPQRSTVWY'))
+    rows = []
+    for k in range(num_peptides):
+        peptide = ''.join(rs.choice(amino_acids, rs.randint(2, 40)))
+        mods = []
+        if rs.rand() < 0.3:
+            mods += ['0', 'Ace']
+        for i in np.flatnonzero(rs.rand(len(peptide)) < 0.1):
+            # names with an extra last character fall back to the name without it
+            mods += [str(i + 1), rs.choice(['Oxidation', 'CAM', 'PhosphoS', 'CAMx'])]
+        if rs.rand() < 0.2:
+            mods += ['-1', 'Amid']
+        rows.append(('spec%i' % k, '|'.join(mods) if mods else '-', peptide, rs.randint(1, 5)))
+    return pd.DataFrame(rows, columns=['spec_id', 'modifications', 'peptide', 'charge'])
+
+
+def test_encode_peptides():
+    data = make_peprec(200)
+    (peptides, modpeptides, offsets, nptms, cptms) = ms2pipC.encode_peptides(data, PTMmap, Ntermmap, Ctermmap)
+    assert peptides.dtype == np.uint16 and modpeptides.dtype == np.uint16
+    assert len(offsets) == len(data) + 1
+    for (k, row) in enumerate(data.itertuples()):
+        (peptide, modpeptide, nptm, cptm) = ms2pipC.encode_peptide(row.peptide, row.modifications, PTMmap, Ntermmap, Ctermmap)
+        assert np.array_equal(peptides[offsets[k]:offsets[k + 1]], peptide)
+        assert np.array_equal(modpeptides[offsets[k]:offsets[k + 1]], modpeptide)
+        assert nptms[k] == np.float32(nptm)
+        assert cptms[k] == np.float32(cptm)
+
+
+def test_encode_no_modifications():
+    data = pd.DataFrame({'spec_id': ['a', 'b'], 'modifications': ['-', '-'], 'peptide': ['ACDL', 'KR']})
+    (peptides, modpeptides, offsets, nptms, cptms) = ms2pipC.encode_peptides(data, PTMmap, Ntermmap, Ctermmap)
+    assert list(offsets) == [0, 4, 6]
+    assert np.array_equal(peptides, modpeptides)
+    assert peptides[3] == ms2pipC.a_map['I']
+    assert not nptms.any() and not cptms.any()
+
+
+def test_encode_unknown():
+    for (mods, peptide) in [('1|Unknown', 'ACDE'), ('-', 'ACXE'), ('-', 'K')]:
+        data = pd.DataFrame({'spec_id': ['a'], 'modifications': [mods], 'peptide': [peptide]})
+        try:
+            ms2pipC.encode_peptides(data, PTMmap, Ntermmap, Ctermmap)
+        except ValueError:
+            continue
+        assert False
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import evaluation
+
+
+def make_ions(num_spectra, seed=1):
+    rs = np.random.RandomState(seed)
+    peplens = rs.randint(7, 20, size=num_spectra)
+    spec_ids = np.repeat(['spec%i' % i for i in range(num_spectra)], 2 * (peplens - 1))
+    target = np.log2(rs.rand(len(spec_ids)) + 0.001)
+    data = pd.DataFrame({'spec_id': spec_ids,
+                         'target': target,
+                         'prediction': target + rs.normal(0, 1, len(spec_ids)),
+                         'charge': np.repeat(rs.randint(2, 4, size=num_spectra), 2 * (peplens - 1)),
+                         'peplen': np.repeat(peplens, 2 * (peplens - 1))})
+    # spectra do not have to be contiguous
+    return data.sample(frac=1, random_state=seed)
+
+
+def test_spectrum_metrics():
+    data = make_ions(50)
+    metrics = evaluation.spectrum_metrics(data)
+    assert len(metrics) == 50
+    for (spec_id, ions) in data.groupby('spec_id'):
+        x = ions.target.values
+        y = ions.prediction.values
+        ix = 2 ** x - 0.001
+        iy = 2 ** y - 0.001
+        sa = 1 - 2 * np.arccos(np.dot(ix, iy) / np.linalg.norm(ix) / np.linalg.norm(iy)) / np.pi
+        m = metrics.loc[spec_id]
+        assert np.isclose(m.pearsonr, np.corrcoef(x, y)[0, 1])
+        assert np.isclose(m.mae, np.mean(np.abs(x - y)))
+        assert np.isclose(m.spectral_angle, sa)
+        assert np.isclose(m.dot_product, np.cos((1 - sa) * np.pi / 2))
+        assert np.isclose(m.spearmanr, np.corrcoef(pd.Series(x).rank(), pd.Series(y).rank())[0, 1])
+        assert m.num_ions == len(ions)
+        assert m.peplen == ions.peplen.values[0]
+
+
+def test_spectrum_metrics_constant():
+    data = pd.DataFrame({'spec_id': ['a'] * 3, 'target': [1., 1., 1.], 'prediction': [1., 2., 3.],
+                         'charge': [2] * 3, 'peplen': [4] * 3})
+    metrics = evaluation.spectrum_metrics(data)
+    assert np.isnan(metrics.pearsonr[0])
+    assert np.isnan(metrics.spearmanr[0])
+    assert metrics.mae[0] == 1
+    assert len(evaluation.spectrum_metrics(data.iloc[:0])) == 0
+
+
+def test_spearman_ties():
+    data = pd.DataFrame({'spec_id': ['a'] * 4 + ['b'] * 3, 'target': [1., 2., 2., 3., 3., 2., 1.],
+                         'prediction': [1., 2., 3., 4., 1., 2., 2.], 'charge': 2, 'peplen': 4})
+    metrics = evaluation.spectrum_metrics(data)
+    # average ranks [1, 2.5, 2.5, 4] and [1, 2, 3, 4], [3, 2, 1] and [1, 2.5, 2.5]
+    assert np.isclose(metrics.spearmanr['a'], np.corrcoef([1, 2.5, 2.5, 4], [1, 2, 3, 4])[0, 1])
+    assert np.isclose(metrics.spearmanr['b'], np.corrcoef([3, 2, 1], [1, 2.5, 2.5])[0, 1])
+
+
+def test_summarize():
+    metrics = evaluation.spectrum_metrics(make_ions(200))
+    summary = evaluation.summarize(metrics)
+    assert list(summary.columns) == ['charge', 'peplen'] + evaluation.metric_names + ['num_spectra']
+    assert summary.num_spectra.values[-1] == 200
+    assert summary.num_spectra.values[:-1].sum() == 200
+    assert np.isclose(summary.pearsonr.values[-1], metrics.pearsonr.median())
@@ -0,0 +1,47 @@
+import os
+import sys
+import json
+import pstats
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import instrumentation
+import scheduler
+
+
+def work(i, n):
+    with instrumentation.stage('sum', n):
+        with instrumentation.stage('inner'):
+            total = sum(range(n))
+    return total
+
+
+def test_stage_without_report():
+    with instrumentation.stage('sum', 10) as s:
+        s.items = 5
+    assert work(0, 10) == 45
+
+
+def test_report(tmpdir):
+    filename = str(tmpdir.join('report.json'))
+    report = instrumentation.Report(filename, ['inner'])
+    pool = ThreadPool(2)
+    with instrumentation.stage('workers'):
+        results = scheduler.run_chunks(pool, work, [((n,), n) for n in [10, 20, 30]], report=report)
+    pool.close()
+    pool.join()
+    assert results == [45, 190, 435]
+    report.write()
+
+    with open(filename) as f:
+        data = json.load(f, object_pairs_hook=OrderedDict)
+    assert data['counts'] == {'peptides': 60}
+    assert list(data['main']) == ['workers']
+    assert list(data['workers_total']) == ['work', 'work/sum', 'work/sum/inner']
+    assert data['workers_total']['work/sum']['calls'] == 3
+    assert data['workers_total']['work/sum']['items'] == 60
+    assert sum([w['chunks'] for w in data['workers'].values()]) == 3
+    assert data['peak_rss_mb']['main'] > 0
+    for i in range(3):
+        assert pstats.Stats(filename + '.work.sum.inner.%i.prof' % i).total_calls > 0
@@ -0,0 +1,78 @@
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import mgf_index
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+
+def test_index_spectrum_file():
+    index = mgf_index.index_spectrum_file(os.path.join(test_dir, 'hard_test2.mgf'))
+    assert [title for (title, offset, length) in index] == ['peptide1']
+    with open(os.path.join(test_dir, 'hard_test2.mgf'), 'rb') as f:
+        spectrum = mgf_index.read_spectrum(f, index[0][1], index[0][2])
+    assert spectrum.startswith(b'BEGIN IONS')
+    assert spectrum.endswith(b'END IONS')
+
+def test_load_index_writes_sidecar():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        mgf = os.path.join(tmp_dir, 'test.mgf')
+        shutil.copy(os.path.join(test_dir, 'easy_test.mgf'), mgf)
+        index = mgf_index.load_index(mgf)
+        assert os.path.exists(mgf + '.idx')
+        assert mgf_index.read_index(mgf + '.idx') == index
+        # the index is written to a temporary file first, which is renamed
+        assert sorted(os.listdir(tmp_dir)) == ['test.mgf', 'test.mgf.idx']
+    finally:
+        shutil.rmtree(tmp_dir)
+
+def test_load_index_rebuilds_stale_sidecar():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        mgf = os.path.join(tmp_dir, 'test.mgf')
+        shutil.copy(os.path.join(test_dir, 'easy_test.mgf'), mgf)
+        mgf_index.load_index(mgf)
+        # replaced by another, older file: the .idx is newer but no longer matches
+        shutil.copy(os.path.join(test_dir, 'hard_test2.mgf'), mgf)
+        os.utime(mgf, (1e9, 1e9))
+        expected = mgf_index.index_spectrum_file(mgf)
+        assert mgf_index.load_index(mgf) == expected
+        assert mgf_index.read_index_stat(mgf + '.idx') == (os.path.getsize(mgf), 1e9)
+        # an index without the size and mtime of the .mgf is rebuilt as well
+        mgf_index.write_index([], mgf + '.idx')
+        assert mgf_index.read_index_stat(mgf + '.idx') is None
+        assert mgf_index.load_index(mgf) == expected
+    finally:
+        shutil.rmtree(tmp_dir)
+
+def test_parse_spectrum():
+    with open(os.path.join(test_dir, 'hard_test2.mgf'), 'rb') as f:
+        (title, charge, msms, peaks) = mgf_index.parse_spectrum(f.read())
+    assert title == 'peptide1'
+    assert charge == 2
+    assert list(msms) == [72.04439, 148.06043, 232.07504, 263.08737, 347.10198, 423.11802]
+    assert list(peaks) == [100, 600, 300, 400, 500, 200]
+    (title, charge, msms, peaks) = mgf_index.parse_spectrum(b'BEGIN IONS\nTITLE=p 2\nCHARGE=3+\n100.5 20\n200.25 30\nEND IONS')
+    assert title == 'p2'
+    assert charge == 3
+    assert list(msms) == [100.5, 200.25]
+    assert list(peaks) == [20, 30]
+
+def test_read_headers():
+    mgf = os.path.join(test_dir, 'easy_test.mgf')
+    index = mgf_index.index_spectrum_file(mgf)
+    (charges, pepmasses) = mgf_index.read_headers(mgf, index)
+    assert list(charges) == [2]
+    assert abs(pepmasses[0] - 475.137295) < 1e-6
+
+def test_parse_peaks_mixed_columns():
+    # only some peak lines have a third column (the peak charge)
+    (msms, peaks) = mgf_index.parse_peaks(b'100.0 10.0\n200.0 20.0 2\n300.0 30.0\n400.0 40.0 1\n')
+    assert list(msms) == [100.0, 200.0, 300.0, 400.0]
+    assert list(peaks) == [10.0, 20.0, 30.0, 40.0]
+    (msms, peaks) = mgf_index.parse_peaks(b'100.0 10.0 1\n200.0 20.0 2\n300.0 30.0 1')
+    assert list(msms) == [100.0, 200.0, 300.0]
+    assert list(peaks) == [10.0, 20.0, 30.0]
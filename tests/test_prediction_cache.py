@@ -0,0 +1,66 @@
+import os
+import sys
+import shutil
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import prediction_cache
+
+
+class CountingModel(object):
+    """get_predictions_batch that predicts 10*peplen+charge for every ion"""
+
+    def __init__(self):
+        self.num_predicted = 0
+
+    def get_predictions_batch(self, peptides, modpeptides, offsets, charges, nptms, cptms, models):
+        self.num_predicted += len(charges)
+        peplens = offsets[1:] - offsets[:-1]
+        values = np.repeat(peplens * 10 + charges, 2 * (peplens - 1)).astype(np.float32)
+        return (values, values.copy())
+
+
+def encode(peplens, charges, models=None):
+    offsets = np.zeros(len(peplens) + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum(peplens)
+    peptides = np.arange(offsets[-1], dtype=np.uint16) % 19
+    return (peptides, peptides.copy(), offsets, np.array(charges, dtype=np.int32),
+            np.zeros(len(peplens), dtype=np.float32), np.zeros(len(peplens), dtype=np.float32),
+            np.array(models or [0] * len(peplens), dtype=np.int32))
+
+
+def test_get_predictions_cached():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, 'cache.db')
+        model = CountingModel()
+        first = encode([7, 9, 12], [2, 3, 2])
+        cache = prediction_cache.PredictionCache(filename, 'model1')
+        expected = model.get_predictions_batch(*first)
+        result = prediction_cache.get_predictions_cached(model, cache, *first)
+        assert np.array_equal(result[0], expected[0])
+        assert model.num_predicted == 6
+        cache.close()
+
+        # only the new peptide is predicted, in the right place
+        cache = prediction_cache.PredictionCache(filename, 'model1')
+        second = encode([7, 9, 12, 8], [2, 3, 2, 2])
+        result = prediction_cache.get_predictions_cached(model, cache, *second)
+        assert model.num_predicted == 7
+        assert np.array_equal(result[1], CountingModel().get_predictions_batch(*second)[1])
+
+        # nor are the peptides predicted by another model of the module
+        third = encode([7, 9, 12, 8], [2, 3, 2, 2], [0, 1, 0, 1])
+        prediction_cache.get_predictions_cached(model, cache, *third)
+        assert model.num_predicted == 9
+        cache.close()
+
+        # other modules or configurations do not share predictions
+        cache = prediction_cache.PredictionCache(filename, 'model2')
+        prediction_cache.get_predictions_cached(model, cache, *first)
+        assert model.num_predicted == 12
+        cache.close()
+    finally:
+        shutil.rmtree(tmp_dir)
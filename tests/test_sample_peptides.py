@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import sample_peptides_n
+
+mgf = """BEGIN IONS
+TITLE=s1
+CHARGE=2+
+PEPMASS=500.5
+100.0 1
+END IONS
+BEGIN IONS
+TITLE=s2
+CHARGE=3+
+PEPMASS=400.25
+100.0 1
+END IONS
+BEGIN IONS
+TITLE=s3
+CHARGE=2+
+PEPMASS=500.75
+100.0 1
+END IONS
+BEGIN IONS
+TITLE=s4
+CHARGE=2+
+PEPMASS=600.0
+100.0 1
+END IONS
+"""
+
+peprec = """spec_id modifications peptide
+s1 - ACDEFGHIK
+s2 2|CAM|5|Oxidation ACLLMNPQR
+s3 - ACDEFGHIK
+s4 0|iTRAQ KLMNPQRSTVWY
+s5 - ACDEFGHIKL
+s6 - ACDEK
+"""
+
+
+def run(tmpdir, *options):
+    pep_file = str(tmpdir.join('test.PEPREC'))
+    spec_file = str(tmpdir.join('test.mgf'))
+    with open(pep_file, 'w') as f:
+        f.write(peprec)
+    with open(spec_file, 'w') as f:
+        f.write(mgf)
+    sys.argv = ['sample_peptides_n.py', pep_file, spec_file] + list(options)
+    sample_peptides_n.main()
+    return pd.read_csv(pep_file + '.ms2pip', sep=' ')
+
+
+def test_select(tmpdir):
+    # s1 is replaced by the later PSM s3 of the same peptide and charge,
+    # s4 has a modification that is not allowed, s5 and s6 have no spectrum
+    for chunk_size in ['1', '2', '100']:
+        result = run(tmpdir, '-n', chunk_size)
+        assert list(result.columns) == ['spec_id', 'modifications', 'peptide', 'charge']
+        assert list(result.spec_id) == ['s2', 's3']
+        assert list(result.charge) == [3, 2]
+
+
+def test_options(tmpdir):
+    result = run(tmpdir, '-t', '-p', '-r', 'iTRAQ')
+    assert list(result.spec_id) == ['s3']
+    assert list(result.pepmass) == [500.75]
+    result = run(tmpdir, '-r', 'CAM,Oxidation,iTRAQ', '-l', '5')
+    assert list(result.spec_id) == ['s2', 's3', 's4']
@@ -0,0 +1,40 @@
+import os
+import sys
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import scheduler
+
+def test_make_chunks():
+    costs = np.random.RandomState(1).randint(7, 40, size=1000)
+    chunks = scheduler.make_chunks(costs, 4)
+    assert len(chunks) == 32
+    # every item in exactly one chunk, most expensive items first
+    assert sorted(np.concatenate(chunks)) == list(range(1000))
+    assert costs[chunks[0]].min() >= costs[chunks[-1]].max()
+    sums = [costs[chunk].sum() for chunk in chunks]
+    assert max(sums) < 1.5 * costs.sum() / 32
+
+def test_make_chunks_small():
+    assert scheduler.make_chunks([], 4) == []
+    chunks = scheduler.make_chunks([5, 10], 4)
+    assert [list(chunk) for chunk in chunks] == [[1], [0]]
+
+def add(i, a, b):
+    return a + b
+
+def test_run_chunks_keeps_task_order():
+    tasks = [((k, 1), 1) for k in range(20)]
+    pool = ThreadPool(4)
+    assert scheduler.run_chunks(pool, add, tasks) == [k + 1 for k in range(20)]
+    pool.close()
+
+def test_run_chunks_consume():
+    tasks = [((k, 1), 1) for k in range(20)]
+    consumed = []
+    pool = ThreadPool(4)
+    assert scheduler.run_chunks(pool, add, tasks, consume=consumed.append) is None
+    assert consumed == [k + 1 for k in range(20)]
+    pool.close()
@@ -0,0 +1,74 @@
+import io
+import os
+import sys
+import json
+import argparse
+import threading
+import urllib2
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+pytest.importorskip('ms2pipfeatures_pyx')
+import ms2pip_server
+
+config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.file')
+
+peprec = """spec_id modifications peptide charge
+pep1 - ACDEFGHIK 2
+pep2 2|CAM|5|Oxidation ACLLMNPQR 3
+pep3 0|iTRAQ KLMNPQRSTVWY 2
+"""
+
+
+@pytest.fixture(scope='module')
+def server():
+    args = argparse.Namespace(c=config_file, i=False, p=False, num_cpu='2', threads=True, cache=None)
+    predictor = ms2pip_server.Predictor(args)
+    server = ms2pip_server.make_server(predictor, port=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://localhost:%i' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    predictor.close()
+
+
+def post(url, body, content_type='text/plain'):
+    return urllib2.urlopen(urllib2.Request(url, body, {'Content-Type': content_type})).read()
+
+
+def test_predict_formats(server):
+    csv = pd.read_csv(io.BytesIO(post(server + '/predict?format=csv', peprec)))
+    assert list(csv.spec_id.unique()) == ['pep1', 'pep2', 'pep3']
+    assert len(csv) == 2 * (8 + 8 + 11)
+    records = np.load(io.BytesIO(post(server + '/predict?format=npy', peprec)))
+    assert np.allclose(records['prediction'], csv.prediction.values)
+    assert np.allclose(records['mz'], csv.mz.values)
+    columns = json.loads(post(server + '/predict', peprec))
+    assert columns['spec_id'] == list(csv.spec_id)
+    assert np.allclose(columns['prediction'], csv.prediction.values)
+
+
+def test_predict_json(server):
+    data = pd.read_csv(io.BytesIO(peprec), sep=' ')
+    expected = json.loads(post(server + '/predict', peprec))
+    for body in [json.dumps(data.to_dict('list')), data.to_json(orient='records')]:
+        assert json.loads(post(server + '/predict', body, 'application/json')) == expected
+
+
+def test_errors(server):
+    for (body, status) in [('spec_id modifications peptide charge\npep1 2|Unknown ACDEK 2\n', 400),
+                           ('spec_id modifications peptide charge model\npep1 - ACDEK 2 XX\n', 400),
+                           ('spec_id modifications peptide charge\npep1 - ACDEFGHIK 2\npep2 - K 2\n', 400)]:
+        with pytest.raises(urllib2.HTTPError) as e:
+            post(server + '/predict', body)
+        assert e.value.code == status
+    with pytest.raises(urllib2.HTTPError) as e:
+        post(server + '/predict?format=xml', peprec)
+    assert e.value.code == 400
+    health = json.loads(urllib2.urlopen(server + '/health').read())
+    assert health['default_model'] == 'HCD'
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import spectrum_library
+
+masses = {'A': 71.037114, 'G': 57.021464, 'K': 128.094963, 'P': 97.052764, 'S': 87.032028}
+
+
+def make_predictions(peptides, seed=1):
+    # the ions as ms2pipC.process_peptides returns them
+    rs = np.random.RandomState(seed)
+    rows = []
+    for (k, peptide) in enumerate(peptides):
+        m = np.array([masses[a] for a in peptide])
+        b = np.cumsum(m)[:-1] + 1.007236
+        y = 18.0105647 + np.cumsum(m[::-1])[:-1] + 1.007236
+        n = len(peptide) - 1
+        rows.append(pd.DataFrame({'peplen': len(peptide), 'charge': 2 + k % 2,
+                                  'ion': ['b'] * n + ['y'] * n,
+                                  'mz': np.concatenate([b, y]).astype(np.float32),
+                                  'ionnumber': np.concatenate([np.arange(1, n + 1), np.arange(n, 0, -1)]),
+                                  'prediction': np.log2(rs.rand(2 * n) + 0.001) + 0.5,
+                                  'spec_id': 'spec%i' % k}))
+    preds = pd.concat(rows, ignore_index=True)
+    peprec = pd.DataFrame({'spec_id': ['spec%i' % k for k in range(len(peptides))],
+                           'peptide': peptides, 'modifications': '-'})
+    return (preds.sample(frac=1, random_state=seed), peprec)
+
+
+def test_library(tmpdir):
+    peptides = ['PASKG', 'GGSAKPK', 'SAK', 'KPGSAASGK']
+    (preds, peprec) = make_predictions(peptides)
+    base = str(tmpdir.join('lib'))
+    library = spectrum_library.LibraryWriter(base, ['mgf', 'msp', 'bin'])
+    # two chunks, as with ms2pipC.py -n
+    first = preds.spec_id.isin(['spec0', 'spec1'])
+    library.append(preds[first], peprec)
+    library.append(preds[~first], peprec)
+    library.close()
+
+    spectra = spectrum_library.SpectrumLibrary(base + '.bin')
+    assert len(spectra) == len(peptides)
+    mgf = open(base + '.mgf').read()
+    msp = open(base + '.msp').read()
+    for (k, peptide) in enumerate(peptides):
+        s = spectra.find('spec%i' % k)
+        assert s.peptide == peptide
+        assert s.charge == 2 + k % 2
+        mass = sum([masses[a] for a in peptide]) + 18.0105647
+        assert np.isclose(s.precursor_mz, (mass + s.charge * 1.007236) / s.charge, atol=1e-4)
+        ions = preds[preds.spec_id == 'spec%i' % k].sort_values('mz')
+        assert np.array_equal(s.peaks['mz'], ions.mz.values)
+        assert np.all(np.diff(s.peaks['mz']) >= 0)
+        intensity = 2 ** ions.prediction.values - 0.001
+        assert np.allclose(s.peaks['intensity'], intensity / intensity.max())
+        labels = ['%s%i' % (ion, n if ion == 'b' else len(peptide) - n) for (ion, n) in zip(ions.ion, ions.ionnumber)]
+        assert ['%s%i' % (ion, n) for (ion, n) in zip(s.peaks['ion'].astype(str), s.peaks['ionnumber'])] == labels
+        assert 'TITLE=spec%i\nPEPMASS=%.6f\nCHARGE=%i+\n' % (k, s.precursor_mz, s.charge) in mgf
+        assert 'Name: %s/%i\n' % (peptide, s.charge) in msp
+    assert spectra[-1].spec_id == spectra[len(peptides) - 1].spec_id
+
+
+def test_empty_library(tmpdir):
+    filename = str(tmpdir.join('empty'))
+    library = spectrum_library.LibraryWriter(filename, ['bin'])
+    library.close()
+    assert len(spectrum_library.SpectrumLibrary(filename + '.bin')) == 0
+
+
+def test_unknown_format(tmpdir):
+    try:
+        spectrum_library.LibraryWriter(str(tmpdir.join('lib')), ['txt'])
+    except ValueError:
+        return
+    assert False
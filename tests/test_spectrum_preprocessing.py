@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import spectrum_preprocessing
+
+
+def batch():
+    msms = np.array([100.0, 114.1, 200.0, 114.1, 300.0, 117.0, 500.0])
+    peaks = np.array([1.0, 2.0, 1.0, 2.0, 2.0, 4.0, 4.0])
+    bounds = np.array([0, 3, 3, 7])
+    return (msms, peaks, bounds)
+
+
+def test_preprocess():
+    (msms, peaks, bounds) = batch()
+    # the third spectrum has reporter ions, the second no peaks at all
+    spectrum_preprocessing.preprocess(msms, peaks, bounds, np.array([False, False, True]))
+    expected = np.log2(np.array([0.25, 0.5, 0.25, 0, 1 / 3., 0, 2 / 3.]) + 0.001)
+    assert np.allclose(peaks, expected)
+
+
+def test_transforms(tmpdir):
+    config = str(tmpdir.join('config'))
+    with open(config, 'w') as f:
+        f.write('frag_method=HCD\nreporter_ions=114,115\nreporter_ions=116.5,117.5\npeak_transform=sqrt\n')
+    with pytest.raises(ValueError):
+        spectrum_preprocessing.read_config(config)
+    (windows, transform) = spectrum_preprocessing.read_config(config, training=True)
+    assert windows == [(114., 115.), (116.5, 117.5)]
+    (msms, peaks, bounds) = batch()
+    spectrum_preprocessing.preprocess(msms, peaks, bounds, np.array([True, False, True]), windows, transform)
+    assert np.allclose(peaks, np.sqrt([0.5, 0, 0.5, 0, 1 / 3., 0, 2 / 3.]))
+    assert spectrum_preprocessing.no_peak(transform) == 0
+    assert spectrum_preprocessing.no_peak('log2') == np.log2(0.001)
+
+    with open(config, 'w') as f:
+        f.write('peak_transform=log10\n')
+    with pytest.raises(ValueError):
+        spectrum_preprocessing.read_config(config, training=True)
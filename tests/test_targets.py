@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+ms2pipfeatures_pyx = pytest.importorskip('ms2pipfeatures_pyx')
+import ms2pipC
+
+config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.file')
+no_peak = np.float32(-9.96578428466)
+
+proton = 1.007236
+water = 18.0105647
+
+
+@pytest.fixture(scope='module')
+def modpeptide():
+    ms2pipfeatures_pyx.ms2pip_init(ms2pipC.read_config(config_file)[5])
+    return np.array([ms2pipC.a_map[a] for a in 'ACDEK'], dtype=np.uint16)
+
+
+def residues(peptide):
+    return np.array([ms2pipC.masses[ms2pipC.a_map[a]] for a in peptide])
+
+
+def ion_mzs():
+    n = np.cumsum(residues('ACDEK'))[:-1]
+    c = np.cumsum(residues('ACDEK')[::-1])[:-1]
+    return {'b': n + proton, 'y': c + water + proton, 'b2': (n + 2 * proton) / 2,
+            'y2': (c + water + 2 * proton) / 2, 'a': n - 27.9949146 + proton}
+
+
+def spectrum(mzs, intensities):
+    order = np.argsort(mzs)
+    return (np.array(mzs, dtype=np.float32)[order], np.array(intensities, dtype=np.float32)[order])
+
+
+def test_targets(modpeptide):
+    ions = ion_mzs()
+    # b2 and y3 match, y3 twice within the tolerance, b3 just outside of it
+    (msms, peaks) = spectrum([ions['b'][1] + 0.01, ions['y'][2] - 0.015, ions['y'][2] + 0.01, ions['b'][2] + 0.03, 1000.0],
+                             [-1.0, -3.0, -2.0, -4.0, -5.0])
+    (b, y, b2, y2) = ms2pipfeatures_pyx.get_targets(modpeptide, msms, peaks, 0, 0, 0.02)
+    assert np.allclose(b, [no_peak, -1.0, no_peak, no_peak])
+    assert np.allclose(y, [no_peak, no_peak, -2.0, no_peak])
+    assert np.allclose(b2 + y2, [no_peak] * 8)
+
+
+def test_ppm_and_ion_types(modpeptide):
+    ions = ion_mzs()
+    mz = ions['a'][3]
+    (msms, peaks) = spectrum([mz * (1 + 15e-6), ions['y2'][3]], [-1.0, -2.0])
+    (a, y2) = ms2pipfeatures_pyx.get_targets(modpeptide, msms, peaks, 0, 0, 0, 20, ('a', 'y2'))
+    assert np.allclose(a, [no_peak] * 3 + [-1.0])
+    assert np.allclose(y2, [no_peak] * 3 + [-2.0])
+    (a,) = ms2pipfeatures_pyx.get_targets(modpeptide, msms, peaks, 0, 0, 0, 10, ('a',))
+    assert np.allclose(a, [no_peak] * 4)
+    with pytest.raises(ValueError):
+        ms2pipfeatures_pyx.get_targets(modpeptide, msms, peaks, 0, 0, 0.02, 0, ('z',))
+
+
+def test_last_ion(modpeptide):
+    # a peak at the m/z of the full peptide is not an ion
+    mz = residues('ACDEK').sum() + proton
+    (msms, peaks) = spectrum([mz, mz + water], [-1.0, -1.0])
+    for ladder in ms2pipfeatures_pyx.get_targets(modpeptide, msms, peaks, 0, 0, 0.02):
+        assert np.allclose(ladder, [no_peak] * 4)
+
+
+def test_short_peptides(modpeptide):
+    # peptides of fewer than 2 amino acids have no ions
+    for offsets in [[0, 1], [0, 5, 6], [0, 5, 5]]:
+        n = len(offsets) - 1
+        with pytest.raises(ValueError):
+            ms2pipfeatures_pyx.get_predictions_batch(modpeptide[:offsets[-1]].copy(), modpeptide[:offsets[-1]].copy(),
+                                                     np.array(offsets, dtype=np.int32), np.full(n, 2, dtype=np.int32),
+                                                     np.zeros(n, dtype=np.float32), np.zeros(n, dtype=np.float32),
+                                                     np.zeros(n, dtype=np.int32))
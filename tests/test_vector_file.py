@@ -0,0 +1,79 @@
+import io
+import os
+import sys
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import vector_file
+
+
+def make_chunk(psmids, num_ions):
+    n = len(psmids) * num_ions
+    chunk = pd.DataFrame(np.arange(n * 3).reshape(n, 3).astype(np.uint16), columns=['f0', 'f1', 'f2'])
+    chunk['psmid'] = np.repeat(psmids, num_ions).astype(object)
+    for c in vector_file.targets:
+        chunk[c] = np.linspace(0, 1, n)
+    return chunk
+
+
+@pytest.mark.parametrize('ext', ['h5', 'pkl', 'parquet'])
+def test_vector_writer(ext):
+    if ext == 'parquet':
+        pytest.importorskip('pyarrow')
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, 'vectors.' + ext)
+        chunks = [make_chunk(['a', 'bb'], 4), make_chunk([], 4), make_chunk(['a_longer_title'], 7)]
+        writer = vector_file.VectorWriter(filename, len('a_longer_title'), 15)
+        for chunk in chunks:
+            writer.append(chunk.copy())
+        writer.close()
+        assert writer.num_rows == 15
+        assert os.listdir(tmp_dir) == ['vectors.' + ext]
+
+        vectors = vector_file.read_vectors(filename)
+        expected = pd.concat(chunks, ignore_index=True)
+        assert list(vectors.columns) == list(expected.columns)
+        assert list(vectors.index) == list(range(15))
+        assert (vectors.dtypes[['f0', 'f1', 'f2']] == np.uint16).all()
+        assert (vectors.dtypes[vector_file.targets] == np.float32).all()
+        assert list(vectors.psmid) == list(expected.psmid)
+        assert np.array_equal(vectors[['f0', 'f1', 'f2']].values, expected[['f0', 'f1', 'f2']].values)
+        assert np.allclose(vectors[vector_file.targets].values, expected[vector_file.targets].values)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_iter_vectors():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, 'vectors.h5')
+        writer = vector_file.VectorWriter(filename, 10, 50)
+        for k in range(5):
+            writer.append(make_chunk(['psm%i' % (2 * k), 'psm%i' % (2 * k + 1)], 5))
+        writer.close()
+        chunks = list(vector_file.iter_vectors(filename, 15))
+        assert [len(chunk) for chunk in chunks] == [15, 15, 15, 5]
+        assert pd.concat(chunks).equals(vector_file.read_vectors(filename))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_in_test_set():
+    psmids = np.array(['psm%i' % i for i in range(10000)], dtype=object)
+    test = vector_file.in_test_set(psmids)
+    assert 800 < test.sum() < 1200
+    # the same PSM is always on the same side
+    assert np.array_equal(vector_file.in_test_set(psmids[::-1]), test[::-1])
+
+
+def test_write_libsvm():
+    fout = io.BytesIO()
+    vector_file.write_libsvm(fout, np.array([[0, 3], [65535, 1]], dtype=np.uint16),
+                             np.array([-9.965784, 0.5], dtype=np.float32))
+    assert fout.getvalue() == b'-9.96578407 0:0 1:3\n0.5 0:65535 1:1\n'
@@ -13,6 +13,9 @@ import pickle
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy.stats import pearsonr
+import tree_models
+import vector_file
+import evaluation
 
 print xgb.__version__
 
@@ -34,92 +37,18 @@ def main():
 	         help='number of cpu\'s to use')
 	parser.add_argument('-t',metavar='FILE', action="store", dest='vectorseval',
 	         help='additional evaluation file')
+	parser.add_argument('-a', action="store_true", dest='arrays', default=False,
+	         help='write the model as node arrays (see tree_models.py) instead of nested ifs')
+	parser.add_argument('-x',metavar='DIR', action="store", dest='external',
+	         help='train on all feature vectors out of core, with the XGBoost cache files in DIR')
+	parser.add_argument('-n',metavar='INT', action="store", dest='chunk_size', type=int, default=1000000,
+	         help='feature vectors per chunk with -x (default 1000000)')
 	args = parser.parse_args()
 
-	sys.stderr.write('loading data\n')
- 
-	if args.vectors.split('.')[-1] == 'pkl':
-	  vectors = pd.read_pickle(args.vectors)
-	elif args.vectors.split('.')[-1] == 'h5':
-	  vectors = pd.read_hdf(args.vectors, 'table')
+	if args.external:
+		(xtrain,xtest,test,numf) = external_memory_dmatrix(args)
 	else:
-	  print "unsuported feature vector format"
-
-	if args.vectorseval:
-		if args.vectorseval.split('.')[-1] == 'pkl':
-		  eval_vectors = pd.read_pickle(args.vectorseval)
-		elif args.vectorseval.split('.')[-1] == 'h5':
-		  eval_vectors = pd.read_hdf(args.vectorseval, 'table')
-		else:
-		  print "unsuported feature vector format"
-	
-		
-	#vectors = vectors[vectors.charge==2]	
-	#eval_vectors = eval_vectors[eval_vectors.charge==2]	
-	#vectors = vectors[vectors.peplen==10]	
-	#eval_vectors = eval_vectors[eval_vectors.peplen==10]	
-	#vectors = vectors[vectors.ionnumber==5]	
-	#eval_vectors = eval_vectors[eval_vectors.ionnumber==5]	
-
-	vectors = vectors.sample(4000000,replace=False)
-
-	print "%s contains %i feature vectors" % (args.vectors,len(vectors))
-	#print "%s contains %i feature vectors" % (args.vectorseval,len(eval_vectors))
-				
-	psmids = vectors["psmid"]
-	np.random.seed(1)
-	upeps = psmids.unique()
-	num_psms = len(upeps)
-	np.random.shuffle(upeps)
-
-	test_psms = upeps[:int(num_psms*0.1)]
-
-	targetsB = vectors.pop("targetsB")
-	targetsY = vectors.pop("targetsY")
-
-	test_vectors = vectors[psmids.isin(test_psms)]
-	train_vectors = vectors[~psmids.isin(test_psms)]
-
-	if args.type == 'B':
-		test_targets = targetsB[psmids.isin(test_psms)]
-		train_targets = targetsB[~psmids.isin(test_psms)]
-	elif args.type == 'Y':
-		test_targets = targetsY[psmids.isin(test_psms)]
-		train_targets = targetsY[~psmids.isin(test_psms)]
-	else:
-		print "Wrong model type argument (should be 'B' or 'Y')."
-		exit
-
-	if args.vectorseval:
-		targetsBeval = eval_vectors.pop("targetsB")
-		targetsYeval = eval_vectors.pop("targetsY")
-		if args.type == 'B':
-			eval_targets = targetsBeval
-		elif args.type == 'Y':
-			eval_targets = targetsYeval
-
-	#eval_psmids = eval_vectors.pop("psmid")
-	train_psmids = train_vectors.pop("psmid")
-	test_psmids = test_vectors.pop("psmid")
-
-	train_vectors = train_vectors.astype(np.float32)
-	test_vectors = test_vectors.astype(np.float32)
-	#eval_vectors = eval_vectors.astype(np.float32)
-
-	sys.stderr.write('loading data done\n')
-
-	#rename features to understand decision tree dump
-	train_vectors.columns = ['Feature'+str(i) for i in range(len(train_vectors.columns))]
-	test_vectors.columns = ['Feature'+str(i) for i in range(len(train_vectors.columns))]
-	#eval_vectors.columns = ['Feature'+str(i) for i in range(len(eval_vectors.columns))]
-	numf = len(train_vectors.columns.values)
-
-	#create XGBoost datastructure
-	sys.stderr.write('creating DMatrix\n')
-	xtrain = xgb.DMatrix(train_vectors, label=train_targets)
-	xtest = xgb.DMatrix(test_vectors, label=test_targets)
-	#xeval = xgb.DMatrix(eval_vectors, label=eval_targets)
-	sys.stderr.write('creating DMatrix done\n')
+		(xtrain,xtest,test,numf) = in_memory_dmatrix(args)
 
 	evallist  = [(xtest,'test')]
 	#evallist  = [(xeval,'eval'),(xtest,'test')]
@@ -167,120 +96,158 @@ def main():
 	for l in ll:
 		sys.stderr.write("'"+l+"',")
 
-	predictions = bst.predict(xtest)
+	test['predictions'] = bst.predict(xtest)
+	#test.to_pickle('predictions.pkl')
+	test.to_csv('predictions.csv',index=False)
 
-	tmp = pd.DataFrame()
-	tmp['target'] = list(test_targets.values)
-	tmp['predictions'] = predictions
-	tmp['psmid'] = list(test_psmids.values)
-	#tmp['charge'] = list(eval_vectors.charge.values)
-	#tmp['peplen'] = list(eval_vectors.peplen.values)
-	#tmp.to_pickle('predictions.pkl')
-	tmp.to_csv('predictions.csv',index=False)
-
-	
 	convert_model_to_c(bst,args,numf)
 
-	for ch in range(8,20):
-		print "len %i" % ch
-		n1 = 0
-		n2 = 0
-		tmp3 = tmp[tmp.peplen==ch]
-		for pid in tmp3.psmid.unique().values:
-			tmp2 = tmp3[tmp3.psmid==pid]
-			print pid
-			for (t,p) in zip (tmp2.target,tmp2.predictions):
-				print "%f %f" % (t,p)
-			#n1 += pearsonr(tmp2.target,tmp2.predictions)[0]
-			n1 += np.mean(np.abs(tmp2.target-tmp2.predictions))
-			#print n1
-			n2+=1
-		print float(n1)/n2
-
-	#plt.scatter(x=test_targets,y=predictions)
+	#evaluate the test PSMs by charge and peptide length
+	metrics = evaluation.spectrum_metrics(test,spec_id='psmid',prediction='predictions')
+	summary = evaluation.write_summary(metrics,'evaluation.csv')
+	print summary.to_string(index=False)
+
+	#plt.scatter(x=test.target,y=test.predictions)
 	#plt.show()
 
 	#dump model to .c code
 
+#load (a sample of) the feature vectors in memory and split them at the PSM level
+def in_memory_dmatrix(args):
+	sys.stderr.write('loading data\n')
+ 
+	vectors = vector_file.read_vectors(args.vectors)
+
+	if args.vectorseval:
+		eval_vectors = vector_file.read_vectors(args.vectorseval)
+	
+		
+	#vectors = vectors[vectors.charge==2]	
+	#eval_vectors = eval_vectors[eval_vectors.charge==2]	
+	#vectors = vectors[vectors.peplen==10]	
+	#eval_vectors = eval_vectors[eval_vectors.peplen==10]	
+	#vectors = vectors[vectors.ionnumber==5]	
+	#eval_vectors = eval_vectors[eval_vectors.ionnumber==5]	
+
+	vectors = vectors.sample(4000000,replace=False)
+
+	print "%s contains %i feature vectors" % (args.vectors,len(vectors))
+	#print "%s contains %i feature vectors" % (args.vectorseval,len(eval_vectors))
+				
+	#split at the PSM level and use the same features as external_memory_dmatrix
+	if not args.type in ['B','Y']:
+		print "Wrong model type argument (should be 'B' or 'Y')."
+		exit(1)
+	psmids = vectors["psmid"]
+	in_test = vector_file.in_test_set(psmids.values)
+	targets = vectors["targets"+args.type]
+	vectors = vectors.drop(["psmid"]+vector_file.targets,axis=1)
+
+	test_vectors = vectors[in_test]
+	train_vectors = vectors[~in_test]
+	test_targets = targets[in_test]
+	train_targets = targets[~in_test]
+	test_psmids = psmids[in_test]
+
+	if args.vectorseval:
+		eval_targets = eval_vectors["targets"+args.type]
+		eval_vectors = eval_vectors.drop(["psmid"]+vector_file.targets,axis=1)
+
+	train_vectors = train_vectors.astype(np.float32)
+	test_vectors = test_vectors.astype(np.float32)
+	#eval_vectors = eval_vectors.astype(np.float32)
+
+	sys.stderr.write('loading data done\n')
+
+	#rename features to understand decision tree dump
+	train_vectors.columns = ['Feature'+str(i) for i in range(len(train_vectors.columns))]
+	test_vectors.columns = ['Feature'+str(i) for i in range(len(train_vectors.columns))]
+	#eval_vectors.columns = ['Feature'+str(i) for i in range(len(eval_vectors.columns))]
+	numf = len(train_vectors.columns.values)
+
+	#create XGBoost datastructure
+	sys.stderr.write('creating DMatrix\n')
+	xtrain = xgb.DMatrix(train_vectors, label=train_targets)
+	xtest = xgb.DMatrix(test_vectors, label=test_targets)
+	#xeval = xgb.DMatrix(eval_vectors, label=eval_targets)
+	sys.stderr.write('creating DMatrix done\n')
+
+	#the peplen and charge features (Feature39 and Feature185) are kept for the evaluation
+	test = pd.DataFrame({'target':test_targets.values,'psmid':test_psmids.values,
+		'charge':test_vectors.Feature185.values,'peplen':test_vectors.Feature39.values},
+		columns=['target','psmid','charge','peplen'])
+
+	return (xtrain,xtest,test,numf)
+
+#stream the feature vectors chunk by chunk into LibSVM files in args.external,
+#split at the PSM level, and load these as external memory DMatrix objects that
+#XGBoost reads page by page from its cache files. All feature vectors are used,
+#only the targets and PSM ids of the test set are kept in memory
+def external_memory_dmatrix(args):
+	if not args.type in ['B','Y']:
+		print "Wrong model type argument (should be 'B' or 'Y')."
+		exit(1)
+	if not os.path.isdir(args.external):
+		os.makedirs(args.external)
+	train_file = os.path.join(args.external,'train.libsvm')
+	test_file = os.path.join(args.external,'test.libsvm')
+
+	sys.stderr.write('writing LibSVM files\n')
+	num_train = 0
+	test = []
+	with open(train_file,'w') as ftrain, open(test_file,'w') as ftest:
+		for chunk in vector_file.iter_vectors(args.vectors,args.chunk_size):
+			psmids = chunk["psmid"].values
+			targets = chunk["targets"+args.type].values
+			features = chunk.drop(["psmid"]+vector_file.targets,axis=1).values
+			numf = features.shape[1]
+			in_test = vector_file.in_test_set(psmids)
+			vector_file.write_libsvm(ftrain,features[~in_test],targets[~in_test])
+			vector_file.write_libsvm(ftest,features[in_test],targets[in_test])
+			num_train += np.sum(~in_test)
+			test.append(pd.DataFrame({'target':targets[in_test],'psmid':psmids[in_test],
+				'charge':chunk["charge"].values[in_test],'peplen':chunk["peplen"].values[in_test]},
+				columns=['target','psmid','charge','peplen']))
+			sys.stderr.write('\r%i train and %i test feature vectors'%(num_train,sum([len(t) for t in test])))
+	sys.stderr.write('\n')
+
+	sys.stderr.write('creating DMatrix\n')
+	xtrain = xgb.DMatrix(train_file+'#'+os.path.join(args.external,'train.cache'))
+	xtest = xgb.DMatrix(test_file+'#'+os.path.join(args.external,'test.cache'))
+	#rename features to understand decision tree dump
+	xtrain.feature_names = ['Feature'+str(i) for i in range(numf)]
+	xtest.feature_names = ['Feature'+str(i) for i in range(numf)]
+	sys.stderr.write('creating DMatrix done\n')
+
+	return (xtrain,xtest,pd.concat(test,ignore_index=True),numf)
+
 def convert_model_to_c(bst,args,numf):
 	#dump model and write .c file
 	bst.dump_model('dump.raw.txt')
-	num_nodes = []
-	mmax = 0
-	with open('dump.raw.txt') as f:
-		for row in f:
-			if row.startswith('booster'):
-				if row.startswith('booster[0]'):
-					mmax = 0
-				else:
-					num_nodes.append(mmax+1)
-					mmax = 0
-				continue
-			l=int(row.rstrip().replace(' ','').split(':')[0])
-			if l > mmax:
-				mmax = l
-	num_nodes.append(mmax+1)
-	forest = []
-	tree = None
-	b = 0
-	with open('dump.raw.txt') as f:
-		for row in f:
-			if row.startswith('booster'):
-				if row.startswith('booster[0]'):
-					tree = [0]*num_nodes[b]
-					b += 1
-				else:
-					forest.append(tree)
-					tree = [0]*num_nodes[b]
-					b+=1
-				continue
-			#if b == len(num_nodes)-10: break
-			l=row.rstrip().replace(' ','').split(':')
-			if l[1][:4] == "leaf":
-				tmp = l[1].split('=')
-				tree[int(l[0])] = [-1,float(tmp[1]),-1,-1] #!!!!
-			else:
-				tmp = l[1].split('yes=')
-				tmp[0]=tmp[0].replace('[Features','')
-				tmp[0]=tmp[0].replace('[Feature','')
-				tmp[0]=tmp[0].replace(']','')
-				tmp2 = tmp[0].split('<')
-				if float(tmp2[1]) < 0: tmp2[1] = 1
-				tmp3 = tmp[1].split(",no=")
-				tmp4 = tmp3[1].split(',')
-				tree[int(l[0])] = [int(tmp2[0]),int(math.ceil(float(tmp2[1]))),int(tmp3[0]),int(tmp4[0])]
-		forest.append(tree)
-
-		tmp = args.vectors.replace('.','_')
-		tmp2 = tmp.split('/')
-		with open(tmp+args.type+'_c.c','w') as fout:
-			fout.write("static float score_"+args.type+"(unsigned int* v){\n")
-			fout.write("float s = 0.;\n")
-			#for tt in [0]:
-			#for tt in range(len(forest)-10):
-			for tt in range(len(forest)):
-				fout.write(tree_to_code(forest[tt],0,1))
-			fout.write("\nreturn s;}\n")
-
-		with open(tmp+'.pyx','w') as fout:
-			fout.write("cdef extern from \"" + tmp2[-1] + "_c.c\":\n")
+	forest = tree_models.read_xgboost_dump('dump.raw.txt')
+
+	tmp = args.vectors.replace('.','_')
+	tmp2 = tmp.split('/')
+	with open(tmp+'.pyx','w') as fout:
+		if args.arrays:
+			tree_models.write_c_model_arrays(forest,args.type,tmp+args.type+'_c_arrays.c')
+			#the array models need the evaluator in models/tree_eval.c (compile
+			#with the ms2pip directory on the include path)
+			fout.write("cdef extern from \"models/tree_eval.c\":\n\tpass\n\n")
+			fout.write("cdef extern from \"" + tmp2[-1] + args.type + "_c_arrays.c\":\n")
+			fout.write("\tfloat score_%s(unsigned int* v)\n\n"%args.type)
+			fout.write("def myscore(sv):\n")
+			fout.write("\tcdef unsigned int[%i] v = sv\n"%numf)
+		else:
+			tree_models.write_c_model(forest,args.type,tmp+args.type+'_c.c')
+			fout.write("cdef extern from \"" + tmp2[-1] + args.type + "_c.c\":\n")
 			fout.write("\tfloat score_%s(short unsigned short[%i] v)\n\n"%(args.type,numf))
 			fout.write("def myscore(sv):\n")
 			fout.write("\tcdef unsigned short[%i] v = sv\n"%numf)
-			fout.write("\treturn score_%s(v)\n"%args.type)
+		fout.write("\treturn score_%s(v)\n"%args.type)
 
 	#os.remove('dump.raw.txt')
 
-
-def tree_to_code(tree,pos,padding):
-	p = "\t"*padding
-	if tree[pos][0] == -1:
-		if tree[pos][1] < 0:
-			return p+"s = s %f;\n"%tree[pos][1]
-		else:
-			return p+"s = s + %f;\n"%tree[pos][1]
-	return p+"if (v[%i]<%i){\n%s}\n%selse{\n%s}"%(tree[pos][0],tree[pos][1],tree_to_code(tree,tree[pos][2],padding+1),p,tree_to_code(tree,tree[pos][3],padding+1))
-
 def print_logo():
 	logo = """
  _____ _____ _____ _____ _____
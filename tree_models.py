@@ -0,0 +1,185 @@
+"""
+Read and write XGBoost tree models as C code
+
+A forest is a list of trees, a tree is a list of nodes indexed by node id. An
+internal node is [feature, threshold, yes, no] (go to node yes if
+v[feature] < threshold), a leaf is [-1, value, -1, -1].
+
+Models can be written as nested if statements (the original format) or as
+flat node arrays that are scored by the generic evaluator in
+models/tree_eval.c. The array format compiles in seconds and gives identical
+scores.
+
+Usage: python tree_models.py <model.c> [...]
+converts existing nested if models to <model>_arrays.c
+"""
+
+import re
+import sys
+import math
+
+def read_xgboost_dump(filename):
+	"""Read a forest from an XGBoost text dump (Booster.dump_model)."""
+	num_nodes = []
+	mmax = 0
+	with open(filename) as f:
+		for row in f:
+			if row.startswith('booster'):
+				if row.startswith('booster[0]'):
+					mmax = 0
+				else:
+					num_nodes.append(mmax+1)
+					mmax = 0
+				continue
+			l=int(row.rstrip().replace(' ','').split(':')[0])
+			if l > mmax:
+				mmax = l
+	num_nodes.append(mmax+1)
+	forest = []
+	tree = None
+	b = 0
+	with open(filename) as f:
+		for row in f:
+			if row.startswith('booster'):
+				if row.startswith('booster[0]'):
+					tree = [0]*num_nodes[b]
+					b += 1
+				else:
+					forest.append(tree)
+					tree = [0]*num_nodes[b]
+					b+=1
+				continue
+			l=row.rstrip().replace(' ','').split(':')
+			if l[1][:4] == "leaf":
+				tmp = l[1].split('=')
+				tree[int(l[0])] = [-1,float(tmp[1]),-1,-1] #!!!!
+			else:
+				tmp = l[1].split('yes=')
+				tmp[0]=tmp[0].replace('[Features','')
+				tmp[0]=tmp[0].replace('[Feature','')
+				tmp[0]=tmp[0].replace(']','')
+				tmp2 = tmp[0].split('<')
+				if float(tmp2[1]) < 0: tmp2[1] = 1
+				tmp3 = tmp[1].split(",no=")
+				tmp4 = tmp3[1].split(',')
+				tree[int(l[0])] = [int(tmp2[0]),int(math.ceil(float(tmp2[1]))),int(tmp3[0]),int(tmp4[0])]
+		forest.append(tree)
+	return forest
+
+c_tokens = re.compile(r'if \(v\[(\d+)\]<(\d+)\)\{|(else\{)|s = s ([-+] ?[0-9.eE+-]+);|(\})|(return)')
+
+def read_c_model(filename):
+	"""Read a forest back from a nested if model written by write_c_model."""
+	with open(filename) as f:
+		code = f.read()
+	code = code[code.index('float s = 0.;'):]
+	tokens = c_tokens.finditer(code)
+	forest = []
+	while True:
+		tree = []
+		if read_c_node(tokens,tree) is None:
+			break
+		forest.append(tree)
+	return forest
+
+def read_c_node(tokens,tree):
+	m = next(tokens)
+	if m.group(6):
+		return None
+	pos = len(tree)
+	if m.group(4) is not None:
+		tree.append([-1,float(m.group(4).replace(' ','')),-1,-1])
+		return pos
+	tree.append([int(m.group(1)),int(m.group(2)),-1,-1])
+	tree[pos][2] = read_c_node(tokens,tree)
+	next(tokens) # }
+	next(tokens) # else{
+	tree[pos][3] = read_c_node(tokens,tree)
+	next(tokens) # }
+	return pos
+
+def tree_to_code(tree,pos,padding):
+	p = "\t"*padding
+	if tree[pos][0] == -1:
+		if tree[pos][1] < 0:
+			return p+"s = s %f;\n"%tree[pos][1]
+		else:
+			return p+"s = s + %f;\n"%tree[pos][1]
+	return p+"if (v[%i]<%i){\n%s}\n%selse{\n%s}"%(tree[pos][0],tree[pos][1],tree_to_code(tree,tree[pos][2],padding+1),p,tree_to_code(tree,tree[pos][3],padding+1))
+
+def write_c_model(forest,model_type,filename):
+	"""Write the forest as a score_<model_type> function of nested if statements."""
+	with open(filename,'w') as fout:
+		fout.write("static float score_"+model_type+"(unsigned int* v){\n")
+		fout.write("float s = 0.;\n")
+		for tt in range(len(forest)):
+			fout.write(tree_to_code(forest[tt],0,1))
+		fout.write("\nreturn s;}\n")
+
+def write_array(fout,ctype,name,values,fmt):
+	fout.write("static const %s %s[%i] = {\n"%(ctype,name,len(values)))
+	for i in range(0,len(values),10):
+		fout.write("\t" + ",".join([fmt%x for x in values[i:i+10]]) + ",\n")
+	fout.write("};\n")
+
+def tree_depth(tree,pos):
+	if tree[pos][0] == -1:
+		return 0
+	return 1+max(tree_depth(tree,tree[pos][2]),tree_depth(tree,tree[pos][3]))
+
+def write_c_model_arrays(forest,model_type,filename):
+	"""
+	Write the forest as flat node arrays and a score_<model_type> function
+	that evaluates them with score_forest from models/tree_eval.c (which
+	should be included before this file).
+
+	Leaves point to themselves (feature 0 with threshold 0 always goes
+	right), so every tree can be walked for a fixed number of steps, its
+	depth, without testing for leaves.
+	"""
+	roots = []
+	depths = []
+	feature = []
+	threshold = []
+	left = []
+	right = []
+	value = []
+	for tree in forest:
+		start = len(feature)
+		roots.append(start)
+		depths.append(tree_depth(tree,0))
+		for node in tree:
+			if node[0] == -1:
+				feature.append(0)
+				threshold.append(0)
+				left.append(len(left))
+				right.append(len(right))
+				value.append(node[1])
+			else:
+				feature.append(node[0])
+				threshold.append(node[1])
+				left.append(start+node[2])
+				right.append(start+node[3])
+				value.append(0.)
+	t = model_type
+	with open(filename,'w') as fout:
+		write_array(fout,"int",t+"_roots",roots,"%i")
+		write_array(fout,"int",t+"_depths",depths,"%i")
+		fout.write("static const tree_node %s_nodes[%i] = {\n"%(t,len(feature)))
+		for i in range(len(feature)):
+			fout.write("\t{%i,%i,%i,%i},\n"%(feature[i],threshold[i],left[i],right[i]))
+		fout.write("};\n")
+		# leaf values are written with the same precision as the nested if
+		# models (and summed as doubles) so that both give the same scores
+		write_array(fout,"double",t+"_value",value,"%f")
+		fout.write("\nstatic const tree_forest forest_%s = {%i,%s_roots,%s_depths,%s_nodes,%s_value};\n\n"%(t,len(roots),t,t,t,t))
+		fout.write("static float score_%s(unsigned int* v){\n"%t)
+		fout.write("\treturn score_forest(&forest_%s,v);\n}\n"%t)
+
+if __name__ == "__main__":
+	for filename in sys.argv[1:]:
+		with open(filename) as f:
+			model_type = f.readline().split('score_')[1][0]
+		forest = read_c_model(filename)
+		write_c_model_arrays(forest,model_type,filename[:-2]+'_arrays.c')
+		sys.stdout.write("%s: %i trees, %i nodes\n"%(filename,len(forest),sum([len(tree) for tree in forest])))
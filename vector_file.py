@@ -0,0 +1,158 @@
+"""
+Feature vector files (ms2pipC.py -w)
+
+The feature vectors and targets of each chunk of PSMs are appended to the
+file as soon as the chunk is done, so that the complete matrix is never held
+in memory. The format follows the extension of the file:
+
+- .h5 (and any other extension): a compressed PyTables table with key
+  'table', as read by pd.read_hdf(filename,'table')
+- .parquet: a compressed Parquet file with one row group per chunk (requires
+  pyarrow)
+- .pkl: a pickled DataFrame, which can not be appended to, so it is written
+  when all chunks are done
+
+The features are stored as uint16 and the targets as float32.
+"""
+
+import numpy as np
+import pandas as pd
+
+targets = ["targetsB","targetsY","targetsB2","targetsY2"]
+
+def fix_dtypes(vectors,start):
+	"""Fixed dtypes and a running index (from start) for a chunk of vectors."""
+	for c in vectors.columns:
+		if c in targets:
+			if vectors[c].dtype != np.float32:
+				vectors[c] = vectors[c].astype(np.float32)
+		elif c != "psmid" and vectors[c].dtype != np.uint16:
+			vectors[c] = vectors[c].astype(np.uint16)
+	vectors.index = pd.RangeIndex(start,start+len(vectors))
+	return vectors
+
+class HDFWriter(object):
+	def __init__(self,filename,psmid_size,expected_rows):
+		self.store = pd.HDFStore(filename,mode='w',complevel=5,complib='blosc')
+		self.psmid_size = psmid_size
+		self.expected_rows = expected_rows
+
+	def append(self,vectors):
+		# the psmid column is as wide as the longest title of all chunks
+		self.store.append('table',vectors,format='table',index=False,
+			min_itemsize={'psmid':self.psmid_size},expectedrows=self.expected_rows)
+
+	def close(self):
+		self.store.close()
+
+class ParquetWriter(object):
+	def __init__(self,filename,psmid_size,expected_rows):
+		import pyarrow
+		import pyarrow.parquet
+		self.pyarrow = pyarrow
+		self.filename = filename
+		self.writer = None
+
+	def append(self,vectors):
+		table = self.pyarrow.Table.from_pandas(vectors,preserve_index=False)
+		if self.writer is None:
+			self.writer = self.pyarrow.parquet.ParquetWriter(self.filename,table.schema,compression='zstd')
+		self.writer.write_table(table)
+
+	def close(self):
+		if self.writer is not None:
+			self.writer.close()
+
+class PickleWriter(object):
+	def __init__(self,filename,psmid_size,expected_rows):
+		self.filename = filename
+		self.chunks = []
+
+	def append(self,vectors):
+		self.chunks.append(vectors)
+
+	def close(self):
+		if self.chunks:
+			pd.concat(self.chunks).to_pickle(self.filename)
+		else:
+			pd.DataFrame().to_pickle(self.filename)
+
+writers = {'parquet':ParquetWriter,'pkl':PickleWriter}
+
+class VectorWriter(object):
+	"""
+	Append chunks of feature vectors (DataFrames as returned by
+	ms2pipC.process_spectra) to filename. psmid_size is the length of the
+	longest PSM id and expected_rows an estimate of the total number of rows.
+	"""
+
+	def __init__(self,filename,psmid_size,expected_rows):
+		writer = writers.get(filename.split('.')[-1],HDFWriter)
+		# (both are 0 or NaN if there are no PSMs)
+		self.writer = writer(filename,int(psmid_size) if psmid_size > 0 else 1,int(expected_rows) if expected_rows > 0 else 1)
+		self.num_rows = 0
+		self.columns = None
+
+	def append(self,vectors):
+		if len(vectors) == 0:
+			return
+		if self.columns is None:
+			self.columns = list(vectors.columns)
+		elif list(vectors.columns) != self.columns:
+			raise ValueError("all chunks of feature vectors should have the same columns")
+		self.writer.append(fix_dtypes(vectors,self.num_rows))
+		self.num_rows += len(vectors)
+
+	def close(self):
+		self.writer.close()
+
+def read_vectors(filename):
+	"""Read a feature vector file written by VectorWriter (or by older versions of ms2pipC)."""
+	ext = filename.split('.')[-1]
+	if ext == 'pkl':
+		return pd.read_pickle(filename)
+	elif ext == 'parquet':
+		return pd.read_parquet(filename)
+	return pd.read_hdf(filename,'table')
+
+def iter_vectors(filename,chunk_size):
+	"""
+	Read a feature vector file in chunks of about chunk_size rows (a Parquet
+	file is read one row group at a time). Only HDF5 tables and Parquet files
+	are read chunk by chunk, pickles and older fixed format HDF5 files are
+	read as a whole first.
+	"""
+	ext = filename.split('.')[-1]
+	if ext == 'parquet':
+		import pyarrow.parquet
+		f = pyarrow.parquet.ParquetFile(filename)
+		for i in range(f.num_row_groups):
+			yield f.read_row_group(i).to_pandas()
+		return
+	if ext != 'pkl':
+		with pd.HDFStore(filename,mode='r') as store:
+			is_table = store.get_storer('table').is_table
+		if is_table:
+			for chunk in pd.read_hdf(filename,'table',chunksize=chunk_size):
+				yield chunk
+			return
+	vectors = read_vectors(filename)
+	for start in range(0,len(vectors),chunk_size):
+		yield vectors.iloc[start:start+chunk_size]
+
+def in_test_set(psmids,test_fraction=0.1):
+	"""
+	Split feature vectors at the PSM level without a list of all PSMs: a PSM
+	is in the test set if the hash of its id falls in the first
+	test_fraction of the hash range, so all its ions end up on the same side
+	in every chunk and every run.
+	"""
+	return (pd.util.hash_array(np.asarray(psmids,dtype=object)) % 1000) < int(test_fraction*1000)
+
+def write_libsvm(fout,features,labels):
+	"""
+	Append rows to a LibSVM file. Zeros are written as well, as XGBoost
+	treats the features that are left out of a row as missing.
+	"""
+	fmt = ['%.9g'] + ['%i:%%i'%i for i in range(features.shape[1])]
+	np.savetxt(fout,np.column_stack([labels,features]),fmt=fmt)